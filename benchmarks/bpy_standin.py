@@ -0,0 +1,869 @@
+# a small pure Python stand-in for bpy and mathutils, just enough of the API for io_node to export and import shader
+# node trees outside of Blender. Collections keep a name index so lookups and unique names stay O(1) for large trees
+import sys
+import types
+from os import path
+
+
+# MATHUTILS ----------------------------------------------------------------------------------------------------------
+class _Seq:
+    size = 3
+
+    def __init__(self, values=None):
+        self._v = [0.0] * self.size if values is None else [float(v) for v in values]
+
+    def __iter__(self):
+        return iter(self._v)
+
+    def __len__(self):
+        return len(self._v)
+
+    def __getitem__(self, i):
+        return self._v[i]
+
+    def __setitem__(self, i, v):
+        self._v[i] = v
+
+    def __eq__(self, other):
+        return list(self) == list(other)
+
+    def __add__(self, other):
+        return type(self)([a + b for a, b in zip(self, other)])
+
+    def __repr__(self):
+        return "{}({})".format(type(self).__name__, self._v)
+
+
+class Vector(_Seq):
+    pass
+
+
+class Color(_Seq):
+    pass
+
+
+class Euler(_Seq):
+    pass
+
+
+class Quaternion(_Seq):
+    size = 4
+
+
+class bpy_prop_array(_Seq):
+    def foreach_get(self, seq):
+        seq[:] = self._v
+
+    def foreach_set(self, seq):
+        self._v[:] = list(seq)
+
+
+def _array(values):
+    return bpy_prop_array(values)
+
+
+# RNA BASE -----------------------------------------------------------------------------------------------------------
+_pointer = [1000]
+
+
+class bpy_struct:
+    def __setattr__(self, key, value):
+        if self.__dict__.get("_frozen") and key not in self.__dict__ and not hasattr(type(self), key):
+            raise AttributeError("'{}' object has no attribute '{}'".format(type(self).__name__, key))
+        object.__setattr__(self, key, value)
+
+    def freeze(self):
+        self.__dict__["_frozen"] = True
+        return self
+
+    def as_pointer(self):
+        p = self.__dict__.get("_ptr")
+        if p is None:
+            _pointer[0] += 1
+            p = self.__dict__["_ptr"] = _pointer[0]
+        return p
+
+
+class bpy_prop_collection(bpy_struct):
+    def __init__(self):
+        self._items = []
+        self._names = {}  # name -> item, only for items added with _add()
+        self._suffixes = {}
+
+    def __iter__(self):
+        return iter(list(self._items))
+
+    def __len__(self):
+        return len(self._items)
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, slice)):
+            return self._items[key]
+        return self._names[key]
+
+    def __contains__(self, key):
+        return key in self._names
+
+    def get(self, key, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def keys(self):
+        return [i.name for i in self._items]
+
+    def values(self):
+        return list(self._items)
+
+    def items(self):
+        return [(i.name, i) for i in self._items]
+
+    def unique_name(self, name, item=None):
+        if self._names.get(name, item) is item:
+            return name
+        n = self._suffixes.get(name, 1)  # carry on from the last suffix given out instead of counting from .001
+        while self._names.get("{}.{:03d}".format(name, n), item) is not item:
+            n += 1
+        self._suffixes[name] = n + 1
+        return "{}.{:03d}".format(name, n)
+
+    def _add(self, item, name):
+        item._name = self.unique_name(name)
+        item._owner = self
+        self._items.append(item)
+        self._names[item._name] = item
+        return item
+
+    def _rename(self, item, name):
+        name = self.unique_name(name, item)
+        if self._names.get(item._name) is item:
+            del self._names[item._name]
+        item._name = name
+        self._names[name] = item
+
+    def remove(self, item, do_unlink=True):  # users aren't tracked, so there is nothing to unlink
+        self._items.remove(item)
+        if self._names.get(getattr(item, "_name", None)) is item:
+            del self._names[item._name]
+
+    def foreach_get(self, attr, seq):
+        out = []
+        for i in self._items:
+            v = getattr(i, attr)
+            out.extend(v if hasattr(v, "__len__") and not isinstance(v, str) else [v])
+        if len(seq) != len(out):
+            raise RuntimeError("internal error setting the array")
+        for n, v in enumerate(out):  # seq can be a buffer like array.array, which can't be assigned a list slice
+            seq[n] = v
+
+    def foreach_set(self, attr, seq):
+        seq = list(seq)
+        if not self._items:
+            return
+        first = getattr(self._items[0], attr)
+        width = len(first) if hasattr(first, "__len__") and not isinstance(first, str) else 1
+        if len(seq) != width * len(self._items):
+            raise RuntimeError("internal error setting the array")
+        for n, i in enumerate(self._items):
+            chunk = seq[n * width:(n + 1) * width]
+            setattr(i, attr, chunk if width > 1 else chunk[0])
+
+
+class _Named(bpy_struct):
+    _name = ""
+    _owner = None
+
+    @property
+    def name(self):
+        return self._name
+
+    @name.setter
+    def name(self, value):
+        if self._owner is not None:
+            self._owner._rename(self, value)
+        else:
+            self._name = value
+
+
+# DATA-BLOCKS --------------------------------------------------------------------------------------------------------
+class ID(_Named):
+    pass
+
+
+class Image(ID):
+    def __init__(self, filepath=""):
+        self.filepath = filepath
+        self.filepath_raw = filepath
+        self.source = "FILE"
+        self.packed_file = None
+
+    def pack(self, as_png=False):
+        with open(self.filepath, "rb") as file:
+            self.packed_file = file.read()
+
+
+class Texture(ID):
+    def __init__(self, type="NONE"):
+        self.type = type
+        self.use_nodes = False
+        self.node_tree = None
+
+    def __setattr__(self, key, value):
+        object.__setattr__(self, key, value)
+        if key == "use_nodes" and value and self.node_tree is None:
+            object.__setattr__(self, "node_tree", NodeTree("TextureNodeTree"))
+
+
+class Material(ID):
+    def __init__(self):
+        self.node_tree = None
+        self.active_texture = None
+        self.mitsuba_nodes = types.SimpleNamespace(nodetree="")
+
+    @property
+    def use_nodes(self):
+        return self.node_tree is not None
+
+    @use_nodes.setter
+    def use_nodes(self, value):
+        if value and self.node_tree is None:
+            self.node_tree = NodeTree("ShaderNodeTree")
+            out = self.node_tree.nodes.new("ShaderNodeOutputMaterial")
+            diff = self.node_tree.nodes.new("ShaderNodeBsdfDiffuse")
+            self.node_tree.links.new(diff.outputs[0], out.inputs[0])
+
+
+class Object(ID):
+    def __init__(self):
+        self.particle_systems = bpy_prop_collection()
+        self.active_material = None
+        self.data = types.SimpleNamespace(materials=[])
+
+
+# SOCKETS ------------------------------------------------------------------------------------------------------------
+class NodeSocket(bpy_struct):
+    bl_idname = "NodeSocket"
+
+    def __init__(self, node, name, identifier, is_output):
+        self.node = node
+        self.name = name
+        self.identifier = identifier
+        self.is_output = is_output
+        self.enabled = True
+        self.hide = False
+
+    def path_from_id(self):
+        coll = self.node.outputs if self.is_output else self.node.inputs
+        return 'nodes["{}"].{}[{}]'.format(self.node.name, "outputs" if self.is_output else "inputs",
+                                            coll._items.index(self))
+
+
+class NodeSocketFloat(NodeSocket):
+    bl_idname = "NodeSocketFloat"
+
+    def __init__(self, *args, default=0.0):
+        super().__init__(*args)
+        self.default_value = default
+
+
+class NodeSocketFloatFactor(NodeSocketFloat):
+    bl_idname = "NodeSocketFloatFactor"
+
+
+class NodeSocketColor(NodeSocket):
+    bl_idname = "NodeSocketColor"
+
+    def __init__(self, *args, default=(0.8, 0.8, 0.8, 1.0)):
+        super().__init__(*args)
+        self._default = _array(default)
+
+    @property
+    def default_value(self):
+        return self._default
+
+    @default_value.setter
+    def default_value(self, value):
+        self._default = _array(value)
+
+
+class NodeSocketVector(NodeSocketColor):
+    bl_idname = "NodeSocketVector"
+
+    def __init__(self, *args, default=(0.0, 0.0, 0.0)):
+        super().__init__(*args, default=default)
+
+
+class NodeSocketShader(NodeSocket):
+    bl_idname = "NodeSocketShader"
+
+
+class NodeSocketVirtual(NodeSocket):
+    bl_idname = "NodeSocketVirtual"
+
+
+SOCKET_TYPES = {c.bl_idname: c for c in (NodeSocketFloat, NodeSocketFloatFactor, NodeSocketColor, NodeSocketVector,
+                                         NodeSocketShader, NodeSocketVirtual)}
+
+
+class NodeSockets(bpy_prop_collection):
+    def __init__(self, node, is_output):
+        super().__init__()
+        self._node = node
+        self._is_output = is_output
+
+    def new(self, type, name, identifier=None, **kw):
+        s = SOCKET_TYPES[type](self._node, name, identifier or name, self._is_output, **kw)
+        self._items.append(s)
+        return s.freeze()
+
+    def __getitem__(self, key):
+        if isinstance(key, (int, slice)):
+            return self._items[key]
+        for i in self._items:
+            if i.name == key:
+                return i
+        raise KeyError(key)
+
+    def __contains__(self, key):
+        return any(i.name == key for i in self._items)
+
+
+# CURVES AND RAMPS ---------------------------------------------------------------------------------------------------
+class CurveMapPoint(bpy_struct):
+    def __init__(self, x, y):
+        self._location = _array((x, y))
+        self.handle_type = "AUTO"
+        self.select = False
+
+    @property
+    def location(self):
+        return self._location
+
+    @location.setter
+    def location(self, value):
+        self._location = _array(value)
+
+
+class CurveMapPoints(bpy_prop_collection):
+    def new(self, x, y):
+        p = CurveMapPoint(x, y)
+        self._items.append(p)
+        self._items.sort(key=lambda i: i.location[0])
+        return p
+
+
+class CurveMap(bpy_struct):
+    def __init__(self):
+        self.extend = "EXTRAPOLATED"
+        self.points = CurveMapPoints()
+        self.points.new(0.0, 0.0)
+        self.points.new(1.0, 1.0)
+
+
+class CurveMapping(bpy_struct):
+    def __init__(self, count=4):
+        self.black_level = _array((0.0, 0.0, 0.0))
+        self.white_level = _array((1.0, 1.0, 1.0))
+        self.clip_max_x = self.clip_max_y = 1.0
+        self.clip_min_x = self.clip_min_y = 0.0
+        self.use_clip = True
+        self.curves = bpy_prop_collection()
+        self.curves._items = [CurveMap() for _ in range(count)]
+
+    def update(self):
+        pass
+
+
+class ColorRampElement(bpy_struct):
+    def __init__(self, position, color):
+        self.position = position
+        self._color = _array(color)
+        self.alpha = color[3]
+
+    @property
+    def color(self):
+        return self._color
+
+    @color.setter
+    def color(self, value):
+        self._color = _array(value)
+
+
+class ColorRampElements(bpy_prop_collection):
+    def new(self, position):
+        e = ColorRampElement(position, (0.5, 0.5, 0.5, 1.0))
+        self._items.append(e)
+        self._items.sort(key=lambda i: i.position)
+        return e
+
+
+class ColorRamp(bpy_struct):
+    def __init__(self):
+        self.color_mode = "RGB"
+        self.interpolation = "LINEAR"
+        self.hue_interpolation = "NEAR"
+        self.elements = ColorRampElements()
+        self.elements._items = [ColorRampElement(0.0, (0.0, 0.0, 0.0, 1.0)),
+                                ColorRampElement(1.0, (1.0, 1.0, 1.0, 1.0))]
+
+
+class ParticleSystem(_Named):
+    pass
+
+
+# NODES --------------------------------------------------------------------------------------------------------------
+class Node(_Named):
+    bl_idname = "Node"
+    bl_label = "Node"
+    bl_icon = "NONE"
+    bl_description = ""
+    bl_rna = None
+    rna_type = None
+    type = "CUSTOM"
+
+    def __init__(self, tree):
+        self.id_data = tree
+        self.inputs = NodeSockets(self, False)
+        self.outputs = NodeSockets(self, True)
+        self._location = Vector((0.0, 0.0))
+        self.width = 140.0
+        self.height = 100.0
+        self.label = ""
+        self.hide = False
+        self.mute = False
+        self.select = True
+        self.show_options = True
+        self.show_preview = False
+        self.show_texture = False
+        self.use_custom_color = False
+        self._color = Color((0.608, 0.608, 0.608))
+        self.parent = None
+        self.init()
+
+    def init(self):
+        pass
+
+    @property
+    def location(self):
+        return self._location
+
+    @location.setter
+    def location(self, value):
+        self._location = Vector(value)
+
+    @property
+    def dimensions(self):
+        return Vector((self.width, self.height))
+
+    @property
+    def color(self):
+        return self._color
+
+    @color.setter
+    def color(self, value):
+        self._color = Color(value)
+
+    @property
+    def internal_links(self):
+        return []
+
+    def draw_buttons(self, context, layout):
+        pass
+
+    def socket_value_update(self, context):
+        pass
+
+    def update(self):
+        pass
+
+    @classmethod
+    def poll(cls, ntree):
+        return True
+
+
+class NodeFrame(Node):
+    bl_idname = "NodeFrame"
+
+    def init(self):
+        self.shrink = True
+        self.label_size = 20
+
+
+class NodeReroute(Node):
+    bl_idname = "NodeReroute"
+
+    def init(self):
+        self.inputs.new("NodeSocketColor", "Input")
+        self.outputs.new("NodeSocketColor", "Output")
+
+
+class NodeGroupInput(Node):
+    bl_idname = "NodeGroupInput"
+
+    def init(self):
+        for s in self.id_data.inputs:
+            self.outputs.new(s.bl_idname, s.name, s.identifier)
+        self.outputs.new("NodeSocketVirtual", "", "__extend__")
+
+
+class NodeGroupOutput(Node):
+    bl_idname = "NodeGroupOutput"
+
+    def init(self):
+        self.is_active_output = True
+        for s in self.id_data.outputs:
+            self.inputs.new(s.bl_idname, s.name, s.identifier)
+        self.inputs.new("NodeSocketVirtual", "", "__extend__")
+
+
+class ShaderNode(Node):
+    pass
+
+
+class ShaderNodeMath(ShaderNode):
+    bl_idname = "ShaderNodeMath"
+
+    def init(self):
+        self.operation = "ADD"
+        self.use_clamp = False
+        self.inputs.new("NodeSocketFloat", "Value", "Value", default=0.5)
+        self.inputs.new("NodeSocketFloat", "Value", "Value_001", default=0.5)
+        self.outputs.new("NodeSocketFloat", "Value", "Value")
+
+
+class ShaderNodeMixRGB(ShaderNode):
+    bl_idname = "ShaderNodeMixRGB"
+
+    def init(self):
+        self.blend_type = "MIX"
+        self.use_alpha = False
+        self.use_clamp = False
+        self.inputs.new("NodeSocketFloatFactor", "Fac", "Fac", default=0.5)
+        self.inputs.new("NodeSocketColor", "Color1", "Color1", default=(0.5, 0.5, 0.5, 1.0))
+        self.inputs.new("NodeSocketColor", "Color2", "Color2", default=(0.5, 0.5, 0.5, 1.0))
+        self.outputs.new("NodeSocketColor", "Color", "Color")
+
+
+class ShaderNodeBsdfDiffuse(ShaderNode):
+    bl_idname = "ShaderNodeBsdfDiffuse"
+
+    def init(self):
+        self.inputs.new("NodeSocketColor", "Color", "Color")
+        self.inputs.new("NodeSocketFloat", "Roughness", "Roughness", default=0.0)
+        self.inputs.new("NodeSocketVector", "Normal", "Normal")
+        self.outputs.new("NodeSocketShader", "BSDF", "BSDF")
+
+
+class ShaderNodeMapping(ShaderNode):
+    bl_idname = "ShaderNodeMapping"
+
+    def init(self):
+        self.translation = Vector((0.0, 0.0, 0.0))
+        self.rotation = Euler((0.0, 0.0, 0.0))
+        self.scale = Vector((1.0, 1.0, 1.0))
+        self.use_min = False
+        self.use_max = False
+        self.inputs.new("NodeSocketVector", "Vector", "Vector")
+        self.outputs.new("NodeSocketVector", "Vector", "Vector")
+
+
+class ShaderNodeOutputMaterial(ShaderNode):
+    bl_idname = "ShaderNodeOutputMaterial"
+
+    def init(self):
+        self.is_active_output = True
+        self.inputs.new("NodeSocketShader", "Surface", "Surface")
+        self.inputs.new("NodeSocketShader", "Volume", "Volume")
+        self.inputs.new("NodeSocketVector", "Displacement", "Displacement")
+
+
+class ShaderNodeTexImage(ShaderNode):
+    bl_idname = "ShaderNodeTexImage"
+
+    def init(self):
+        self.image = None
+        self.interpolation = "Linear"
+        self.projection = "FLAT"
+        self.extension = "REPEAT"
+        self.inputs.new("NodeSocketVector", "Vector", "Vector")
+        self.outputs.new("NodeSocketColor", "Color", "Color")
+        self.outputs.new("NodeSocketFloat", "Alpha", "Alpha")
+
+
+class ShaderNodeValToRGB(ShaderNode):
+    bl_idname = "ShaderNodeValToRGB"
+
+    def init(self):
+        self.color_ramp = ColorRamp()
+        self.inputs.new("NodeSocketFloatFactor", "Fac", "Fac", default=0.5)
+        self.outputs.new("NodeSocketColor", "Color", "Color")
+        self.outputs.new("NodeSocketFloat", "Alpha", "Alpha")
+
+
+class ShaderNodeRGBCurve(ShaderNode):
+    bl_idname = "ShaderNodeRGBCurve"
+
+    def init(self):
+        self.mapping = CurveMapping()
+        self.inputs.new("NodeSocketFloatFactor", "Fac", "Fac", default=1.0)
+        self.inputs.new("NodeSocketColor", "Color", "Color")
+        self.outputs.new("NodeSocketColor", "Color", "Color")
+
+
+class ShaderNodeGroup(ShaderNode):
+    bl_idname = "ShaderNodeGroup"
+
+    def init(self):
+        self._node_tree = None
+
+    @property
+    def node_tree(self):
+        return self._node_tree
+
+    @node_tree.setter
+    def node_tree(self, tree):
+        self._node_tree = tree
+        self.inputs._items, self.outputs._items = [], []
+        if tree is not None:
+            for s in tree.inputs:
+                self.inputs.new(s.bl_idname, s.name, s.identifier)
+            for s in tree.outputs:
+                self.outputs.new(s.bl_idname, s.name, s.identifier)
+
+
+class TextureNodeCurveTime(Node):
+    bl_idname = "TextureNodeCurveTime"
+
+
+class TextureNodeGroup(ShaderNodeGroup):
+    bl_idname = "TextureNodeGroup"
+
+
+NODE_TYPES = {}
+
+
+def register_node_class(cls):
+    NODE_TYPES[cls.bl_idname] = cls
+    setattr(types_module, cls.bl_idname, cls)
+    return cls
+
+
+# TREES --------------------------------------------------------------------------------------------------------------
+class Nodes(bpy_prop_collection):
+    def __init__(self, tree):
+        super().__init__()
+        self._tree = tree
+
+    def new(self, type):
+        try:
+            cls = NODE_TYPES[type]
+        except KeyError:
+            raise RuntimeError("Node type {} undefined".format(type))
+        node = cls.__new__(cls)
+        self._add(node, type.replace("ShaderNode", "").replace("Node", "") or type)
+        node.__init__(self._tree)
+        return node.freeze()
+
+    def remove(self, node):
+        bpy_prop_collection.remove(self, node)
+        links = self._tree.links
+        links._items = [l for l in links._items if l.from_node is not node and l.to_node is not node]
+
+
+class Link(bpy_struct):
+    def __init__(self, from_socket, to_socket):
+        self.from_socket, self.to_socket = from_socket, to_socket
+        self.from_node, self.to_node = from_socket.node, to_socket.node
+        self.is_valid = True
+
+
+class Links(bpy_prop_collection):
+    def new(self, output, input):
+        link = Link(output, input)
+        self._items.append(link)
+        return link
+
+
+class TreeSockets(bpy_prop_collection):
+    def __init__(self, tree, is_output):
+        super().__init__()
+        self._tree = tree
+        self._is_output = is_output
+
+    def new(self, type, name):
+        s = SOCKET_TYPES[type](None, name, "{}_{}".format(name, len(self._items)), False)
+        self._items.append(s)
+        # interface nodes of the tree grow a matching socket, in front of the virtual one
+        for node in self._tree.nodes:
+            if node.bl_idname == ("NodeGroupOutput" if self._is_output else "NodeGroupInput"):
+                sockets = node.inputs if self._is_output else node.outputs
+                sockets.new(type, name, s.identifier)
+                sockets._items.insert(len(sockets._items) - 2, sockets._items.pop())
+        return s
+
+
+class NodeTree(ID):
+    def __init__(self, bl_idname):
+        self.bl_idname = bl_idname
+        self.nodes = Nodes(self)
+        self.links = Links()
+        self.inputs = TreeSockets(self, False)
+        self.outputs = TreeSockets(self, True)
+        self.users = 1
+        self.use_fake_user = False
+
+
+class ShaderNodeTree(NodeTree):
+    pass
+
+
+class TextureNodeTree(NodeTree):
+    pass
+
+
+# BPY.DATA -----------------------------------------------------------------------------------------------------------
+class _Datablocks(bpy_prop_collection):
+    def __init__(self, factory):
+        super().__init__()
+        self._factory = factory
+
+    def new(self, name, *args, **kw):
+        item = self._factory(*args, **kw)
+        return self._add(item, name)
+
+
+class _NodeGroups(_Datablocks):
+    def new(self, name, type):
+        return self._add(NodeTree(type), name)
+
+
+class _Images(_Datablocks):
+    def load(self, filepath, check_existing=False):
+        if not path.exists(filepath):
+            raise RuntimeError("Error: Cannot read file '{}'".format(filepath))
+        return self._add(Image(filepath), path.basename(filepath))
+
+    def new(self, name, width, height, **kw):
+        return self._add(Image(""), name)
+
+
+class BlendData:
+    def __init__(self):
+        self.materials = _Datablocks(Material)
+        self.node_groups = _NodeGroups(None)
+        self.textures = _Datablocks(Texture)
+        self.images = _Images(None)
+        self.objects = _Datablocks(Object)
+        self.filepath = ""
+
+
+# CONTEXT ------------------------------------------------------------------------------------------------------------
+class Scene(bpy_struct):
+    pass
+
+
+def _prop(default=None, **kw):
+    if default is None and "items" in kw:
+        default = kw["items"][0][0]
+    return ("__prop__", default, kw)
+
+
+class _Props(types.ModuleType):
+    pass
+
+
+def make_context(data):
+    scene = Scene()
+    for key in dir(Scene):
+        val = getattr(Scene, key)
+        if isinstance(val, tuple) and val and val[0] == "__prop__":
+            default = val[1]
+            if default is None:
+                default = {"StringProperty": "", "BoolProperty": False, "IntProperty": 0,
+                           "FloatProperty": 0.0}.get(val[2].get("_kind"), "")
+            if val[2].get("options") and "ENUM_FLAG" in val[2]["options"] and isinstance(default, str):
+                default = {default}
+            setattr(scene, key, default)
+    scene.render = types.SimpleNamespace(engine="CYCLES")
+    scene.frame_current = 1
+    ctx = types.SimpleNamespace(scene=scene, space_data=types.SimpleNamespace(node_tree=None),
+                                active_object=None, object=None, window=None,
+                                window_manager=types.SimpleNamespace(), blend_data=data)
+    return ctx
+
+
+class Operator:
+    def __init__(self):
+        self.reports = []
+
+    def report(self, kind, message):
+        self.reports.append((sorted(kind)[0], message))
+
+
+class Panel:
+    pass
+
+
+class AddonPreferences:
+    pass
+
+
+class UIList:
+    pass
+
+
+# INSTALL ------------------------------------------------------------------------------------------------------------
+types_module = types.ModuleType("bpy.types")
+
+
+# register the stand-in as bpy and mathutils in sys.modules, returns the bpy module
+def install():
+    if "bpy" in sys.modules and getattr(sys.modules["bpy"], "__standin__", False):
+        return sys.modules["bpy"]
+
+    bpy = types.ModuleType("bpy")
+    bpy.__standin__ = True
+    mathutils = types.ModuleType("mathutils")
+    for cls in (Vector, Color, Euler, Quaternion):
+        setattr(mathutils, cls.__name__, cls)
+    mathutils.__all__ = ["Vector", "Color", "Euler", "Quaternion"]
+
+    for name, obj in list(globals().items()):
+        if isinstance(obj, type) and obj.__module__ == __name__ and not name.startswith("_"):
+            setattr(types_module, name, obj)
+    types_module.bpy_prop_array = bpy_prop_array
+    types_module.bpy_struct = bpy_struct
+    types_module.bpy_prop_collection = bpy_prop_collection
+    for cls in (NodeFrame, NodeReroute, NodeGroupInput, NodeGroupOutput, ShaderNodeMath, ShaderNodeMixRGB,
+                ShaderNodeBsdfDiffuse, ShaderNodeMapping, ShaderNodeOutputMaterial, ShaderNodeTexImage,
+                ShaderNodeValToRGB, ShaderNodeRGBCurve, ShaderNodeGroup, TextureNodeCurveTime, TextureNodeGroup):
+        register_node_class(cls)
+
+    props = types.ModuleType("bpy.props")
+    for kind in ("StringProperty", "EnumProperty", "BoolProperty", "IntProperty", "FloatProperty"):
+        def factory(kind=kind, **kw):
+            kw["_kind"] = kind
+            return _prop(kw.pop("default", None), **kw)
+        setattr(props, kind, factory)
+
+    bpy.types = types_module
+    bpy.props = props
+    bpy.data = BlendData()
+    bpy.path = types.SimpleNamespace(abspath=lambda p: path.abspath(p) if p else p,
+                                     basename=path.basename,
+                                     display_name_from_filepath=lambda p: path.splitext(path.basename(p))[0])
+    bpy.utils = types.SimpleNamespace(register_module=lambda name: None, unregister_module=lambda name: None,
+                                      register_class=lambda cls: None, unregister_class=lambda cls: None)
+    bpy.app = types.SimpleNamespace(background=True, version=(2, 79, 0),
+                                    handlers=types.SimpleNamespace(load_post=[], load_pre=[], undo_pre=[],
+                                                                   undo_post=[], redo_post=[],
+                                                                   scene_update_post=[], persistent=lambda f: f))
+    bpy.context = types.SimpleNamespace(user_preferences=types.SimpleNamespace(addons={}))
+    bpy.ops = types.SimpleNamespace()
+
+    sys.modules["bpy"] = bpy
+    sys.modules["bpy.types"] = types_module
+    sys.modules["bpy.props"] = props
+    sys.modules["mathutils"] = mathutils
+    return bpy
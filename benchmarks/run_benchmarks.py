@@ -0,0 +1,222 @@
+# NodeIO benchmarks: collect_nodes, link_info, export and import of synthetic node trees, for each file format and
+# node layout. Reports nodes per second, bytes per node and peak memory
+#
+#   python benchmarks/run_benchmarks.py --sizes 10,1000,100000
+#   blender --background --factory-startup --python benchmarks/run_benchmarks.py -- --sizes 10,1000
+#
+# Outside Blender the bpy stand-in in this folder is used, --blender also runs the same benchmarks in headless Blender.
+# Peak memory comes from tracemalloc, so in Blender it only counts memory allocated by Python
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+import tracemalloc
+from os import path, listdir, mkdir, environ
+from time import perf_counter
+
+HERE = path.dirname(path.abspath(__file__))
+sys.path.insert(0, HERE)
+sys.path.insert(0, path.dirname(HERE))
+
+try:
+    import bpy
+    IN_BLENDER = True
+except ImportError:
+    import bpy_standin
+    bpy = bpy_standin.install()
+    IN_BLENDER = False
+
+import io_node
+import synthetic
+
+FORMATS = {"json": "1", "binary": "2"}
+LAYOUTS = {"rows": False, "columnar": True}
+
+
+def make_context(material, export_path, args):
+    if IN_BLENDER:
+        scene = bpy.context.scene
+        scene.render.engine = "CYCLES"
+    else:
+        scene = bpy_standin.make_context(bpy.data).scene
+
+    scene.node_io_export_path = export_path
+    scene.node_io_export_type = "1"
+    scene.node_io_dependency_save_type = "1"
+    scene.node_io_is_compress = False
+    scene.node_io_is_incremental = False
+    scene.node_io_is_timing = False
+    scene.node_io_is_auto_add = False
+    scene.node_io_import_type = "1"
+    scene.node_io_precision = args.precision.upper()
+    scene.node_io_is_packed = args.packed
+
+    node_tree = material.node_tree if material is not None else None
+    obj = type("Object", (), {"active_material": material})()
+    return type("Context", (), {"scene": scene, "space_data": type("Space", (), {"node_tree": node_tree})(),
+                                "active_object": obj, "object": None})()
+
+
+# run func, returns (seconds, peak bytes or None, result)
+def measure(func, memory):
+    if memory:
+        tracemalloc.start()
+    start = perf_counter()
+    result = func()
+    seconds = perf_counter() - start
+    peak = None
+    if memory:
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return seconds, peak, result
+
+
+def collect(tree):
+    writer = io_node.BufferWriter()
+    try:
+        io_node.collect_nodes(tree.nodes, tree.links, [], "main", writer, elide=True, cache={})
+    finally:
+        io_node.remove_scratch_trees()
+    return writer.node_count
+
+
+def link_infos(tree):
+    socket_index = {}
+    for node in tree.nodes:
+        for i, socket in enumerate(node.inputs):
+            socket_index[socket.as_pointer()] = i
+        for i, socket in enumerate(node.outputs):
+            socket_index[socket.as_pointer()] = i
+
+    start = perf_counter()
+    for link in tree.links:
+        io_node.link_info(link, socket_index)
+    return perf_counter() - start
+
+
+def run_size(size, args, results):
+    synthetic.clear(bpy)
+    folder = tempfile.mkdtemp(prefix="nodeio_bench_")
+    image_path = path.join(folder, "bench.png")
+    synthetic.write_png(image_path)
+    material = synthetic.build_material(bpy, size, image_path, args.depth, args.ramp_size, args.curve_points,
+                                        args.links_per_node)
+    tree = material.node_tree
+    node_count = len(tree.nodes)
+    link_count = len(tree.links)
+
+    def add(phase, seconds, peak, fmt="-", layout="-", count=node_count, file_size=None):
+        results.append({"size": size, "nodes": node_count, "links": link_count, "phase": phase, "format": fmt,
+                        "layout": layout, "seconds": seconds, "per_second": count / seconds if seconds else None,
+                        "bytes_per_node": file_size / node_count if file_size is not None else None,
+                        "peak_bytes": peak, "blender": IN_BLENDER})
+        print_result(results[-1])
+
+    seconds, peak, collected = measure(lambda: collect(tree), args.memory)
+    add("collect_nodes", seconds, peak, count=collected)
+    add("link_info", link_infos(tree), None, count=link_count)
+
+    # export every format and layout while the tree exists, then import each into an empty .blend
+    files = []
+    try:
+        for fmt in args.formats:
+            for layout in args.layouts:
+                export_path = path.join(folder, "{}_{}".format(fmt, layout))
+                mkdir(export_path)
+                context = make_context(material, export_path, args)
+                context.scene.node_io_export_format = FORMATS[fmt]
+                context.scene.node_io_is_columnar = LAYOUTS[layout]
+
+                reporter = io_node.Reporter()
+                seconds, peak, _ = measure(lambda: io_node.export_node_tree(reporter, context), args.memory)
+                if reporter.errors():
+                    raise RuntimeError("; ".join(reporter.errors()))
+
+                file_path = path.join(export_path, listdir(export_path)[0])
+                add("export", seconds, peak, fmt, layout, file_size=path.getsize(file_path))
+                files.append([fmt, layout, file_path])
+
+        for fmt, layout, file_path in files:
+            synthetic.clear(bpy)
+            context = make_context(None, "", args)
+            context.scene.node_io_import_path_file = file_path
+
+            reporter = io_node.Reporter()
+            seconds, peak, _ = measure(lambda: io_node.import_node_tree(reporter, context), args.memory)
+            if reporter.errors():
+                raise RuntimeError("; ".join(reporter.errors()))
+            add("import", seconds, peak, fmt, layout, file_size=path.getsize(file_path))
+    finally:
+        shutil.rmtree(folder, ignore_errors=True)
+        synthetic.clear(bpy)
+
+
+def print_result(result):
+    print("{:>8} {:<14} {:<7} {:<9} {:>9.3f}s {:>12} {:>10} {:>10}".format(
+        result["nodes"], result["phase"], result["format"], result["layout"], result["seconds"],
+        "{:.0f}/s".format(result["per_second"]) if result["per_second"] else "-",
+        "{:.1f}B".format(result["bytes_per_node"]) if result["bytes_per_node"] is not None else "-",
+        "{:.1f}MB".format(result["peak_bytes"] / 1e6) if result["peak_bytes"] is not None else "-"))
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Benchmark NodeIO on synthetic node trees")
+    parser.add_argument("--sizes", default="10,100,1000,10000", help="comma separated node counts, up to 100000")
+    parser.add_argument("--formats", default="json,binary", help="comma separated, json and/or binary")
+    parser.add_argument("--layouts", default="rows,columnar", help="comma separated, rows and/or columnar")
+    parser.add_argument("--depth", type=int, default=3, help="levels of nested node groups")
+    parser.add_argument("--ramp-size", type=int, default=8, help="color ramp elements, at most 32 in Blender")
+    parser.add_argument("--curve-points", type=int, default=8, help="points per RGB curve")
+    parser.add_argument("--links-per-node", type=float, default=1.5)
+    parser.add_argument("--precision", choices=("decimals", "float32", "float16"), default="decimals")
+    parser.add_argument("--packed", action="store_true", help="write curves and ramps as packed buffers")
+    parser.add_argument("--no-memory", dest="memory", action="store_false",
+                        help="skip tracemalloc, which slows everything down")
+    parser.add_argument("--json", help="also write the results to this file")
+    parser.add_argument("--blender", nargs="?", const=environ.get("BLENDER", "blender"),
+                        help="also run in headless Blender, found on PATH or through $BLENDER if not given")
+
+    args = parser.parse_args(argv)
+    args.sizes = [int(i) for i in args.sizes.split(",")]
+    args.formats = [i for i in args.formats.split(",") if i in FORMATS]
+    args.layouts = [i for i in args.layouts.split(",") if i in LAYOUTS]
+    return args
+
+
+def run_in_blender(blender, argv):
+    argv = [i for i in argv if not i.startswith("--blender")]
+    if "--json" in argv:  # Blender's results go next to the stand-in's
+        i = argv.index("--json") + 1
+        argv[i] = path.splitext(argv[i])[0] + "_blender.json"
+
+    print("\nheadless Blender ({})".format(blender))
+    try:
+        subprocess.check_call([blender, "--background", "--factory-startup", "--python", path.abspath(__file__),
+                               "--"] + argv)
+    except (OSError, subprocess.CalledProcessError) as e:
+        print("couldn't run Blender, {}".format(e))
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    args = parse_args(argv)
+
+    print("{} {}".format("Blender" if IN_BLENDER else "bpy stand-in, Python", sys.version.split()[0]))
+    print("{:>8} {:<14} {:<7} {:<9} {:>10} {:>12} {:>10} {:>10}".format("nodes", "phase", "format", "layout",
+                                                                        "time", "rate", "per node", "peak"))
+    results = []
+    for size in args.sizes:
+        run_size(size, args, results)
+
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(results, file, indent=4)
+
+    if args.blender and not IN_BLENDER:
+        run_in_blender(args.blender, argv)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+# synthetic shader node trees for the benchmarks, built only from node types both Blender 2.79 and bpy_standin have
+import random
+import struct
+import zlib
+
+# node types the main tree cycles through, group nodes and frames are added separately
+NODE_TYPES = ("ShaderNodeMath", "ShaderNodeMath", "ShaderNodeMixRGB", "ShaderNodeMapping", "ShaderNodeValToRGB",
+              "ShaderNodeRGBCurve", "ShaderNodeTexImage")
+
+# the material and node groups are named after this so they don't collide with anything else in the .blend
+PREFIX = "NodeIO Bench"
+
+
+# a chain of math nodes inside a group with one float input and output, containing the group of the level below
+def build_group(bpy, level, inner):
+    group = bpy.data.node_groups.new("{} Group {}".format(PREFIX, level), "ShaderNodeTree")
+    group.inputs.new("NodeSocketFloat", "Value")
+    group.outputs.new("NodeSocketFloat", "Value")
+    group_input = group.nodes.new("NodeGroupInput")
+    group_output = group.nodes.new("NodeGroupOutput")
+
+    last = group_input.outputs[0]
+    for i in range(4):
+        node = group.nodes.new("ShaderNodeMath")
+        node.operation = ("ADD", "MULTIPLY", "POWER", "MAXIMUM")[i]
+        node.inputs[1].default_value = 0.25 * (i + 1)
+        node.location = (200 * (i + 1), 0)
+        group.links.new(last, node.inputs[0])
+        last = node.outputs[0]
+
+    if inner is not None:
+        node = group.nodes.new("ShaderNodeGroup")
+        node.node_tree = inner
+        group.links.new(last, node.inputs[0])
+        last = node.outputs[0]
+
+    group.links.new(last, group_output.inputs[0])
+    return group
+
+
+# a tiny valid .png for image texture nodes, so the image is a real dependency of the exported file
+def write_png(file_path):
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xffffffff)
+
+    with open(file_path, "wb") as file:
+        file.write(b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", struct.pack(">IIBBBBB", 1, 1, 8, 2, 0, 0, 0)) +
+                   chunk(b"IDAT", zlib.compress(b"\x00\xff\x80\x00")) + chunk(b"IEND", b""))
+
+
+# a material with about node_count nodes: depth nested node groups used by every 50th node, color ramps with
+# ramp_size elements, RGB curves with curve_points points per curve, and roughly links_per_node links per node.
+# Image texture nodes use the .png at image_path
+def build_material(bpy, node_count, image_path, depth=3, ramp_size=8, curve_points=8, links_per_node=1.5, seed=0):
+    rng = random.Random(seed)
+
+    group = None
+    for level in range(depth):
+        group = build_group(bpy, level, group)
+
+    image = bpy.data.images.load(image_path)
+    image.name = "{} Image".format(PREFIX)
+
+    material = bpy.data.materials.new("{} {}".format(PREFIX, node_count))
+    material.use_nodes = True
+    tree = material.node_tree
+    for node in list(tree.nodes):
+        tree.nodes.remove(node)
+
+    frames = []
+    nodes = []
+    for i in range(node_count):
+        if i % 200 == 0:
+            frame = tree.nodes.new("NodeFrame")
+            frame.label = "Frame {}".format(len(frames))
+            frames.append(frame)
+            continue
+
+        if group is not None and i % 50 == 0:
+            node = tree.nodes.new("ShaderNodeGroup")
+            node.node_tree = group
+        else:
+            node = tree.nodes.new(NODE_TYPES[i % len(NODE_TYPES)])
+            fill_node(node, rng, ramp_size, curve_points, image)
+
+        node.location = (300 * (i % 40), -200 * (i // 40))
+        if i % 3 == 0:
+            node.parent = frames[-1]
+        nodes.append(node)
+
+    # a chain through every node, then random links forward so there are no cycles
+    sockets = [[s for s in node.outputs if s.enabled] for node in nodes]
+    targets = [[s for s in node.inputs if s.enabled] for node in nodes]
+    for i in range(1, len(nodes)):
+        if sockets[i - 1] and targets[i]:
+            tree.links.new(sockets[i - 1][0], targets[i][0])
+
+    for i in range(int(len(nodes) * (links_per_node - 1))):
+        a = rng.randrange(len(nodes) - 1)
+        b = rng.randrange(a + 1, len(nodes))
+        if sockets[a] and targets[b]:
+            tree.links.new(rng.choice(sockets[a]), rng.choice(targets[b]))
+
+    return material
+
+
+def fill_node(node, rng, ramp_size, curve_points, image):
+    if node.bl_idname == "ShaderNodeMath":
+        node.operation = rng.choice(("ADD", "SUBTRACT", "MULTIPLY", "DIVIDE", "POWER"))
+        node.inputs[1].default_value = rng.random()
+    elif node.bl_idname == "ShaderNodeMixRGB":
+        node.blend_type = rng.choice(("MIX", "ADD", "MULTIPLY", "SCREEN"))
+        node.inputs[1].default_value = (rng.random(), rng.random(), rng.random(), 1.0)
+    elif node.bl_idname == "ShaderNodeMapping":
+        node.translation = (rng.random(), rng.random(), rng.random())
+        node.scale = (2.0, 2.0, 2.0)
+    elif node.bl_idname == "ShaderNodeValToRGB":
+        elements = node.color_ramp.elements
+        for i in range(ramp_size - len(elements)):
+            elements.new((i + 1) / ramp_size).color = (rng.random(), rng.random(), rng.random(), 1.0)
+    elif node.bl_idname == "ShaderNodeRGBCurve":
+        for curve in node.mapping.curves:
+            for i in range(curve_points - len(curve.points)):
+                curve.points.new((i + 0.5) / curve_points, rng.random())
+    elif node.bl_idname == "ShaderNodeTexImage":
+        node.image = image
+
+
+# remove everything build_material() created, so runs don't pile up datablocks
+def clear(bpy):
+    for collection in (bpy.data.materials, bpy.data.node_groups, bpy.data.images):
+        for item in list(collection):
+            if item.name.startswith(PREFIX):
+                collection.remove(item)
@@ -1,7 +1,7 @@
 bl_info = {
     "name": "NodeIO",
     "author": "Jacob Morris",
-    "version": (0, 6, 0),
+    "version": (0, 7, 0),
     "blender": (2, 79, 0),
     "location": "Node Editor > Properties",
     "description": "Allows The Exporting And Importing Of Node Trees Via .bnodes Files",
@@ -22,32 +22,445 @@ bl_info = {
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import bpy
-from bpy.props import StringProperty, EnumProperty, BoolProperty
+from bpy.props import StringProperty, EnumProperty, BoolProperty, IntProperty
 from datetime import datetime
-from time import tzname
+from time import tzname, perf_counter, sleep
 import operator
 from inspect import getmembers
-from os import path, mkdir, listdir, walk, remove as remove_file, sep as os_file_sep
-from shutil import copyfile, rmtree
+from os import path, mkdir, makedirs, listdir, walk, stat, getpid, replace as replace_file, remove as remove_file, \
+    sep as os_file_sep
+from shutil import copy2, copyfileobj
+from tempfile import SpooledTemporaryFile
+import sys
+from array import array
+import hashlib
 import zipfile
+import math
+import base64
 from mathutils import *
 import json
-
-VERSION = (0, 6, 0)
+import struct
+from struct import unpack_from
+import io
+from concurrent.futures import ThreadPoolExecutor
+from collections import OrderedDict
+from threading import Lock
+
+try:
+    import numpy
+except ImportError:  # foreach_get() and foreach_set() use array.array buffers instead
+    numpy = None
+try:
+    import sqlite3
+except ImportError:  # not every Python build has it, the library index is unavailable without it
+    sqlite3 = None
+
+VERSION = (0, 7, 0)
 DEBUG_FILE = False  # makes JSON file more human readable at the cost of file-size
-ROUND = 4
+ROUND = 4  # decimal places floats are rounded to unless the export says otherwise
+IMPORT_THREADS = 8  # most files read and decoded at once when importing a folder or .zip
+COPY_THREADS = 4  # most dependencies copied at once when making paths relative
+IMPORT_CHUNK = 200  # nodes created between the progress updates of an import
+COLLECT_CHUNK = 200  # nodes collected between the progress updates of an export
+JOB_SLICE = 0.05  # seconds of work the modal export and import do per timer tick, so Blender stays responsive
+JOB_TICK = 0.01  # seconds between timer ticks
+SPOOL_SIZE = 32 * 1024 * 1024  # files that have to be spooled before going into a .zip stay in memory up to this size
+FILE_CACHE_SIZE = 256 * 1024 * 1024  # default memory decoded .bnodes files are kept in between imports
+
+# library index, a SQLite file in the library folder holding the __info__ of every .bnodes file below it
+INDEX_FILE_NAME = ".bnodes_index.sqlite"
+INDEX_VERSION = 1
+LIBRARY_RESULTS = 50  # most index results listed in the import panel
+
+# hashes of the node trees last exported into a folder or .zip, so unchanged trees can be skipped on re-export
+MANIFEST_FILE_NAME = ".bnodes_manifest.json"
+MANIFEST_VERSION = 1
+
+# shared asset store, images exported with "Shared Asset Store" paths are kept once in this folder of the export path,
+# named after the sha1 of their content. Its index remembers the hash of each source file by mtime and size, so
+# unchanged images aren't read again
+ASSET_STORE_NAME = "node_io_assets"
+ASSET_INDEX_NAME = "index.json"
+ASSET_INDEX_VERSION = 1
+ASSET_INDEX_LOCK_WAIT = 10  # seconds to wait for another export saving the index before taking over its lock
+
+SUPPORTED_TREES = ("ShaderNodeTree", "MitsubaShaderNodeTree", "an_AnimationNodeTree", "SverchCustomTreeType",
+                   "TextureNodeTree")
+
+# what a file needs its reader to understand beyond the plain JSON rows 0.6.0 wrote, kept in __info__['features'] so
+# files using something this version doesn't know are rejected before any of their groups are read
+FILE_FEATURES = ("binary", "columnar", "packed")
+
+# binary .bnodes files start with a fixed header: magic, format version, flags, string table offset, __info__ offset
+BINARY_MAGIC = b"\x89BNODES\n"
+BINARY_VERSION = 1
+BINARY_HEADER = struct.Struct("<8sHHQQ")
+FLAG_DIRECTORY = 1  # a group directory, (name, offset, length) per group, follows the string table
+
+# value tags used by the binary encoding
+TAG_NONE, TAG_FALSE, TAG_TRUE, TAG_INT, TAG_FLOAT, TAG_STRING, TAG_STRING_REF, TAG_LIST, TAG_DICT, TAG_FLOATS, \
+    TAG_HALFS = range(11)
+
+# how exported floats are quantized, set for each export by set_float_format(). precision is "DECIMALS" (rounded to
+# decimals places), "FLOAT32" (every digit a float32 has) or "FLOAT16". packed writes curve points and color ramp
+# elements as one PackedFloats buffer each
+float_format = {"precision": "DECIMALS", "decimals": ROUND, "packed": False}
+
+
+def round_decimals(val):
+    return round(val, float_format['decimals'])
+
+
+def round_float32(val):
+    return float("{:.9g}".format(val))  # 9 significant digits always give the same float32 back
+
+
+def round_float16(val):
+    if numpy is not None:
+        return float(numpy.float16(val))
+    if math.isinf(val) or math.isnan(val):
+        return val
+
+    mantissa, exponent = math.frexp(val)
+    bits = 11 if exponent >= -13 else max(exponent + 24, 0)  # 11 significant bits, fewer below 2 ** -14
+    val = math.ldexp(round(math.ldexp(mantissa, bits)), exponent - bits)
+    return val if abs(val) <= 65504 else math.copysign(math.inf, val)
+
+
+def half_to_float(half):
+    sign = -1.0 if half & 0x8000 else 1.0
+    exponent, fraction = (half >> 10) & 0x1f, half & 0x3ff
+    if exponent == 0:
+        return sign * math.ldexp(fraction, -24)
+    elif exponent == 31:
+        return sign * math.inf if not fraction else math.nan
+    return sign * math.ldexp(fraction + 1024, exponent - 25)
+
+
+quantize = round_decimals  # the rounding function of the current float_format
+
+
+def set_float_format(precision, decimals, packed):
+    global quantize
+    new_format = {"precision": precision, "decimals": decimals, "packed": packed}
+    if new_format != float_format:
+        float_format.update(new_format)
+        node_defaults.clear()  # collected with the old format, so they wouldn't compare equal
+    quantize = {"FLOAT32": round_float32, "FLOAT16": round_float16}.get(precision, round_decimals)
+
+
+class PackedFloats:
+    # a flat list of floats written as one little-endian buffer, {"<f4": base64} or {"<f2": base64} in JSON files and
+    # raw in binary ones. Decoding a file turns it back into a list
+
+    def __init__(self, values, half=False):
+        if half and numpy is not None:
+            self.dtype, self.data = "<f2", numpy.array(values, dtype="<f2").tobytes()
+        elif half and sys.version_info >= (3, 6):  # struct only has float16 from Python 3.6
+            self.dtype, self.data = "<f2", struct.pack("<{}e".format(len(values)), *values)
+        else:
+            self.dtype, self.data = "<f4", struct.pack("<{}f".format(len(values)), *values)
+
+    def __eq__(self, other):
+        return isinstance(other, PackedFloats) and self.dtype == other.dtype and self.data == other.data
+
+
+def pack_floats(values):
+    return PackedFloats(values, float_format['precision'] == "FLOAT16")
+
+
+def unpack_floats(dtype, data):
+    if dtype == "<f2":
+        if numpy is not None:
+            return numpy.frombuffer(data, dtype="<f2").astype(numpy.float64).tolist()
+        elif sys.version_info >= (3, 6):
+            return list(struct.unpack("<{}e".format(len(data) // 2), data))
+        return [half_to_float(i) for i in struct.unpack("<{}H".format(len(data) // 2), data)]
+    return list(struct.unpack("<{}f".format(len(data) // 4), data))
+
+
+# default= of json.dumps()
+def json_default(val):
+    if isinstance(val, PackedFloats):
+        return {val.dtype: base64.b64encode(val.data).decode("ascii")}
+    raise TypeError("NodeIO: Cannot Encode Value Of Type '{}'".format(type(val).__name__))
+
+
+# object_hook= of json.loads()
+def json_object_hook(obj):
+    if len(obj) == 1:
+        for dtype in ("<f4", "<f2"):
+            if dtype in obj:
+                return unpack_floats(dtype, base64.b64decode(obj[dtype]))
+    return obj
 
 
 def make_list(data):
+    if isinstance(data, (Color, Vector, Euler, Quaternion)):  # always floats
+        return [quantize(i) for i in data]
     out = []
     for i in data:
-        if isinstance(i, (bool, str)):
+        if isinstance(i, float):
+            out.append(quantize(i))
+        else:  # bool, int, str
             out.append(i)
-        else:  # int, float
-            out.append(round(i, ROUND))
     return out
 
 
+# types that can be converted to lists
+LIST_TYPES = (Color, Vector, Euler, Quaternion, bpy.types.bpy_prop_array)
+
+# list of default values to ignore for smaller file-size, or because not needed, also if property is read-only
+EXCLUDE_ATTRIBUTES = {'__doc__', '__module__', '__slots__', 'bl_description', 'bl_height_default', 'bl_height_max',
+                      'bl_height_min', 'bl_icon', 'bl_rna', 'bl_static_type', 'bl_width_default', 'bl_width_min',
+                      'bl_width_max', 'color_mapping', 'draw_buttons', 'draw_buttons_ext', 'image_user',
+                      'input_template', 'inputs', 'internal_links', 'is_registered_node_type', 'bl_label',
+                      'output_template', 'outputs', 'poll', 'poll_instance', 'rna_type', 'shading_compatibility',
+                      'show_options', 'show_preview', 'show_texture', 'socket_value_update', 'texture_mapping',
+                      'type', 'update', 'viewLocation', 'width_hidden', 'bl_idname', 'dimensions',
+                      'isAnimationNode', 'evaluationExpression', 'socketIdentifier', 'canCache',
+                      'iterateThroughLists', 'identifier', 'scale_off', 'orient_axis', 'generic_enum', 'objects',
+                      'particles', 'uv', 'id_data'}
+
+EXCLUDE_NODES = {'SvGetPropNode', "SvSetPropNode"}
+
+# certain nodes that do not support some operations, like having no .inputs or .outputs,
+NODE_EXCLUDE_LIST = ['NodeReroute', 'NodeGroupInput', 'NodeGroupOutput']
+SOCKET_FIELD_LIST = ['default_value', "value", "objectName", "fontName", "category", "groupName", "textBlockName",
+                     "sequenceName", 'isUsed', 'easeIn', 'easeOut']
+
+# export plans per node type, {bl_idname: [node class, [[attribute, kind], ...], [unresolved attributes]]}
+# attributes that are None when the plan is built can't be classified yet, so they are resolved on the first node
+# that has a value for them
+node_schemas = {}
+
+# fields from SOCKET_FIELD_LIST that each socket type has, {bl_idname: (field, ...)}
+socket_schemas = {}
+
+# functions that assign an attribute path like "color_ramp.interpolation", {path: setter(obj, value)}
+attribute_setters = {}
+
+
+class Timings:
+    # wall time and calls of each phase of one import or export, and totals such as nodes or bytes written. Phases can
+    # be inside other phases, so their times don't add up to the total
+
+    def __init__(self, operation):
+        self.operation = operation
+        self.started = perf_counter()
+        self.phases = {}  # name -> [seconds, calls]
+        self.counts = {}  # name -> total
+
+    def add(self, name, start, calls=1):
+        phase = self.phases.get(name)
+        if phase is None:
+            phase = self.phases[name] = [0.0, 0]
+        phase[0] += perf_counter() - start
+        phase[1] += calls
+
+    def count(self, name, amount=1):
+        self.counts[name] = self.counts.get(name, 0) + amount
+
+    def summary(self):
+        phases = sorted(self.phases.items(), key=lambda i: -i[1][0])
+        return "NodeIO: {} Took {:.3f}s, {}; {}".format(
+            self.operation.title(), perf_counter() - self.started,
+            ", ".join("{} {:.3f}s ({} Calls)".format(name, phase[0], phase[1]) for name, phase in phases),
+            ", ".join("{} {}".format(val, name) for name, val in sorted(self.counts.items())))
+
+    def trace(self):
+        return {"operation": self.operation, "version": VERSION, "date": datetime.now().isoformat(),
+                "seconds": perf_counter() - self.started, "counts": self.counts,
+                "phases": {name: {"seconds": phase[0], "calls": phase[1]} for name, phase in self.phases.items()}}
+
+
+timings = None  # Timings of the import or export being measured, None if it isn't
+
+
+def start_timings(context, operation):
+    global timings
+    timings = Timings(operation) if context.scene.node_io_is_timing else None
+
+
+# report the timings and write them to the trace file if there is one
+def finish_timings(self, context):
+    global timings
+    if timings is None:
+        return
+
+    self.report({"INFO"}, timings.summary())
+    trace_path = bpy.path.abspath(context.scene.node_io_trace_path)
+    if trace_path:
+        try:
+            with open(trace_path, 'w') as file:
+                json.dump(timings.trace(), file, indent=4, sort_keys=True)
+        except OSError as e:
+            self.report({"WARNING"}, "NodeIO: Couldn't Write Trace '{}', {}".format(trace_path, e))
+    timings = None
+
+
+def invalidate_node_schemas(bl_idname=None):
+    # call when add-ons register or change node classes, plans are also rebuilt if a node's class object changes
+    if bl_idname is None:
+        node_schemas.clear()
+        socket_schemas.clear()
+    else:
+        node_schemas.pop(bl_idname, None)
+        socket_schemas.pop(bl_idname, None)
+
+
+def get_socket_fields(socket):
+    fields = socket_schemas.get(socket.bl_idname)
+    if fields is None:
+        fields = tuple(i for i in SOCKET_FIELD_LIST if hasattr(socket, i))
+        socket_schemas[socket.bl_idname] = fields
+    return fields
+
+
+def get_attribute_setter(att):
+    setter = attribute_setters.get(att)
+    if setter is None:
+        owner_path, _, field = att.rpartition(".")
+        if owner_path:
+            get_owner = operator.attrgetter(owner_path)
+
+            def setter(obj, val):
+                setattr(get_owner(obj), field, val)
+        else:
+            def setter(obj, val):
+                setattr(obj, field, val)
+        attribute_setters[att] = setter
+    return setter
+
+
+def attribute_kind(t):
+    # determine how a value is serialized, None means it is not exported
+    if isinstance(t, LIST_TYPES):  # TUPLE
+        return "list"
+    elif isinstance(t, bpy.types.CurveMapping):  # CURVES
+        return "curve"
+    elif isinstance(t, bpy.types.ShaderNodeRGBCurve):  # n_InterpolationFromCurveMappingNode has ShaderNodeRGBCurve
+        return "rgb_curve"
+    elif isinstance(t, bpy.types.ColorRamp):  # COLOR RAMP
+        return "color_ramp"
+    elif isinstance(t, bpy.types.NodeTree):  # NODE TREE
+        return "node_tree"
+    elif isinstance(t, bpy.types.Image):  # IMAGE
+        return "image"
+    elif isinstance(t, bpy.types.ParticleSystem):  # PARTICLE SYSTEM - needs objects and particle system
+        return "particle_system"
+    elif isinstance(t, (str, bool)):  # STRING
+        return "value"
+    elif isinstance(t, (int, float)):  # FlOAT, INTEGER
+        return "number"
+    elif isinstance(t, (bpy.types.Node, bpy.types.Texture)):  # FRAME NODE, TEXTURE NODE
+        return "name"
+    return None
+
+
+def get_node_schema(n: bpy.types.Node):
+    schema = node_schemas.get(n.bl_idname)
+
+    if schema is None or schema[0] is not type(n):
+        start = perf_counter()
+        plan, unresolved = [], []
+        if n.bl_idname not in EXCLUDE_NODES:
+            for method in getmembers(n):
+                if method[0] not in EXCLUDE_ATTRIBUTES:
+                    if method[1] is None:
+                        unresolved.append(method[0])
+                    else:
+                        kind = attribute_kind(method[1])
+                        if kind is not None:
+                            plan.append([method[0], kind])
+
+        schema = [type(n), plan, unresolved]
+        node_schemas[n.bl_idname] = schema
+        if timings is not None:
+            timings.add("node schema (getmembers)", start)
+    elif schema[2]:
+        plan, unresolved = schema[1], schema[2]
+        for att in unresolved[:]:
+            val = getattr(n, att, None)
+            if val is not None:
+                unresolved.remove(att)
+                kind = attribute_kind(val)
+                if kind is not None:
+                    plan.append([att, kind])
+                    plan.sort()  # keep the same order getmembers() would give
+
+    return schema
+
+
+# a float property of every item in collection read with one foreach_get(), size values per item, as a flat list of
+# quantized floats
+def foreach_floats(collection, att, size):
+    count = len(collection) * size
+    if numpy is not None:
+        buffer = numpy.empty(count, dtype=numpy.float32)
+        collection.foreach_get(att, buffer)
+        if float_format['precision'] == "DECIMALS":
+            return numpy.round(buffer.astype(numpy.float64), float_format['decimals']).tolist()
+        elif float_format['precision'] == "FLOAT16":
+            return buffer.astype(numpy.float16).astype(numpy.float64).tolist()
+    else:
+        buffer = array("f", bytes(4 * count))
+        collection.foreach_get(att, buffer)
+    return [quantize(i) for i in buffer.tolist()]
+
+
+# set a float property of every item in collection with one foreach_set(), values is a flat list
+def foreach_set_floats(collection, att, values):
+    if numpy is not None:
+        collection.foreach_set(att, numpy.array(values, dtype=numpy.float32))
+    else:
+        collection.foreach_set(att, array("f", values))
+
+
+# add or remove items at the end of collection until it has count, items are added with new(*args(i))
+def resize_collection(collection, count, args):
+    while len(collection) > count:
+        collection.remove(collection[len(collection) - 1])
+    while len(collection) < count:
+        collection.new(*args(len(collection)))
+
+
+def collect_curve_mapping(c):
+    curves = [make_list(c.black_level), make_list(c.white_level),
+              str(c.clip_max_x), str(c.clip_max_y), str(c.clip_min_x),
+              str(c.clip_min_y), str(c.use_clip)]
+
+    for curve in c.curves:
+        locations = foreach_floats(curve.points, "location", 2)
+        if float_format['packed']:  # [extend, locations, handle types]
+            curves.append([curve.extend, pack_floats(locations), [point.handle_type for point in curve.points]])
+            continue
+
+        points = [curve.extend]
+        for i, point in enumerate(curve.points):
+            points.append([locations[2 * i:2 * i + 2], point.handle_type])
+        curves.append(points)
+    return curves
+
+
+def collect_socket_data(sockets, out):
+    for j, socket in enumerate(sockets):
+        values = {}
+        for i in get_socket_fields(socket):
+            val = getattr(socket, i)
+            if isinstance(val, LIST_TYPES):  # list
+                values[i] = make_list(val)
+            elif isinstance(val, (str, bool)):
+                values[i] = val
+            elif isinstance(val, float):
+                values[i] = quantize(val)
+            elif isinstance(val, int):
+                values[i] = val
+
+        if values:
+            out.append({"index": j, "bl_idname": socket.bl_idname, 'values': values})
+
+
 def collect_node_data(n: bpy.types.Node):
     ns, inputs, outputs, dependencies = [], [], [], []
     node_data = {"inputs": inputs, "outputs": outputs, "node_specific": ns, "bl_idname": n.bl_idname}
@@ -56,52 +469,9 @@ def collect_node_data(n: bpy.types.Node):
     if n.bl_idname in ("ShaderNodeGroup", "TextureNodeGroup") or n.bl_idname[0:11] == "SvGroupNode":
         is_group = True
 
-    # certain nodes that do not support some operations, like having no .inputs or .outputs,
-    node_exclude_list = ['NodeReroute', 'NodeGroupInput', 'NodeGroupOutput']
-    socket_field_list = ['default_value', "value", "objectName", "fontName", "category", "groupName", "textBlockName",
-                         "sequenceName", 'isUsed', 'easeIn', 'easeOut']
-
-    # types that can be converted to lists
-    list_types = (Color, Vector, Euler, Quaternion, bpy.types.bpy_prop_array)
-
-    if n.bl_idname not in node_exclude_list:  # Reroute does have in and out, but does not know type until linked
-        # inputs
-        for j in range(len(n.inputs)):
-            socket = n.inputs[j]
-            data = {"index": j, "bl_idname": socket.bl_idname, 'values': {}}
-            for i in socket_field_list:
-                try:
-                    val = eval("socket.{}".format(i))
-                    if isinstance(val, list_types):  # list
-                        data["values"][i] = make_list(val)
-                    elif isinstance(val, (str, bool)):
-                        data["values"][i] = val
-                    elif isinstance(val, (float, int)):
-                        data["values"][i] = round(val, ROUND)
-                except AttributeError:
-                    pass
-
-            if data['values']:
-                inputs.append(data)
-
-        # outputs
-        for j in range(len(n.outputs)):
-            socket = n.outputs[j]
-            data = {"index": j, "bl_idname": socket.bl_idname, 'values': {}}
-            for i in socket_field_list:
-                try:
-                    val = eval("socket.{}".format(i))
-                    if isinstance(val, list_types):  # list
-                        data["values"][i] = make_list(val)
-                    elif isinstance(val, (str, bool)):
-                        data["values"][i] = val
-                    elif isinstance(val, (float, int)):
-                        data["values"][i] = round(val, ROUND)
-                except AttributeError:
-                    pass
-
-            if data['values']:
-                outputs.append(data)
+    if n.bl_idname not in NODE_EXCLUDE_LIST:  # Reroute does have in and out, but does not know type until linked
+        collect_socket_data(n.inputs, inputs)
+        collect_socket_data(n.outputs, outputs)
     elif n.bl_idname == "NodeGroupInput":
         temp = []
         for i in n.outputs:
@@ -117,74 +487,50 @@ def collect_node_data(n: bpy.types.Node):
                 temp.append(i.name)
         ns += ["group_output", temp]
 
-    # list of default values to ignore for smaller file-size, or because not needed, also if property is read-only
-    exclude_attributes = {'__doc__', '__module__', '__slots__', 'bl_description', 'bl_height_default', 'bl_height_max',
-                          'bl_height_min', 'bl_icon', 'bl_rna', 'bl_static_type', 'bl_width_default', 'bl_width_min',
-                          'bl_width_max', 'color_mapping', 'draw_buttons', 'draw_buttons_ext', 'image_user',
-                          'input_template', 'inputs', 'internal_links', 'is_registered_node_type', 'bl_label',
-                          'output_template', 'outputs', 'poll', 'poll_instance', 'rna_type', 'shading_compatibility',
-                          'show_options', 'show_preview', 'show_texture', 'socket_value_update', 'texture_mapping',
-                          'type', 'update', 'viewLocation', 'width_hidden', 'bl_idname', 'dimensions',
-                          'isAnimationNode', 'evaluationExpression', 'socketIdentifier', 'canCache',
-                          'iterateThroughLists', 'identifier', 'scale_off', 'orient_axis', 'generic_enum', 'objects',
-                          'particles', 'uv'}
-
-    exclude_nodes = {'SvGetPropNode', "SvSetPropNode"}
-
     # Manual Attribute Collection ------------------------------------------->>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
     if n.bl_idname[0:11] == "SvGroupNode":
         node_data["monad.name"] = n.monad.name
 
     # Automatic Attribute Collection ---------------------------------------->>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>>
-    if n.bl_idname not in exclude_nodes:
-        for method in getmembers(n):
-            if method[0] not in exclude_attributes:
-                t = method[1]  # type of value
-                val = getattr(n, method[0])  # get value
-
-                # special handling for certain types
-                if isinstance(t, list_types):  # TUPLE
-                    ns += [method[0], make_list(val)]
-                elif isinstance(t, (bpy.types.CurveMapping, bpy.types.ShaderNodeRGBCurve)):  # CURVES
-                    if isinstance(t, bpy.types.CurveMapping):
-                        if isinstance(n, bpy.types.TextureNodeCurveTime):
-                            c = n.curve
-                        else:
-                            c = n.mapping
-                    else:  # happens with n_InterpolationFromCurveMappingNode, has ShaderNodeRGBCurve which has curve
-                        c = n.curveNode.mapping
-                    curves = [make_list(c.black_level), make_list(c.white_level),
-                              str(c.clip_max_x), str(c.clip_max_y), str(c.clip_min_x),
-                              str(c.clip_min_y), str(c.use_clip)]
-
-                    for curve in c.curves:
-                        points = [curve.extend]
-                        for point in curve.points:
-                            points.append([make_list(point.location), point.handle_type])
-                        curves.append(points)
-                    ns += ["mapping", curves]
-                elif isinstance(t, bpy.types.ColorRamp):  # COLOR RAMP
-                    els = []
-                    for j in n.color_ramp.elements:
-                        cur_el = [j.position, make_list(j.color)]
-                        els.append(cur_el)
-                    ns += ["color_ramp.color_mode", n.color_ramp.color_mode, "color_ramp.interpolation",
-                           n.color_ramp.interpolation, "color_ramp.elements", els]
-                elif isinstance(t, bpy.types.NodeTree):  # NODE TREE
-                    ns += ["node_tree.name", val.name]
-                elif isinstance(t, bpy.types.Image) and n.image is not None:  # IMAGE
-                    ns += ["image", n.image.name]
-                    dependencies.append(['image', n.image.name, n.image.filepath])
-                elif isinstance(t, bpy.types.ParticleSystem):  # PARTICLE SYSTEM - needs objects and particle system
-                    ns += [method[0], [n.object, val.name]]
-                elif isinstance(t, (str, bool)):  # STRING
-                    ns += [method[0], val]
-                elif isinstance(t, (int, float)):  # FlOAT, INTEGER
-                    ns += [method[0], round(val, ROUND)]
-                elif isinstance(t, bpy.types.Node):  # FRAME NODE
-                    ns += [method[0], val.name]
-                elif isinstance(t, bpy.types.Texture):  # TEXTURE NODE
-                    ns += [method[0], val.name]
+    # which attributes to read and how is only worked out once per node type, see get_node_schema()
+    for att, kind in get_node_schema(n)[1]:
+        val = getattr(n, att, None)
+        if val is None:  # pointers that aren't set on this node
+            continue
+
+        # special handling for certain types
+        if kind == "list":
+            ns += [att, make_list(val)]
+        elif kind == "curve":
+            if isinstance(n, bpy.types.TextureNodeCurveTime):
+                ns += ["mapping", collect_curve_mapping(n.curve)]
+            else:
+                ns += ["mapping", collect_curve_mapping(n.mapping)]
+        elif kind == "rgb_curve":
+            ns += ["mapping", collect_curve_mapping(n.curveNode.mapping)]
+        elif kind == "color_ramp":
+            elements = n.color_ramp.elements
+            positions, colors = foreach_floats(elements, "position", 1), foreach_floats(elements, "color", 4)
+            if float_format['packed']:  # position and color of each element one after another
+                els = pack_floats([val for i in range(len(positions)) for val in
+                                   [positions[i]] + colors[4 * i:4 * i + 4]])
+            else:
+                els = [[positions[i], colors[4 * i:4 * i + 4]] for i in range(len(positions))]
+            ns += ["color_ramp.color_mode", n.color_ramp.color_mode, "color_ramp.interpolation",
+                   n.color_ramp.interpolation, "color_ramp.elements", els]
+        elif kind == "node_tree":
+            ns += ["node_tree.name", val.name]
+        elif kind == "image":
+            ns += ["image", val.name]
+            dependencies.append(['image', val.name, val.filepath])
+        elif kind == "particle_system":
+            ns += [att, [n.object, val.name]]
+        elif kind == "value":
+            ns += [att, val]
+        elif kind == "number":
+            ns += [att, quantize(val) if isinstance(val, float) else val]
+        elif kind == "name":
+            ns += [att, val.name]
 
     # extra information needed for creating nodes
     if n.bl_idname == 'an_CreateListNode':  # have to determine number of inputs, has to be evaluated after assignedType
@@ -196,84 +542,1116 @@ def collect_node_data(n: bpy.types.Node):
     return [node_data, is_group, dependencies]
 
 
+# values of freshly created nodes, {bl_idname: [node class, {attribute: value}, {(is_output, index, socket bl_idname):
+# values}]}, both dicts are None if the node type couldn't be created. Kept for the session
+node_defaults = {}
+
+# empty node trees used to create pristine nodes in, {tree bl_idname: tree}, removed after each export
+scratch_trees = {}
+SCRATCH_TREE_NAME = ".NodeIO Defaults"
+
+# attributes that are always written, even if they match the pristine node
+NEVER_ELIDE = {"name", "parent", "group_input", "group_output", "an_list_size"}
+
+
+def get_node_defaults(n: bpy.types.Node):
+    defaults = node_defaults.get(n.bl_idname)
+
+    if defaults is None or defaults[0] is not type(n):
+        start = perf_counter()
+        defaults = [type(n), None, None]
+        tree_id = n.id_data.bl_idname
+
+        if tree_id not in scratch_trees:
+            try:
+                scratch_trees[tree_id] = bpy.data.node_groups.new(SCRATCH_TREE_NAME, tree_id)
+            except (RuntimeError, TypeError):
+                scratch_trees[tree_id] = None
+
+        if scratch_trees[tree_id] is not None:
+            try:
+                pristine = scratch_trees[tree_id].nodes.new(n.bl_idname)
+            except RuntimeError:
+                pristine = None
+
+            if pristine is not None:
+                data = collect_node_data(pristine)[0]
+                ns = data["node_specific"]
+                defaults[1] = {ns[i]: ns[i + 1] for i in range(0, len(ns), 2)}
+                defaults[2] = {}
+                for is_output, sockets in ((False, data["inputs"]), (True, data["outputs"])):
+                    for socket in sockets:
+                        defaults[2][(is_output, socket["index"], socket["bl_idname"])] = socket["values"]
+                scratch_trees[tree_id].nodes.remove(pristine)
+
+        node_defaults[n.bl_idname] = defaults
+        if timings is not None:
+            timings.add("node defaults", start)
+    return defaults
+
+
+def remove_scratch_trees():
+    for tree in scratch_trees.values():
+        if tree is not None:
+            bpy.data.node_groups.remove(tree)
+    scratch_trees.clear()
+
+
+# drop every value of node_data that is the same as on a freshly created node, the importer starts from fresh nodes
+# returns a copy of node_data without what matches defaults, node_data is left whole so it can still be hashed
+def elide_defaults(node_data, defaults):
+    specific, sockets = defaults[1], defaults[2]
+    if specific is None:
+        return node_data
+
+    node_data = node_data.copy()
+    ns = node_data["node_specific"]
+    kept = []
+    for i in range(0, len(ns), 2):
+        if ns[i] in NEVER_ELIDE or ns[i] not in specific or specific[ns[i]] != ns[i + 1]:
+            kept += [ns[i], ns[i + 1]]
+    node_data["node_specific"] = kept
+
+    for is_output, key in ((False, "inputs"), (True, "outputs")):
+        kept = []
+        for socket in node_data[key]:
+            pristine = sockets.get((is_output, socket["index"], socket["bl_idname"]))
+            if pristine is None:
+                kept.append(socket)
+            else:
+                values = {}
+                for val_key, val in socket["values"].items():
+                    if val_key not in pristine or pristine[val_key] != val:
+                        values[val_key] = val
+                if values:
+                    socket = socket.copy()
+                    socket["values"] = values
+                    kept.append(socket)
+        node_data[key] = kept
+    return node_data
+
+
 # recursive method that collects all nodes and if group node goes and collects its nodes
-# data is added to data in [[nodes, links], [nodes, links]] group by group
-def collect_nodes(nodes, links, dependencies, names, name, data):
+# each group is handed to writer.write_group() as soon as its nodes and links are collected, nested groups come first
+# visited holds the groups (by pointer) already collected, so shared, nested or recursive groups are only walked once
+# with elide values matching a freshly created node of the same type are left out
+# cache is {group pointer: collect_nodes() result} shared between node trees, so a group used by many trees is only
+# walked once. Returns (nodes, links, dependencies of these nodes, groups used by these nodes, content hash or None)
+def collect_nodes(nodes, links, dependencies, name, writer, visited=None, elide=False, cache=None):
+    return run_steps(collect_steps(nodes, links, dependencies, name, writer, visited, elide, cache))
+
+
+# collect_nodes() yielding progress every COLLECT_CHUNK nodes and after each group, so a modal export of a big tree
+# can hand control back to Blender in between. progress is yielded as is
+def collect_steps(nodes, links, dependencies, name, writer, visited=None, elide=False, cache=None, progress=None):
     m_n = []
     m_l = []
-    
+    own_dependencies = []
+    groups = []
+    socket_index = {}  # socket pointer -> index of the socket in its node's inputs or outputs, used by link_info()
+
+    if visited is None:
+        visited = set()
+
+    # groups are hashed with every value, so their hash is the same whether or not defaults are left out
+    hash_nodes = [] if elide else m_n
+
+    start = perf_counter()
     for n in nodes:  # nodes
         out, is_group, im = collect_node_data(n)
+        if elide:
+            hash_nodes.append(out)
+            out = elide_defaults(out, get_node_defaults(n))
         m_n.append(out)
-        dependencies.append(im)
+        own_dependencies.append(im)
 
-        if is_group and n.bl_idname in ("ShaderNodeGroup", "TextureNodeGroup"):
-            collect_nodes(n.node_tree.nodes, n.node_tree.links, dependencies, names, n.node_tree.name, data)
-        elif is_group and n.bl_idname[0:11] == "SvGroupNode":
-            collect_nodes(n.monad.nodes, n.monad.links, dependencies, names, n.monad.name, data)
-        
+        for i, socket in enumerate(n.inputs):
+            socket_index[socket.as_pointer()] = i
+        for i, socket in enumerate(n.outputs):
+            socket_index[socket.as_pointer()] = i
+
+        if is_group:
+            if n.bl_idname in ("ShaderNodeGroup", "TextureNodeGroup"):
+                group = n.node_tree
+            else:  # SvGroupNode
+                group = n.monad
+
+            if group is not None:
+                groups.append(group)
+
+        if progress is not None and len(m_n) % COLLECT_CHUNK == 0:
+            yield progress
+
+    if timings is not None:
+        timings.add("collect nodes", start, len(m_n))
+        timings.count("nodes", len(m_n))
+
+    # groups are written before the tree using them
+    for group in groups:
+        yield from collect_group_steps(group, dependencies, writer, visited, elide, cache, progress)
+    dependencies.extend(own_dependencies)
+
+    start = perf_counter()
     for l in links:  # links
-        out = link_info(l)
+        out = link_info(l, socket_index)
         m_l.append(out)
-        
-    data.append([m_n, m_l])   
-    names[name] = len(data) - 1 
 
+    if timings is not None:
+        timings.add("collect links", start, len(m_l))
+        timings.count("links", len(m_l))
 
-def link_info(link):
-    out = [link.from_node.name]
+    content_hash = writer.write_group(name, m_n, m_l, hash_nodes)
+    return m_n, m_l, own_dependencies, groups, content_hash
 
-    fr = link.from_socket.path_from_id()
-    fr = fr.split(".")
 
-    if len(fr) == 3:
-        fr = fr[2]
+def collect_group(group, dependencies, writer, visited, elide, cache):
+    run_steps(collect_group_steps(group, dependencies, writer, visited, elide, cache))
+
+
+def collect_group_steps(group, dependencies, writer, visited, elide, cache, progress=None):
+    if group.as_pointer() in visited:
+        return
+    visited.add(group.as_pointer())
+
+    collected = cache.get(group.as_pointer()) if cache is not None else None
+    if collected is None:
+        collected = yield from collect_steps(group.nodes, group.links, dependencies, group.name, writer, visited,
+                                             elide, cache, progress)
+        if cache is not None:
+            cache[group.as_pointer()] = collected
     else:
-        fr = fr[1]
-
-    n1 = fr.index("[")
-    n2 = fr.index("]")
-    ind = int(fr[n1 + 1:n2])
-    out.append(ind)
-    out.append(link.to_node.name)
-    fr = link.to_socket.path_from_id()
-    fr = fr.split(".")
-
-    if len(fr) == 3:
-        fr = fr[2]
+        for child in collected[3]:
+            yield from collect_group_steps(child, dependencies, writer, visited, elide, cache, progress)
+        dependencies.extend(collected[2])
+        writer.write_group(group.name, collected[0], collected[1], content_hash=collected[4])
+
+    if progress is not None:
+        yield progress
+
+
+# [from node name, from socket index, to node name, to socket index, from socket identifier, to socket identifier]
+# the indices are kept so files can still be read by older versions
+def link_info(link, socket_index):
+    from_socket, to_socket = link.from_socket, link.to_socket
+    return [link.from_node.name, socket_index[from_socket.as_pointer()], link.to_node.name,
+            socket_index[to_socket.as_pointer()], from_socket.identifier, to_socket.identifier]
+
+
+# nodes of a group grouped by bl_idname, each type writes its node_specific attribute names once followed by a row
+# of values per node: [{"bl_idname": ..., "attributes": [name, ...], "rows": [[value, ...], ...], "inputs": [...],
+# "outputs": [...]}, ...]. Rows can be shorter than attributes, and missing values are None
+def group_by_type(nodes):
+    blocks, types = [], {}
+
+    for node in nodes:
+        block = types.get(node['bl_idname'])
+        if block is None:
+            block = {"bl_idname": node['bl_idname'], "attributes": [], "rows": [], "inputs": [], "outputs": []}
+            types[node['bl_idname']] = block
+            blocks.append(block)
+            columns = block["columns"] = {}  # attribute -> column, removed before writing
+        else:
+            columns = block["columns"]
+
+        ns = node['node_specific']
+        row = [None] * len(block["attributes"])
+        for i in range(0, len(ns), 2):
+            column = columns.get(ns[i])
+            if column is None:
+                column = columns[ns[i]] = len(block["attributes"])
+                block["attributes"].append(ns[i])
+                row.append(None)
+            row[column] = ns[i + 1]
+
+        block["rows"].append(row)
+        block["inputs"].append(node['inputs'])
+        block["outputs"].append(node['outputs'])
+        if "monad.name" in node:
+            block.setdefault("monad.name", []).append(node["monad.name"])
+
+    for block in blocks:
+        del block["columns"]
+    return blocks
+
+
+# content hash of a collected group, ignoring its name. Nested groups are hashed by their content too, hashes holds
+# {group name: hash} of the groups written before this one
+def group_hash(nodes, links, hashes):
+    sha = hashlib.sha1()
+    for node in nodes:
+        ns = node['node_specific']
+        if "node_tree.name" in ns[0::2]:
+            ns = [hashes.get(val, val) if i % 2 and ns[i - 1] == "node_tree.name" else val for i, val in enumerate(ns)]
+        monad = node.get('monad.name')
+        sha.update(json.dumps([node['bl_idname'], ns, node['inputs'], node['outputs'], hashes.get(monad, monad)],
+                              sort_keys=True, default=json_default).encode("utf-8"))
+    sha.update(json.dumps(links, default=json_default).encode("utf-8"))
+    return sha.hexdigest()
+
+
+class TreeWriter:
+    # base for streaming .bnodes writers, subclasses implement write() and close()
+    # columnar writes groups as {"node_types": group_by_type(nodes), "links": [...]} instead of {"nodes": [...], ...}
+    # node groups are hashed with group_hash() as they are written, "main" too if hash_main is set
+
+    def __init__(self, file, columnar=False):
+        self.file = file
+        self.columnar = columnar
+        self.names = {}  # group name -> order it was written in
+        self.hashes = {}  # group name -> content hash
+        self.hash_main = False
+        self.node_count = 0
+        self.bytes_written = 0
+
+    # hash_nodes are hashed in place of nodes if given, content_hash is used as is if it is already known. Returns the
+    # group's content hash, None if it isn't hashed
+    def write_group(self, name, nodes, links, hash_nodes=None, content_hash=None):
+        start = perf_counter()
+        if name != "main" or self.hash_main:
+            if content_hash is None:
+                content_hash = group_hash(nodes if hash_nodes is None else hash_nodes, links, self.hashes)
+            self.hashes[name] = content_hash
+        if self.columnar:
+            self.write(name, {'node_types': group_by_type(nodes), 'links': links})
+        else:
+            self.write(name, {'nodes': nodes, 'links': links})
+
+        self.names[name] = len(self.names)
+        self.node_count += len(nodes)
+        if timings is not None:
+            timings.add("write groups", start)
+        return content_hash
+
+    # names are kept as they are, they have to match the groups written and what group nodes refer to
+    def group_order(self):
+        pre_order = sorted(self.names.items(), key=operator.itemgetter(1))
+        return [i[0] for i in pre_order]
+
+    def group_hashes(self):
+        return dict(self.hashes)
+
+
+class HashWriter(TreeWriter):
+    # only hashes groups, used to find node groups of the .blend that a file's groups are the same as
+
+    def __init__(self):
+        TreeWriter.__init__(self, None)
+
+    def write(self, name, group):
+        pass
+
+
+class CountingFile:
+    # passes writes on to file and counts what was written, JSON is written as ASCII so characters are bytes
+
+    def __init__(self, file):
+        self.file = file
+        self.count = 0
+
+    def write(self, data):
+        self.file.write(data)
+        self.count += len(data)
+
+
+class JSONWriter(TreeWriter):
+    # streams a .bnodes file to disk group by group, so only the group currently being collected is held in memory
+    # the file is a normal JSON object: {"group": {"nodes": [...], "links": [...]}, ..., "__info__": {...}}
+    # groups are encoded straight into the file by json.dump() rather than built up as one string first
+
+    def __init__(self, file, columnar=False):
+        TreeWriter.__init__(self, CountingFile(file), columnar)
+        self.indent = 4 if DEBUG_FILE else None  # make multiple lines and indent if trying to debug
+
+        self.file.write("{")
+        self.bytes_written = self.file.count
+
+    def write(self, name, group):
+        self.file.write(json.dumps(name) + ": ")
+        json.dump(group, self.file, indent=self.indent, default=json_default)
+        self.file.write(", ")
+        self.bytes_written = self.file.count
+
+    def close(self, info):
+        # __info__ is written last as it depends on everything collected before it
+        self.file.write('"__info__": ')
+        json.dump(info, self.file, indent=self.indent, default=json_default)
+        self.file.write("}")
+        self.bytes_written = self.file.count
+
+
+class BufferWriter(TreeWriter):
+    # holds a node tree's groups in memory so the tree can be hashed before deciding whether it needs writing at all,
+    # replay() then hands them to a real writer
+
+    def __init__(self, columnar=False):
+        TreeWriter.__init__(self, None, columnar)
+        self.groups = []
+
+    def write(self, name, group):
+        self.groups.append([name, group])
+
+    def tree_hash(self, info, settings):
+        # date_created changes on every export so it isn't part of the tree
+        info = {key: info[key] for key in info if key != 'date_created'}
+        sha = hashlib.sha1(json.dumps([settings, info], sort_keys=True).encode("utf-8"))
+        for group in self.groups:
+            sha.update(json.dumps(group, sort_keys=True, default=json_default).encode("utf-8"))
+        return sha.hexdigest()
+
+    def replay(self, writer):
+        start = perf_counter()
+        for name, group in self.groups:
+            writer.write(name, group)
+        if timings is not None:
+            timings.add("write groups", start, len(self.groups))
+        writer.names.update(self.names)
+        writer.hashes.update(self.hashes)
+        writer.node_count = self.node_count
+
+
+def write_varint(val, out):
+    while val > 0x7f:
+        out.append((val & 0x7f) | 0x80)
+        val >>= 7
+    out.append(val)
+
+
+def read_varint(data, pos):
+    val = data[pos]
+    pos += 1
+    if val < 0x80:
+        return val, pos
+
+    val &= 0x7f
+    shift = 7
+    while True:
+        byte = data[pos]
+        pos += 1
+        val |= (byte & 0x7f) << shift
+        if byte < 0x80:
+            return val, pos
+        shift += 7
+
+
+# strings is {string: index} of the shared string table, if None strings are written inline
+def encode_value(val, out, strings):
+    if val is None:
+        out.append(TAG_NONE)
+    elif val is True:
+        out.append(TAG_TRUE)
+    elif val is False:
+        out.append(TAG_FALSE)
+    elif isinstance(val, int):
+        out.append(TAG_INT)
+        write_varint(val << 1 if val >= 0 else ((-val) << 1) - 1, out)  # zigzag so small negatives stay small
+    elif isinstance(val, float):
+        out.append(TAG_FLOAT)
+        out += struct.pack("<d", val)
+    elif isinstance(val, str):
+        if strings is None:
+            data = val.encode("utf-8")
+            out.append(TAG_STRING)
+            write_varint(len(data), out)
+            out += data
+        else:
+            index = strings.get(val)
+            if index is None:
+                index = strings[val] = len(strings)
+            out.append(TAG_STRING_REF)
+            write_varint(index, out)
+    elif isinstance(val, (list, tuple)):
+        if val and all(type(i) is float for i in val):  # vectors, colors... packed as little-endian float32
+            out.append(TAG_FLOATS)
+            write_varint(len(val), out)
+            out += struct.pack("<{}f".format(len(val)), *val)
+        else:
+            out.append(TAG_LIST)
+            write_varint(len(val), out)
+            for i in val:
+                encode_value(i, out, strings)
+    elif isinstance(val, PackedFloats):
+        out.append(TAG_FLOATS if val.dtype == "<f4" else TAG_HALFS)
+        write_varint(len(val.data) // (4 if val.dtype == "<f4" else 2), out)
+        out += val.data
+    elif isinstance(val, dict):
+        out.append(TAG_DICT)
+        write_varint(len(val), out)
+        for key in sorted(val):
+            encode_value(key, out, strings)
+            encode_value(val[key], out, strings)
     else:
-        fr = fr[1]
+        raise TypeError("NodeIO: Cannot Encode Value Of Type '{}'".format(type(val).__name__))
 
-    n1 = fr.index("[")
-    n2 = fr.index("]")
-    ind = int(fr[n1 + 1:n2])
-    out.append(ind)
 
-    return out
+# returns (value, position after value), strings is the decoded string table
+def decode_value(data, pos, strings):
+    tag = data[pos]
+    pos += 1
+
+    if tag == TAG_LIST or tag == TAG_DICT:
+        length = data[pos]
+        if length < 0x80:
+            pos += 1
+        else:
+            length, pos = read_varint(data, pos)
+        if tag == TAG_LIST:
+            return decode_items(data, pos, strings, length)
+        items, pos = decode_items(data, pos, strings, 2 * length)
+        return dict(zip(items[::2], items[1::2])), pos
+    elif tag == TAG_STRING_REF:
+        index, pos = read_varint(data, pos)
+        return strings[index], pos
+    elif tag == TAG_FLOAT:
+        return unpack_from("<d", data, pos)[0], pos + 8
+    elif tag == TAG_INT:
+        val, pos = read_varint(data, pos)
+        return (val >> 1) ^ -(val & 1), pos
+    elif tag == TAG_FLOATS:
+        length, pos = read_varint(data, pos)
+        return list(unpack_from("<%df" % length, data, pos)), pos + 4 * length
+    elif tag == TAG_HALFS:
+        length, pos = read_varint(data, pos)
+        return unpack_floats("<f2", bytes(data[pos:pos + 2 * length])), pos + 2 * length
+    elif tag == TAG_STRING:
+        length, pos = read_varint(data, pos)
+        return bytes(data[pos:pos + length]).decode("utf-8"), pos + length
+    elif tag == TAG_TRUE:
+        return True, pos
+    elif tag == TAG_FALSE:
+        return False, pos
+    elif tag == TAG_NONE:
+        return None, pos
+    raise ValueError("NodeIO: Unknown Value Tag {} At Byte {}".format(tag, pos - 1))
+
+
+# returns ([count values], position after them), the items of a list or the alternating keys and values of a dict.
+# Most items are string references, small ints, flags, float vectors or nested containers, so those are decoded in
+# this loop, reading their varints inline, and only rarer values go through decode_value()
+def decode_items(data, pos, strings, count):
+    out = []
+    append = out.append
+    for i in range(count):
+        tag = data[pos]
+        if tag == TAG_STRING_REF:
+            index = data[pos + 1]
+            if index < 0x80:
+                pos += 2
+            else:
+                byte = data[pos + 2]
+                if byte < 0x80:
+                    index = (index & 0x7f) | (byte << 7)
+                    pos += 3
+                else:
+                    index, pos = read_varint(data, pos + 1)
+            append(strings[index])
+            continue
+        elif tag == TAG_LIST or tag == TAG_DICT:
+            length = data[pos + 1]
+            if length < 0x80:
+                pos += 2
+            else:
+                length, pos = read_varint(data, pos + 1)
+            if tag == TAG_LIST:
+                val, pos = decode_items(data, pos, strings, length)
+            else:
+                val, pos = decode_items(data, pos, strings, 2 * length)
+                val = dict(zip(val[::2], val[1::2]))
+            append(val)
+            continue
+        elif tag == TAG_FLOATS:
+            length = data[pos + 1]
+            if length < 0x80:
+                pos += 2
+                append(list(unpack_from("<%df" % length, data, pos)))
+                pos += 4 * length
+                continue
+        elif tag == TAG_INT:
+            val = data[pos + 1]
+            if val < 0x80:
+                append((val >> 1) ^ -(val & 1))
+                pos += 2
+                continue
+        elif tag == TAG_FLOAT:
+            append(unpack_from("<d", data, pos + 1)[0])
+            pos += 9
+            continue
+        elif tag == TAG_FALSE:
+            append(False)
+            pos += 1
+            continue
+        elif tag == TAG_TRUE:
+            append(True)
+            pos += 1
+            continue
+
+        val, pos = decode_value(data, pos, strings)
+        append(val)
+    return out, pos
+
+
+class BinaryWriter(TreeWriter):
+    # streams a binary .bnodes file, same interface as JSONWriter. Layout:
+    # BINARY_HEADER, then each group as (name, {"nodes": [...], "links": [...]}), then the string table, then __info__
+    # strings in groups are written as varint indices into the string table, which is only complete once all groups
+    # are written, so its offset is patched into the header on close(). The group directory follows the string table
+    # so a reader can decode groups one at a time. __info__ is written with inline strings
+
+    def __init__(self, file, columnar=False):
+        TreeWriter.__init__(self, file, columnar)
+        self.strings = {}  # string -> index in string table
+        self.directory = []  # [name, offset, length] of each group's value
+        self.pos = BINARY_HEADER.size
+
+        self.file.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, 0, 0, 0))
+
+    def write(self, name, group):
+        out = bytearray()
+        encode_value(name, out, self.strings)
+        start = len(out)
+        encode_value(group, out, self.strings)
+        self.file.write(out)
+        self.bytes_written += len(out)
+
+        self.directory.append([name, self.pos + start, len(out) - start])
+        self.pos += len(out)
+
+    def close(self, info):
+        table_offset = self.file.tell()
+        out = bytearray()
+        write_varint(len(self.strings), out)
+        for string in sorted(self.strings, key=self.strings.get):
+            data = string.encode("utf-8")
+            write_varint(len(data), out)
+            out += data
+
+        write_varint(len(self.directory), out)
+        for name, offset, length in self.directory:
+            encode_value(name, out, None)
+            write_varint(offset, out)
+            write_varint(length, out)
+        self.file.write(out)
+
+        info_offset = self.file.tell()
+        out = bytearray()
+        encode_value(info, out, None)
+        self.file.write(out)
+
+        self.file.seek(0)
+        self.file.write(BINARY_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, FLAG_DIRECTORY, table_offset, info_offset))
+        self.file.seek(0, io.SEEK_END)
+        self.bytes_written = self.file.tell()
+
+
+def read_binary_header(data):
+    magic, version, flags, table_offset, info_offset = BINARY_HEADER.unpack_from(data, 0)
+    if version > BINARY_VERSION:
+        raise ValueError("NodeIO: Binary Format Version {} Is Newer Than Supported Version {}".format(
+            version, BINARY_VERSION))
+    return flags, table_offset, info_offset
+
+
+# returns (strings, position after string table)
+def read_string_table(data, pos):
+    count, pos = read_varint(data, pos)
+    strings = []
+    for i in range(count):
+        length, pos = read_varint(data, pos)
+        strings.append(bytes(data[pos:pos + length]).decode("utf-8"))
+        pos += length
+    return strings, pos
+
+
+def read_binary(data):
+    flags, table_offset, info_offset = read_binary_header(data)
+    strings = read_string_table(data, table_offset)[0]
+
+    root = {'__info__': decode_value(data, info_offset, None)[0]}
+
+    # groups
+    pos = BINARY_HEADER.size
+    while pos < table_offset:
+        name, pos = decode_value(data, pos, strings)
+        root[name], pos = decode_value(data, pos, strings)
+
+    return root
+
+
+class BinaryReader:
+    # reads a binary .bnodes file lazily and can be used in place of the decoded root dict. Opening it reads just the
+    # header and __info__, the string table and group directory are read the first time a group is looked up, and
+    # each group is only read and decoded when it is asked for
+
+    def __init__(self, file, reopen=None):
+        self.file = file
+        self.reopen = reopen  # opens the file again once close() has released it, None if it can't be reopened
+        self.bytes_read = BINARY_HEADER.size
+        self.flags, self.table_offset, self.info_offset = read_binary_header(file.read(BINARY_HEADER.size))
+        self.info = decode_value(self.read(self.info_offset), 0, None)[0]
+        self.strings = None
+        self.directory = None  # group name -> (offset, length)
+        self.groups = {}  # group name -> decoded group, each group is only decoded once
+        self.memory = 0  # bytes of the file held in memory rather than reopened, for files read from a .zip
+
+    def read(self, offset, length=-1):
+        if self.file is None:
+            self.file = self.reopen()
+        self.file.seek(offset)
+        data = self.file.read(length)
+        self.bytes_read += len(data)
+        return data
+
+    def read_directory(self):
+        data = self.read(self.table_offset, self.info_offset - self.table_offset)
+        strings, pos = read_string_table(data, 0)
+        self.directory = {}
+
+        if self.flags & FLAG_DIRECTORY:
+            count, pos = read_varint(data, pos)
+            for i in range(count):
+                name, pos = decode_value(data, pos, None)
+                offset, pos = read_varint(data, pos)
+                length, pos = read_varint(data, pos)
+                self.directory[name] = (offset, length)
+        else:  # written without a directory, find the groups by decoding past each of them
+            data = self.read(BINARY_HEADER.size, self.table_offset - BINARY_HEADER.size)
+            pos = 0
+            while pos < len(data):
+                name, pos = decode_value(data, pos, strings)
+                start, pos = pos, decode_value(data, pos, strings)[1]
+                self.directory[name] = (BINARY_HEADER.size + start, pos - start)
+
+        self.strings = strings
+
+    def __contains__(self, name):
+        if name == '__info__':
+            return True
+        if self.directory is None:
+            self.read_directory()
+        return name in self.directory
+
+    def __getitem__(self, name):
+        if name == '__info__':
+            return self.info
+        if self.directory is None:
+            self.read_directory()
+
+        group = self.groups.get(name)
+        if group is None:
+            offset, length = self.directory[name]
+            group = self.groups[name] = decode_value(self.read(offset, length), 0, self.strings)[0]
+        return group
+
+    def get(self, name, default=None):
+        return self[name] if name in self else default
+
+    # release the file, a reader that can be reopened opens it again the next time it needs to read
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+# decode the contents of a .bnodes file, whether it is JSON or binary
+def decode_bnodes(data):
+    if data[:len(BINARY_MAGIC)] == BINARY_MAGIC:
+        return read_binary(bytes(data))
+    return json.loads(data.decode("utf-8"), object_hook=json_object_hook)
+
+
+def load_bnodes(file_path):
+    file = open(file_path, 'rb')
+    data = file.read()
+    file.close()
+
+    return decode_bnodes(data)
+
+
+# read only the __info__ block of a .bnodes file, binary files don't need their groups decoded for this
+def load_bnodes_info(file_path):
+    file = open(file_path, 'rb')
+    try:
+        return open_bnodes(file)['__info__']
+    finally:
+        file.close()
+
+
+# binary files are returned as a BinaryReader that still needs file, JSON files are decoded whole
+def open_bnodes(file, reopen=None):
+    magic = file.read(len(BINARY_MAGIC))
+    file.seek(0)
+    if magic == BINARY_MAGIC:
+        return BinaryReader(file, reopen)
+    return json.loads(file.read().decode("utf-8"), object_hook=json_object_hook)
+
+
+def file_hash(file_path):
+    h = hashlib.sha1()
+    with open(file_path, 'rb') as file:
+        for chunk in iter(lambda: file.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# copy a dependency unless the destination is already the same file, returns True if it was copied
+def copy_dependency(job):
+    src, dst = job
+    if path.exists(dst):
+        src_stat, dst_stat = stat(src), stat(dst)
+        if src_stat.st_size == dst_stat.st_size and (src_stat.st_mtime_ns == dst_stat.st_mtime_ns or
+                                                     file_hash(src) == file_hash(dst)):
+            return False
+
+    copy2(src, dst)  # keeps mtime so the next export can skip the file without hashing it
+    return True
+
+
+# copy a dependency into the asset store unless it is already there, a file in the store never changes as its name is
+# its content. It is copied under a temporary name first so other exports into the store never see half a file
+def store_dependency(job):
+    src, dst = job
+    if path.exists(dst):
+        return False
+
+    part_path = "{}.{}.part".format(dst, getpid())
+    copy2(src, part_path)
+    replace_file(part_path, dst)
+    return True
+
+
+# copy [[source, destination], ...] in a thread pool with copy, returns (copied, skipped, failed) counts
+def copy_dependencies(jobs, copy=copy_dependency):
+    copied = skipped = failed = 0
+    if not jobs:
+        return copied, skipped, failed
+
+    with ThreadPoolExecutor(max_workers=min(COPY_THREADS, len(jobs))) as pool:
+        futures = [pool.submit(copy, job) for job in jobs]
+        for future in futures:
+            try:
+                if future.result():
+                    copied += 1
+                else:
+                    skipped += 1
+            except OSError:
+                failed += 1
+
+    return copied, skipped, failed
+
+
+# the name a relative dependency is copied under, its image name unless a different file was already copied under it,
+# as images linked from other .blend files can share a name. files is {name: source path} of those copied so far
+def relative_file_name(files, name, src):
+    root, ext = path.splitext(name)
+    file_name, n = name, 0
+    while file_name in files and files[file_name] != src:
+        n += 1
+        file_name = "{}.{:03d}{}".format(root, n, ext)
+    return file_name
+
+
+# the file name a relative dependency was exported as, files before they could differ from the image name use that
+def relative_dependency_name(depend):
+    return depend[2].lstrip("/\\") or depend[1]
+
+
+# add [[source, name in archive], ...] to archive, skipping names already in it. Returns (copied, skipped, failed)
+def archive_dependencies(archive, jobs, archived):
+    copied = skipped = failed = 0
+    for src, dst in jobs:
+        name = path.basename(dst)
+        if name in archived:
+            skipped += 1
+            continue
+
+        try:
+            archive.write(src, arcname=name)
+            archived.add(name)
+            copied += 1
+        except OSError:
+            failed += 1
+
+    return copied, skipped, failed
+
+
+def load_asset_index(store_path):
+    try:
+        with open(store_path + os_file_sep + ASSET_INDEX_NAME) as file:
+            index = json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(index, dict) or index.get('version') != ASSET_INDEX_VERSION:
+        return {}
+    return index.get('files', {})
+
+
+# add files, {source path: [mtime, size, sha1]}, to the index. Exports running at once into the same store, such as
+# node_io_batch.py's workers, take turns through a lock file, and each merges its entries into the index as it is now
+# so none of them drop what another saved since they loaded it
+def save_asset_index(store_path, files):
+    index_path = store_path + os_file_sep + ASSET_INDEX_NAME
+    lock_path = index_path + ".lock"
+    owned = False  # only the call that made the lock removes it
+    try:
+        waited = perf_counter()
+        while not owned:
+            try:
+                open(lock_path, 'x').close()
+                owned = True
+            except FileExistsError:
+                if perf_counter() - waited > ASSET_INDEX_LOCK_WAIT:  # left behind by an export that didn't finish
+                    try:
+                        remove_file(lock_path)
+                    except FileNotFoundError:
+                        pass
+                    waited = perf_counter()
+                else:
+                    sleep(0.01)
+
+        index = load_asset_index(store_path)
+        index.update(files)
+        part_path = "{}.{}.part".format(index_path, getpid())
+        with open(part_path, 'w') as file:
+            json.dump({'version': ASSET_INDEX_VERSION, 'files': index}, file, indent=4, sort_keys=True)
+        replace_file(part_path, index_path)
+    finally:
+        if owned:
+            try:
+                remove_file(lock_path)
+            except FileNotFoundError:
+                pass
+
+
+# [mtime, size, sha1] of a source file, known is its entry in the asset index and is kept if the file hasn't changed
+def asset_hash(job):
+    src, known = job
+    src_stat = stat(src)
+    if known is not None and known[:2] == [src_stat.st_mtime_ns, src_stat.st_size]:
+        return known
+    return [src_stat.st_mtime_ns, src_stat.st_size, file_hash(src)]
+
+
+# content hash of each of sources, hashed in a thread pool unless index already knows it. index is updated, a source
+# that can't be read gets None
+def hash_assets(sources, index):
+    if not sources:
+        return []
+
+    with ThreadPoolExecutor(max_workers=min(COPY_THREADS, len(sources))) as pool:
+        futures = [pool.submit(asset_hash, [src, index.get(src)]) for src in sources]
+
+    hashes = []
+    for src, future in zip(sources, futures):
+        try:
+            index[src] = future.result()
+            hashes.append(index[src][2])
+        except OSError:
+            hashes.append(None)
+    return hashes
+
+
+def load_manifest(manifest_path):
+    try:
+        with open(manifest_path) as file:
+            manifest = json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+    if not isinstance(manifest, dict) or manifest.get('version') != MANIFEST_VERSION:
+        return {}
+    return manifest.get('trees', {})
+
+
+def save_manifest(manifest_path, trees):
+    with open(manifest_path + ".part", 'w') as file:
+        json.dump({'version': MANIFEST_VERSION, 'trees': trees}, file, indent=4, sort_keys=True)
+    replace_file(manifest_path + ".part", manifest_path)
+
+
+# copy members of the last export's archive into the new one as they are. Returns how many were copied
+def carry_over_members(old_archive, archive, names, archived):
+    old_names = set(old_archive.namelist())
+    carried = 0
+    for name in names:
+        if name in archived or name not in old_names:
+            continue
+
+        if sys.version_info >= (3, 6):
+            with old_archive.open(name) as src, archive.open(name, 'w', force_zip64=True) as dst:
+                copyfileobj(src, dst, 1 << 20)
+        else:
+            archive.writestr(name, old_archive.read(name))
+        archived.add(name)
+        carried += 1
+    return carried
+
+
+# open the file a .bnodes file is written to, either save_path on disk or a member of archive named after it
+# returns (file, finish), finish() has to be called once the writer is closed, or finish(False) to drop the file.
+# Files on disk are written next to save_path and only replace it once finished
+def open_export_file(save_path, archive, binary):
+    if archive is None:
+        part_path = save_path + ".part"
+        file = open(part_path, 'wb' if binary else 'w')
+
+        def finish_part(keep=True):
+            file.close()
+            if keep:
+                replace_file(part_path, save_path)
+            else:
+                remove_file(part_path)
+        return file, finish_part
+
+    name = path.basename(save_path)
+    if not binary and sys.version_info >= (3, 6):  # JSON never seeks, so it can be streamed straight into the archive
+        file = io.TextIOWrapper(archive.open(name, 'w', force_zip64=True), encoding="utf-8")
+        return file, lambda keep=True: file.close()  # the .zip is dropped if the file is
+
+    # the binary header is patched after the body is written, so it is spooled first, in memory unless it gets large
+    spool = SpooledTemporaryFile(max_size=SPOOL_SIZE)
+    file = spool if binary else io.TextIOWrapper(spool, encoding="utf-8")
+
+    def finish(keep=True):
+        if file is not spool:
+            file.flush()
+            file.detach()
+        if not keep:
+            spool.close()
+            return
+        spool.seek(0)
+
+        if sys.version_info >= (3, 6):
+            with archive.open(name, 'w', force_zip64=True) as member:
+                copyfileobj(spool, member, 1 << 20)
+        else:  # ZipFile.open() can only write from Python 3.6
+            archive.writestr(name, spool.read())
+        spool.close()
+
+    return file, finish
+
+
+# what export_trees() needs to export a material, texture or node group, None if it has no nodes to export
+def export_entry(datablock):
+    if isinstance(datablock, bpy.types.Material):
+        tree = datablock.node_tree if datablock.use_nodes else None
+        if tree is None and getattr(datablock, "mitsuba_nodes", None) is not None:
+            tree = bpy.data.node_groups.get(datablock.mitsuba_nodes.nodetree)
+    elif isinstance(datablock, bpy.types.Texture):
+        tree = datablock.node_tree if datablock.use_nodes else None
+    elif isinstance(datablock, bpy.types.NodeTree) and datablock.bl_idname in SUPPORTED_TREES:
+        entry = {"nodes": datablock.nodes, "links": datablock.links, "name": datablock.name,
+                 "bl_idname": datablock.bl_idname}
+        if datablock.bl_idname in ("ShaderNodeTree", "TextureNodeTree"):  # a node group exported on its own
+            entry['group'] = datablock
+        return entry
+    else:
+        tree = None
+
+    if tree is None:
+        return None
+    return {"nodes": tree.nodes, "links": tree.links, "name": datablock.name, "bl_idname": tree.bl_idname}
+
+
+# every material, texture and node tree in the .blend whose name contains name_filter, kinds is a set of "MATERIAL",
+# "TEXTURE" and "NODE_GROUP". Shader and texture node groups come last so that the ones already written as part of a
+# material or texture can be skipped
+def bulk_export_list(kinds, name_filter):
+    datablocks = []
+    if "MATERIAL" in kinds:
+        datablocks.extend(bpy.data.materials)
+    if "TEXTURE" in kinds:
+        datablocks.extend(bpy.data.textures)
+    if "NODE_GROUP" in kinds:
+        datablocks.extend(group for group in bpy.data.node_groups if group.bl_idname in
+                          ("an_AnimationNodeTree", "SverchCustomTreeType", "ShaderNodeTree", "TextureNodeTree"))
+
+    name_filter = name_filter.lower()
+    to_export = [export_entry(datablock) for datablock in datablocks if name_filter in datablock.name.lower()]
+    return [entry for entry in to_export if entry is not None and "group" not in entry] + \
+        [entry for entry in to_export if entry is not None and "group" in entry]
+
+
+def open_tree_writer(save_path, archive, binary, columnar):
+    file, finish = open_export_file(save_path, archive, binary)
+    if binary:
+        return BinaryWriter(file, columnar), finish
+    return JSONWriter(file, columnar), finish
+
+
+def abort_export(self, save_path, archive, archive_path, old_archive):
+    self.report({"ERROR"}, "NodeIO: Permission Denied '{}', Cannot Continue".format(save_path))
+    discard_export(archive, archive_path, old_archive)
+
+
+# drop the .zip being written, files already written into a folder are complete and kept
+def discard_export(archive, archive_path, old_archive):
+    remove_scratch_trees()
+    if archive is not None:
+        archive.close()
+        remove_file(archive_path + ".part")
+    if old_archive is not None:
+        old_archive.close()
+
+
+# settings export_trees() uses for any that aren't given, the same as the node_io_* scene properties. A render engine
+# of None is the current scene's, an asset store of None is the ASSET_STORE_NAME folder of the export path
+EXPORT_SETTINGS = {"dependency_save_type": "1", "is_compress": False, "is_incremental": False, "export_format": "1",
+                   "is_columnar": False, "is_elide_defaults": False, "precision": "DECIMALS", "decimals": ROUND,
+                   "is_packed": False, "render_engine": None, "asset_store": None}
+
+
+def export_settings(scene):
+    settings = {key: getattr(scene, "node_io_" + key) for key in EXPORT_SETTINGS
+                if key not in ("render_engine", "asset_store")}
+    settings['render_engine'] = scene.render.engine
+    return settings
+
+
+# collects what export_trees() and import_files() report when they aren't run by an operator
+class Reporter:
+    def __init__(self, echo=False):
+        self.echo = echo
+        self.reports = []
+
+    def report(self, kind, message):
+        self.reports.append([sorted(kind)[0], message])
+        if self.echo:
+            print(message)
+
+    def errors(self):
+        return [message for kind, message in self.reports if kind == "ERROR"]
+
+
+# run steps from export_job() or import_job() to the end, returns what the job returns
+def run_steps(steps):
+    if steps is None:
+        return None
+    while True:
+        try:
+            next(steps)
+        except StopIteration as e:
+            return e.value
 
 
 def export_node_tree(self, context):
-    to_export = []
-    # export_type = context.scene.node_io_export_type
-    export_path = bpy.path.abspath(context.scene.node_io_export_path)
-    folder_path = None
-    folder_name = None
+    run_steps(export_job(self, context))
+
+
+# the steps of exporting what the scene's export settings say, or None if there is nothing to export
+def export_job(self, context):
+    export_type = context.scene.node_io_export_type
     node_tree = context.space_data.node_tree
 
-    # check data
-    if not export_path:
-        self.report({"ERROR"}, "NodeIO: Empty Export Path")
-        return
-    elif not path.exists(export_path):
-        self.report({"ERROR"}, "NodeIO: Export Path '{}' Does Not Exist".format(export_path))
-        return
-    elif node_tree is None:
+    if node_tree is None and export_type == "1":
         self.report({"ERROR"}, "NodeIO: No Active Node Tree")
-        return
+        return None
 
     # COLLECT NEED INFORMATION: to_export allows multiple node_trees at a time. Info formatted into dict
-    # {"nodes":____, "links":____, "name":____, "bl_idname":_____}
-    if node_tree.bl_idname in ("ShaderNodeTree", "MitsubaShaderNodeTree"):
+    # {"nodes":____, "links":____, "name":____, "bl_idname":_____}, node groups exported on their own also have "group"
+    to_export = []
+    if export_type == "2":
+        to_export = bulk_export_list(context.scene.node_io_export_kinds, context.scene.node_io_export_filter)
+    elif node_tree.bl_idname in ("ShaderNodeTree", "MitsubaShaderNodeTree"):
         to_export.append({"nodes": node_tree.nodes, "links": node_tree.links, "name":
                          context.active_object.active_material.name, "bl_idname": node_tree.bl_idname})
     elif node_tree.bl_idname in ("an_AnimationNodeTree", "SverchCustomTreeType"):
@@ -283,348 +1661,1240 @@ def export_node_tree(self, context):
         to_export.append({"nodes": node_tree.nodes, "links": node_tree.links, "name":
             context.active_object.active_material.active_texture.name, "bl_idname": node_tree.bl_idname})
 
-    # create folder if more then one node_tree, or if paths are being made relative and there might be dependencies
-    if len(to_export) > 1 or context.scene.node_io_dependency_save_type == "2":
+    return export_steps(self, to_export, bpy.path.abspath(context.scene.node_io_export_path),
+                        export_settings(context.scene), export_type == "2")
+
+
+# export entries from export_entry() into export_path without needing a context. Settings missing from settings are
+# taken from EXPORT_SETTINGS. library writes every tree into one "<blend>_library" folder and reports once, like
+# exporting all node trees. Returns the totals of the export with the paths of the files written under "files", or
+# None if it couldn't be done
+def export_trees(self, to_export, export_path, settings=None, library=False):
+    return run_steps(export_steps(self, to_export, export_path, settings, library))
+
+
+# export_trees() in steps, yields ["Exporting", trees done, trees] before each tree and while collecting it, see
+# collect_steps(). Closing it in between drops the file and .zip being written, files already written into a folder
+# are kept
+def export_steps(self, to_export, export_path, settings=None, library=False):
+    settings = dict(EXPORT_SETTINGS, **(settings or {}))
+    export_type = "2" if library else "1"
+    render_engine = settings['render_engine'] or bpy.context.scene.render.engine
+    folder_path = None
+    folder_name = None
+    to_export = [entry for entry in to_export if entry is not None]
+
+    # check data
+    if not export_path:
+        self.report({"ERROR"}, "NodeIO: Empty Export Path")
+        return None
+    elif not path.exists(export_path):
+        self.report({"ERROR"}, "NodeIO: Export Path '{}' Does Not Exist".format(export_path))
+        return None
+    elif not to_export:
+        self.report({"ERROR"}, "NodeIO: No Node Trees To Export")
+        return None
+
+    # images go into the asset store with their content hash as name, so every export into it shares one copy
+    store_path = None
+    if settings['dependency_save_type'] == "3":
+        store_path = settings['asset_store'] or export_path + os_file_sep + ASSET_STORE_NAME
         try:
-            if len(to_export) > 1:
-                folder_name = "mat_group_{}".format(len(to_export))
-            else:
-                folder_name = to_export[0]['name']
-            folder_path = export_path + os_file_sep + folder_name
-            mkdir(folder_path)
-        except FileExistsError:
-            self.report({"INFO"}, "NodeIO: Directory '{}' Already Exists, Will Add/Overwrite Files In Directory".
-                        format(folder_path))
+            makedirs(store_path, exist_ok=True)
+        except OSError:
+            self.report({"ERROR"}, "NodeIO: Permission Denied '{}', Cannot Continue".format(store_path))
+            return None
+        asset_index = load_asset_index(store_path)
+        known_assets = dict(asset_index)
+
+    # create folder if more then one node_tree, or if paths are being made relative and there might be dependencies
+    # when compressing, files go straight into a .zip with the folder's name instead
+    archive, archive_path, archived = None, None, set()
+    if len(to_export) > 1 or export_type == "2" or settings['dependency_save_type'] == "2":
+        if export_type == "2":  # one library for the whole .blend
+            folder_name = "{}_library".format(bpy.path.display_name_from_filepath(bpy.data.filepath) or "untitled")
+        elif len(to_export) > 1:
+            folder_name = "mat_group_{}".format(len(to_export))
+        else:
+            folder_name = to_export[0]['name']
+        folder_path = export_path + os_file_sep + folder_name
+
+        if settings['is_compress']:
+            archive_path = folder_path + ".zip"
+            try:  # written next to the old .zip and swapped in once complete
+                archive = zipfile.ZipFile(archive_path + ".part", "w", zipfile.ZIP_DEFLATED)
+            except (PermissionError, FileNotFoundError):
+                self.report({"ERROR"}, "NodeIO: Permission Denied '{}', Cannot Continue".format(archive_path))
+                return None
+        else:
+            try:
+                mkdir(folder_path)
+            except FileExistsError:
+                self.report({"INFO"}, "NodeIO: Directory '{}' Already Exists, Will Add/Overwrite Files In "
+                                      "Directory".format(folder_path))
     else:
         folder_path = export_path
 
-    # export materials
-    for node_tree in to_export:
-        json_root = {}
-        names = {}
-        data, dependencies = [], []
-        m_links, m_nodes = node_tree["links"], node_tree["nodes"]
-
-        # get node data
-        collect_nodes(m_nodes, m_links, dependencies, names, "main", data)
-
-        # write data
-        # material attribs
-        t = datetime.now()
-        date_string = "{}/{}/{} at {}:{}:{} in {}".format(t.month, t.day, t.year, t.hour, t.minute,
-                                                          t.second, tzname[0])
-
-        node_counter = 0
-        for group in names:
-            json_root[group] = {'nodes': data[names[group]][0], 'links': data[names[group]][1]}
-            node_counter += len(data[names[group]][0])
-
-        # get order of groups
-        pre_order = sorted(names.items(), key=operator.itemgetter(1))
-        order = [i[0].replace("/", "_") for i in pre_order]
-        json_root['__info__'] = {'number_of_nodes': node_counter, 'group_order': order, "render_engine":
-                                 context.scene.render.engine, "node_tree_name": node_tree["name"],
-                                 "date_created": date_string, "version": VERSION, "node_tree_id":
-                                     node_tree["bl_idname"]}
-
-        # dependencies
-        depend_out = []  # collect all dependencies to place as attribute of root element so they can be imported first
-        duplicates = {}
-
-        # absolute filepaths
-        if context.scene.node_io_dependency_save_type == "1":
-            json_root['__info__']['path_type'] = "absolute"
-
-            # of format [node, node,...] where each node is [depend, depend,...] and depend is [type, name, path]
-            for node in dependencies:
-                for depend in node:
-                    if depend[1] not in duplicates or depend[1] in duplicates and depend[2] != duplicates[depend[1]]:
-                        depend_out.append([depend[0], depend[1], bpy.path.abspath(depend[2])])
-                        duplicates[depend[1]] = bpy.path.abspath(depend[2])
-        # relative filepaths
+    # dependencies point at the store relative to the folder the .bnodes file is in, or imported from if it is zipped
+    if store_path is not None:
+        try:
+            store_rel = path.relpath(store_path, folder_path).replace(os_file_sep, "/")
+        except ValueError:  # on another drive
+            store_rel = store_path
+
+    # trees whose hash matches the manifest of the last export are skipped. Their members of an older .zip are carried
+    # over into the new one, or the old .zip is kept if nothing changed at all
+    incremental = settings['is_incremental']
+    manifest_path = folder_path + MANIFEST_FILE_NAME if archive is not None else \
+        folder_path + os_file_sep + MANIFEST_FILE_NAME
+    manifest = load_manifest(manifest_path) if incremental else {}
+    manifest_out = dict(manifest) if archive is None else {}
+    old_archive, old_members, carry_over = None, set(), []
+    if incremental and archive is not None and path.exists(archive_path):
+        try:
+            old_archive = zipfile.ZipFile(archive_path)
+            old_members = set(old_archive.namelist())
+        except zipfile.BadZipFile:
+            manifest = {}
+
+    is_binary = settings['export_format'] == "2"
+    columnar = settings['is_columnar']
+    hash_settings = [is_binary, columnar, settings['is_elide_defaults'], settings['precision'], settings['decimals'],
+                     settings['is_packed']]
+    set_float_format(settings['precision'], settings['decimals'], settings['is_packed'])
+
+    # export materials, when there are several trees the groups collected for one are reused by the rest, and
+    # dependencies are only copied once
+    group_cache = {} if len(to_export) > 1 else None
+    file_names = set()
+    copied_to = set()  # files put in the asset store
+    relative_files = {}  # file name in the export folder or .zip -> the dependency copied under it
+    totals = {"trees": 0, "nodes": 0, "dependencies": 0, "copied": 0, "skipped": 0, "unchanged": 0, "files": []}
+
+    finish_file = None  # of the file being written
+    try:
+        for done, node_tree in enumerate(to_export):
+            progress = ["Exporting", done, len(to_export)]
+            yield progress
+
+            # already in another tree's file
+            if group_cache is not None and "group" in node_tree and node_tree["group"].as_pointer() in group_cache:
+                continue
+
+            dependencies = []
+            m_links, m_nodes = node_tree["links"], node_tree["nodes"]
+
+            file_name = node_tree["name"]
+            while file_name.lower() in file_names:  # a material and a texture can share a name
+                file_name += "_"
+            file_names.add(file_name.lower())
+            save_path = folder_path + os_file_sep + file_name + ".bnodes"
+
+            if incremental:
+                writer, finish_file = BufferWriter(columnar), None
+            else:
+                try:
+                    writer, finish_file = open_tree_writer(save_path, archive, is_binary, columnar)
+                except (PermissionError, FileNotFoundError):
+                    abort_export(self, save_path, archive, archive_path, old_archive)
+                    return None
+
+            # get node data, each group is written out as soon as it is collected
+            visited = {node_tree["group"].as_pointer()} if "group" in node_tree else None
+            writer.hash_main = "group" in node_tree
+            yield from collect_steps(m_nodes, m_links, dependencies, "main", writer, visited,
+                                     settings['is_elide_defaults'], group_cache, progress)
+
+            # material attribs
+            t = datetime.now()
+            date_string = "{}/{}/{} at {}:{}:{} in {}".format(t.month, t.day, t.year, t.hour, t.minute,
+                                                              t.second, tzname[0])
+
+            info = {'number_of_nodes': writer.node_count, 'group_order': writer.group_order(), "render_engine":
+                    render_engine, "node_tree_name": node_tree["name"], "date_created": date_string,
+                    "version": VERSION, "node_tree_id": node_tree["bl_idname"]}
+            features = [feature for feature, used in zip(FILE_FEATURES, (is_binary, columnar, settings['is_packed']))
+                        if used]
+            if features:
+                info['features'] = features
+            if "group" in node_tree:
+                info['is_node_group'] = True
+            if writer.hashes:  # lets imports reuse node groups that are the same, whatever they are called
+                info['group_hashes'] = writer.group_hashes()
+                info['group_hash_format'] = [settings['precision'], settings['decimals'], settings['is_packed'],
+                                             False]  # hashed with defaults whether or not they are left out
+
+            # dependencies
+            # collect all dependencies to place as attribute of root element so they can be imported first
+            depend_out = []
+            depend_stats = []
+            duplicates = {}
+
+            # absolute filepaths
+            if settings['dependency_save_type'] == "1":
+                info['path_type'] = "absolute"
+
+                # of format [node, node,...] where each node is [depend, depend,...] and depend is [type, name, path]
+                for node in dependencies:
+                    for depend in node:
+                        if depend[1] not in duplicates or depend[1] in duplicates and \
+                                depend[2] != duplicates[depend[1]]:
+                            depend_out.append([depend[0], depend[1], bpy.path.abspath(depend[2])])
+                            duplicates[depend[1]] = bpy.path.abspath(depend[2])
+            # content hashes in the asset store, copied right away as the store is never part of a .zip
+            elif settings['dependency_save_type'] == "3":
+                info['path_type'] = "store"
+
+                sources, names = [], []
+                for node in dependencies:
+                    for depend in node:
+                        if depend[1] not in duplicates:
+                            sources.append(bpy.path.abspath(depend[2]))
+                            names.append(depend[1])
+                            duplicates[depend[1]] = depend[1]
+
+                start = perf_counter()
+                copy_jobs, failed = [], 0
+                for name, src, content_hash in zip(names, sources, hash_assets(sources, asset_index)):
+                    if content_hash is None:
+                        failed += 1
+                        continue
+
+                    # Blender goes by the extension for some formats
+                    stored = content_hash + path.splitext(src)[1].lower()
+                    depend_out.append(["image", name, store_rel + "/" + stored, content_hash])
+                    if stored not in copied_to:
+                        copy_jobs.append([src, store_path + os_file_sep + stored])
+                        copied_to.add(stored)
+
+                copied, skipped, store_failed = copy_dependencies(copy_jobs, store_dependency)
+                failed += store_failed
+                if timings is not None:
+                    timings.add("store dependencies", start)
+                    timings.count("dependencies copied", copied)
+                if failed:
+                    self.report({"ERROR"}, "NodeIO: {} Dependency(ies) Couldn't Be Copied".format(failed))
+                totals['copied'] += copied
+                totals['skipped'] += skipped
+            # relative filepaths
+            else:
+                info['path_type'] = "relative"
+
+                copy_jobs = []
+                for node in dependencies:
+                    for depend in node:
+                        if depend[1] not in duplicates:
+                            depend_path = bpy.path.abspath(depend[2])
+                            relative_name = relative_file_name(relative_files, depend[1], depend_path)
+                            depend_out.append([depend[0], depend[1], os_file_sep + relative_name])
+                            if incremental:  # a changed image changes the tree's hash
+                                try:
+                                    depend_stat = stat(depend_path)
+                                    depend_stats.append([depend[1], depend_stat.st_mtime_ns, depend_stat.st_size])
+                                except OSError:
+                                    depend_stats.append([depend[1], None, None])
+                            if relative_name not in relative_files:  # shared with a tree exported before
+                                copy_jobs.append([depend_path, folder_path + os_file_sep + relative_name])
+                                relative_files[relative_name] = depend_path
+                            duplicates[depend[1]] = depend[1]
+
+            info['dependencies'] = depend_out
+
+            # skip the tree if it is the same as last time and its file is still there, otherwise write it out now
+            if incremental:
+                member = file_name + ".bnodes"
+                start = perf_counter()
+                tree_hash = writer.tree_hash(info, hash_settings + depend_stats)
+                if timings is not None:
+                    timings.add("hash trees", start)
+                manifest_out[member] = tree_hash
+
+                # the manifest can be stale, so the tree only counts as unchanged if its file and copied dependencies
+                # are all still there
+                kept = [member] + [relative_dependency_name(depend) for depend in depend_out
+                                   if info['path_type'] == "relative"]
+                if archive is not None:
+                    is_kept = all(name in old_members for name in kept)
+                else:
+                    is_kept = all(path.exists(folder_path + os_file_sep + name) for name in kept)
+
+                if manifest.get(member) == tree_hash and is_kept:
+                    if archive is not None:
+                        carry_over.extend(kept)
+                    totals['unchanged'] += 1
+                    if export_type == "1":
+                        self.report({"INFO"}, "NodeIO: '{}' Is Unchanged, Skipped".format(info['node_tree_name']))
+                    continue
+
+                try:
+                    buffered, (writer, finish_file) = writer, open_tree_writer(save_path, archive, is_binary, columnar)
+                except (PermissionError, FileNotFoundError):
+                    abort_export(self, save_path, archive, archive_path, old_archive)
+                    return None
+                buffered.replay(writer)
+
+            # finish file
+            start = perf_counter()
+            writer.close(info)
+            finish_file()  # spooled files are copied into the archive here, files on disk replace the old ones
+            finish_file = None
+            if archive is None:
+                totals['files'].append(save_path)
+            if timings is not None:
+                timings.add("finish files", start)
+                timings.count("bytes written", writer.bytes_written)
+
+            # copy dependencies, into the archive only once the .bnodes member is closed
+            if info['path_type'] == "relative":
+                start = perf_counter()
+                if archive is not None:
+                    copied, skipped, failed = archive_dependencies(archive, copy_jobs, archived)
+                else:
+                    copied, skipped, failed = copy_dependencies(copy_jobs)
+                if timings is not None:
+                    timings.add("copy dependencies", start)
+                    timings.count("dependencies copied", copied)
+                if failed:
+                    self.report({"ERROR"}, "NodeIO: {} Dependency(ies) Couldn't Be Copied".format(failed))
+                totals['copied'] += copied
+                totals['skipped'] += skipped
+
+            totals['trees'] += 1
+            totals['nodes'] += info['number_of_nodes']
+            totals['dependencies'] += len(info['dependencies'])
+
+            if export_type == "2":  # bulk exports are reported once at the end
+                continue
+            if info['path_type'] in ("relative", "store"):
+                self.report({"INFO"}, "NodeIO: Exported '{}' With {} Nodes And {} Dependencies ({} Copied, {} Already "
+                                      "Up To Date)".format(info['node_tree_name'], info['number_of_nodes'],
+                                                           len(info['dependencies']), copied, skipped))
+            else:
+                self.report({"INFO"}, "NodeIO: Exported '{}' With {} Nodes And {} Dependencies".format(
+                    info['node_tree_name'], info['number_of_nodes'], len(info['dependencies'])))
+    except BaseException:  # failed or cancelled, files from an earlier export are only replaced by complete ones
+        if finish_file is not None:
+            finish_file(False)
+        discard_export(archive, archive_path, old_archive)
+        raise
+
+    if export_type == "2":
+        self.report({"INFO"}, "NodeIO: Exported {} Node Trees With {} Nodes And {} Dependencies ({} Copied, {} Already "
+                              "Up To Date, {} Unchanged Trees Skipped)".format(totals['trees'], totals['nodes'],
+                                                                               totals['dependencies'],
+                                                                               totals['copied'], totals['skipped'],
+                                                                               totals['unchanged']))
+
+    remove_scratch_trees()
+
+    # finish zip, replacing any older one. If every tree was unchanged the old one is kept as is
+    start = perf_counter()
+    if archive is not None:
+        if old_archive is not None and not totals['trees'] and set(carry_over) >= set(old_archive.namelist()):
+            archive.close()
+            remove_file(archive_path + ".part")
         else:
-            json_root['__info__']['path_type'] = "relative"
+            if old_archive is not None:
+                carry_over_members(old_archive, archive, carry_over, archived)
+            archive.close()
+            replace_file(archive_path + ".part", archive_path)
+            totals['files'].append(archive_path)
+
+    if old_archive is not None:
+        old_archive.close()
+    if incremental:
+        save_manifest(manifest_path, manifest_out)
+    elif path.exists(manifest_path):  # the files it describes were just replaced
+        remove_file(manifest_path)
+    if store_path is not None and asset_index != known_assets:
+        try:
+            save_asset_index(store_path, {src: entry for src, entry in asset_index.items()
+                                          if known_assets.get(src) != entry})
+        except OSError as e:
+            self.report({"WARNING"}, "NodeIO: Couldn't Update Asset Store Index, {}".format(e))
+    if timings is not None:
+        timings.add("finish archive", start)
+
+    # keep a library index that already exists in the export folder current with the files just written
+    if sqlite3 is not None and path.exists(path.join(export_path, INDEX_FILE_NAME)):
+        start = perf_counter()
+        try:
+            update_library_index(export_path, [file_path for file_path in totals['files']
+                                               if file_path.endswith(".bnodes")])
+        except sqlite3.Error as e:
+            self.report({"WARNING"}, "NodeIO: Couldn't Update Library Index, {}".format(e))
+        if timings is not None:
+            timings.add("update library index", start)
 
-            for node in dependencies:
-                for depend in node:
-                    if depend[1] not in duplicates:
-                        depend_path = bpy.path.abspath(depend[2])
-                        depend_out.append([depend[0], depend[1], os_file_sep + depend[1]])
-                        copyfile(depend_path, folder_path + os_file_sep + depend[1])
-                        duplicates[depend[1]] = depend[1]
+    return totals
 
-        json_root['__info__']['dependencies'] = depend_out
-        save_path = folder_path + os_file_sep + node_tree["name"] + ".bnodes"
 
-        # write file
-        try:
-            file = open(save_path, 'w')
-            if DEBUG_FILE:  # make multiple lines and indent if trying to debug
-                json.dump(json_root, file, indent=4)
-            else:
-                json.dump(json_root, file)
+# decoded .bnodes files kept for the session so importing the same file again skips reading and decoding it,
+# {(path, zip member, mtime, size, crc): [root, estimated bytes, groups counted]} from least to most recently used.
+# Binary files are kept as their BinaryReader, which holds on to the groups it has decoded, so only what an import
+# needed is cached. Importing never changes a decoded file, so cached roots are shared rather than copied
+file_cache = OrderedDict()
+file_cache_stats = {"limit": FILE_CACHE_SIZE, "bytes": 0, "hits": 0, "misses": 0}
+
+
+# estimated memory of a decoded value, strings shared between values are counted each time
+def value_size(val):
+    size = sys.getsizeof(val)
+    if isinstance(val, dict):
+        for key, item in val.items():
+            size += sys.getsizeof(key) + value_size(item)
+    elif isinstance(val, list):
+        for item in val:
+            size += value_size(item)
+    return size
+
+
+# identifies a source of read_import_file() and the version of it on disk, None if it can't be found
+def file_cache_key(source):
+    try:
+        if isinstance(source, tuple):
+            member = source[0].getinfo(source[1])
+            file_stat = stat(source[0].filename)
+            return source[0].filename, source[1], file_stat.st_mtime_ns, file_stat.st_size, member.CRC
+        file_stat = stat(source)
+        return source, None, file_stat.st_mtime_ns, file_stat.st_size, None
+    except (OSError, KeyError):
+        return None
+
+
+def get_cached_file(key):
+    entry = file_cache.get(key)
+    if entry is None:
+        file_cache_stats['misses'] += 1
+        return None
+
+    file_cache.move_to_end(key)
+    file_cache_stats['hits'] += 1
+    return entry[0]
+
+
+# estimated memory of a cached root, a BinaryReader only counts the groups it has decoded so far
+def cached_size(root):
+    if isinstance(root, BinaryReader):
+        return root.memory + value_size(root.info) + value_size(root.groups)
+    return value_size(root)
+
+
+# cache a checked root from read_import_file(), binary files aren't read any further here. Returns the root to use
+def cache_file(key, root):
+    size = cached_size(root)
+    if size <= file_cache_stats['limit']:
+        for old_key in [i for i in file_cache if i[:2] == key[:2]]:  # older versions of the same file
+            file_cache_stats['bytes'] -= file_cache.pop(old_key)[1]
+        file_cache[key] = [root, size, len(root.groups) if isinstance(root, BinaryReader) else 0]
+        file_cache_stats['bytes'] += size
+        trim_file_cache()
+    return root
+
+
+# count cached binary files again once an import has decoded more of their groups
+def refresh_file_cache():
+    for entry in file_cache.values():
+        if isinstance(entry[0], BinaryReader) and len(entry[0].groups) != entry[2]:
+            size = cached_size(entry[0])
+            file_cache_stats['bytes'] += size - entry[1]
+            entry[1:] = [size, len(entry[0].groups)]
+    trim_file_cache()
+
+
+def trim_file_cache():
+    while file_cache_stats['bytes'] > file_cache_stats['limit'] and file_cache:
+        file_cache_stats['bytes'] -= file_cache.popitem(last=False)[1][1]
+
+
+# limit is in bytes, 0 turns the cache off. The panel sets it from node_io_cache_size before each import, import_files()
+# takes it as cache_limit
+def set_file_cache_limit(limit):
+    file_cache_stats['limit'] = limit
+    trim_file_cache()
+
+
+def clear_file_cache():
+    file_cache.clear()
+    file_cache_stats.update(bytes=0, hits=0, misses=0)
+
+
+# {"files": files cached, "bytes": their estimated memory, "limit": ..., "hits": ..., "misses": ...}
+def file_cache_info():
+    return dict(file_cache_stats, files=len(file_cache))
+
+
+archive_lock = Lock()  # held while reading from a ZipFile, as ZipFile isn't safe to read from several threads at once
+
+
+# read and check a .bnodes file without touching bpy, so it can be run in a worker thread. Returns (root, error)
+# source is a file path or (ZipFile, member name). Binary files are only read as far as needed to check them, their
+# groups are read when the file is imported, so the root of a binary file must be closed with close_import_file().
+# It is closed before returning so a large folder doesn't hold a descriptor per file until it's planned, and reopens
+# the file, or the member read from a .zip, when a group is next looked up
+def read_import_file(source, render_engine):
+    file, data, root, error = None, None, None, None
+    try:
+        if isinstance(source, tuple):
+            name = source[1]
+            with archive_lock:  # the reading threads share one ZipFile
+                data = source[0].read(source[1])
+            file = io.BytesIO(data)
+            reopen = lambda: io.BytesIO(data)
+        else:
+            name = path.basename(source)
+            file = open(source, 'rb')
+            reopen = lambda: open(source, 'rb')
+        root = open_bnodes(file, reopen)
+        if isinstance(root, BinaryReader) and data is not None:
+            root.memory = len(data)
+        root, error = check_import_file(root, name, render_engine)
+    except (OSError, ValueError, KeyError, IndexError, struct.error, zipfile.BadZipFile) as e:
+        root, error = None, "NodeIO: Couldn't Read '{}', {}".format(name, e)
+    finally:
+        if isinstance(root, BinaryReader):
+            root.close()
+        elif file is not None:
             file.close()
 
-            self.report({"INFO"}, "NodeIO: Exported '{}' With {} Nodes And {} Dependencies".format(
-                json_root['__info__']['node_tree_name'], json_root['__info__']['number_of_nodes'],
-                len(json_root['__info__']['dependencies'])))
-        except (PermissionError, FileNotFoundError):
-            self.report({"ERROR"}, "NodeIO: Permission Denied '{}', Cannot Continue".format(save_path))
-            return
+    if error is not None:
+        return None, error
+    return root, None
+
+
+def close_import_file(root):
+    if isinstance(root, BinaryReader):
+        root.close()
 
-    # zip folder
-    if folder_path != export_path and context.scene.node_io_is_compress:  # if folder has been created
-        if path.exists(folder_path + ".zip"):  # if zipped file is already there, delete
-            remove_file(folder_path + ".zip")
 
-        zf = zipfile.ZipFile(folder_path + ".zip", "w", zipfile.ZIP_DEFLATED)
-        for dirname, subdirs, files in walk(folder_path):
-            for filename in files:
-                zf.write(path.join(dirname, filename), arcname=filename)
-        zf.close()
+def check_import_file(root, name, render_engine):
+    info = root.get('__info__') if isinstance(root, (dict, BinaryReader)) else None
+    if not isinstance(info, dict):
+        return root, "NodeIO: '{}' Is Not A .bnodes File".format(name)
 
-        # delete non-compressed folder
-        rmtree(folder_path)
+    for key in ('node_tree_id', 'node_tree_name', 'render_engine', 'group_order', 'dependencies', 'path_type',
+                'number_of_nodes'):
+        if key not in info:
+            return root, "NodeIO: '{}' Is Missing '{}'".format(name, key)
 
+    unknown = [feature for feature in info.get('features', []) if feature not in FILE_FEATURES]
+    if unknown:
+        return root, "NodeIO: '{}' Was Written By NodeIO {} And Uses {}, Which This Version Can't Read".format(
+            name, ".".join(str(i) for i in info.get('version', [])), ", ".join(unknown))
 
-def import_node_tree(self, context):
-    if context.scene.node_io_import_type == "1":  # single file
+    if info['node_tree_id'] not in SUPPORTED_TREES:
+        return root, "NodeIO: '{}' Has Unsupported Node Tree Type '{}'".format(name, info['node_tree_id'])
+
+    # make sure in correct render mode, checked before any groups are read
+    if info['node_tree_id'] in ('ShaderNodeTree', 'MitsubaShaderNodeTree') and info['render_engine'] != render_engine:
+        return root, "NodeIO: Please Switch To '{}' Engine".format(info['render_engine'])
+
+    try:
+        for group_name in info['group_order']:
+            if group_name not in root:
+                return root, "NodeIO: '{}' Is Missing Group '{}'".format(name, group_name)
+    except (OSError, ValueError, KeyError, IndexError, struct.error) as e:
+        return root, "NodeIO: Couldn't Read '{}', {}".format(name, e)
+
+    return root, None
+
+
+# file_path imports just that file instead of what the import settings point at
+def import_node_tree(self, context, file_path=None):
+    run_steps(import_job(self, context, file_path))
+
+
+# the steps of importing what the scene's import settings point at, or None if the path is wrong
+def import_job(self, context, file_path=None):
+    import_type = "1" if file_path is not None else context.scene.node_io_import_type
+
+    if file_path is not None:
+        import_path = file_path
+    elif import_type == "1":  # single file
         import_path = bpy.path.abspath(context.scene.node_io_import_path_file)
-        folder_path = path.dirname(import_path)
     else:  # all files in folder
         import_path = bpy.path.abspath(context.scene.node_io_import_path_dir)
-        folder_path = import_path
+
+    if import_type == "1" and import_path and not import_path.endswith(".bnodes") and \
+            not import_path.endswith('.zip'):
+        self.report({"ERROR"}, "NodeIO: Filepath Does Not End With .bnodes")
+        return None
+
+    return import_steps(self, import_path, context.scene.render.engine, import_target(context),
+                        cache_limit=context.scene.node_io_cache_size * 1024 * 1024)
+
+
+# where an import shows and adds the trees it creates, taken from context up front as a modal import runs over many
+# calls and a context is only valid during the call it was passed to. None when importing without a context
+def import_target(context):
+    if context is None:
+        return None
+    material = context.active_object.active_material if context.active_object is not None else None
+    return {"space": context.space_data, "object": context.object, "material": material,
+            "is_auto_add": context.scene.node_io_is_auto_add}
+
+
+# import a .bnodes file, every .bnodes file in a folder, or every one in a .zip without needing a context. Shader
+# trees are only imported if they were exported from render_engine, by default the current scene's. With a context,
+# created trees are shown in the node editor and added to the active object if the scene says so. Returns the
+# materials, textures and node groups created, or None if nothing could be imported. cache_limit sets the limit of the
+# file cache in bytes before importing, 0 turns it off, and None keeps the current one (FILE_CACHE_SIZE by default)
+def import_files(self, import_path, render_engine=None, context=None, cache_limit=None):
+    return run_steps(import_steps(self, import_path, render_engine, import_target(context), cache_limit))
+
+
+# import_files() in steps, yields [phase, done, total] as files are read ("Reading") and planned ("Planning"), and every
+# IMPORT_CHUNK nodes created ("Importing"). Closing it in between, or an error while creating nodes, removes everything
+# it already created. target is from import_target()
+def import_steps(self, import_path, render_engine=None, target=None, cache_limit=None):
+    render_engine = render_engine or bpy.context.scene.render.engine
+    if cache_limit is not None:
+        set_file_cache_limit(cache_limit)
+    folder_path = import_path if path.isdir(import_path) else path.dirname(import_path)
 
     # check file path
     if not import_path:
         self.report({"ERROR"}, "NodeIO: Empty Import Path")
-        return
+        return None
     elif not path.exists(import_path):
         self.report({"ERROR"}, "NodeIO: Filepath '{}' Does Not Exist".format(import_path))
-        return
-    elif context.scene.node_io_import_type == "1" and not import_path.endswith(".bnodes") and \
-            not import_path.endswith('.zip'):
-        self.report({"ERROR"}, "NodeIO: Filepath Does Not End With .bnodes")
-        return
+        return None
 
     # collect filepaths
     import_list = []
+    archive = None
 
-    if context.scene.node_io_import_type == "2" and not import_path.endswith('.zip'):  # import all files in folder
+    if path.isdir(import_path):  # import all files in folder
         files = listdir(import_path)
 
         for file in files:
             if file.endswith(".bnodes"):
                 import_list.append(import_path + os_file_sep + file)
-    elif import_path.endswith('.zip'):
-        zip_folder = zipfile.ZipFile(import_path)
-        folder_path = path.dirname(import_path) + os_file_sep + path.basename(import_path).split(".")[0]
-
+    elif import_path.endswith('.zip'):  # files and dependencies are read straight from the archive
         try:
-            mkdir(folder_path)  # create new folder
-        except FileExistsError:
-            self.report({"INFO"}, "NodeIO: Folder Already Exists")
-
-        for file_name in zip_folder.namelist():  # open zip file and write it to new directory
-            f = open(folder_path + os_file_sep + file_name, 'wb')
-            f.write(zip_folder.open(file_name, 'r').read())
-            f.close()
+            archive = zipfile.ZipFile(import_path)
+        except zipfile.BadZipFile:
+            self.report({"ERROR"}, "NodeIO: '{}' Is Not A Valid .zip File".format(import_path))
+            return None
+        folder_path = path.dirname(import_path) + os_file_sep + path.basename(import_path).split(".")[0]
 
+        for file_name in archive.namelist():
             if file_name.endswith('.bnodes'):
-                import_list.append(folder_path + os_file_sep + file_name)
+                import_list.append((archive, file_name))
     else:
         import_list.append(import_path)
 
-    # for each .bnodes file import and create material
-    for file_path in import_list:
-        file = open(file_path, 'r')
-        root = json.load(file)
-        file.close()
+    # read and check every file before creating anything, files decoded by an earlier import come from the cache and
+    # the rest are read in threads, as reading doesn't touch bpy
+    roots, errors = [], []
+    start = perf_counter()
+    results, to_read = [None] * len(import_list), []
+    keys = [file_cache_key(source) if file_cache_stats['limit'] else None for source in import_list]
+    for i, source in enumerate(import_list):
+        cached = get_cached_file(keys[i]) if keys[i] is not None else None
+        if cached is not None:
+            results[i] = check_import_file(cached, source[1] if isinstance(source, tuple) else path.basename(source),
+                                           render_engine)
+        else:
+            to_read.append(i)
+
+    sources, read = [import_list[i] for i in to_read], []
+    with ThreadPoolExecutor(max_workers=max(1, min(IMPORT_THREADS, len(to_read)))) as pool:
+        futures = [pool.submit(read_import_file, source, render_engine) for source in sources]
+        for future in futures:
+            read.append(future.result())
+            try:
+                yield ["Reading", len(read), len(futures)]
+            except GeneratorExit:
+                for future in futures:
+                    if not future.cancel():  # read already, or being read
+                        close_import_file(future.result()[0])
+                if archive is not None:
+                    archive.close()
+                raise
+
+    # files on disk read as a BinaryReader only count the parts of them read before they are closed after planning
+    file_bytes, readers = 0, []
+    for source, (root, error) in zip(sources, read):
+        if isinstance(source, tuple):
+            file_bytes += source[0].getinfo(source[1]).file_size
+        elif isinstance(root, BinaryReader):
+            readers.append(root)
+        else:
+            file_bytes += stat(source).st_size
+
+    for i, (root, error) in zip(to_read, read):
+        if error is None and keys[i] is not None:
+            root = cache_file(keys[i], root)
+        results[i] = (root, error)
+
+    if timings is not None:
+        timings.add("read files", start, len(import_list))
+        timings.count("files", len(import_list))
+        timings.count("cached files", len(import_list) - len(to_read))
 
-        node_tree, nodes, links = None, None, None
-
-        # determine type
-        if root['__info__']['node_tree_id'] == 'ShaderNodeTree':
-            # make sure in correct render mode
-            if root['__info__']['render_engine'] != context.scene.render.engine:
-                self.report({"ERROR"}, "NodeIO: Please Switch To '{}' Engine".format(root['__info__']
-                                                                                     ['render_engine']))
-                return
-
-            node_tree = bpy.data.materials.new(root['__info__']['node_tree_name'])
-            node_tree.use_nodes = True
-            nodes = node_tree.node_tree.nodes
-            links = node_tree.node_tree.links
-
-        elif root['__info__']['node_tree_id'] == "MitsubaShaderNodeTree":
-            # make sure in correct render mode
-            if root['__info__']['render_engine'] != context.scene.render.engine:
-                self.report({"ERROR"}, "NodeIO: Please Switch To '{}' Engine".format(root['__info__']
-                                                                                     ['render_engine']))
-                return
-
-            node_tree = bpy.data.materials.new(root['__info__']['node_tree_name'])
-            context.space_data.node_tree = node_tree
-            mitsuba_tree = bpy.data.node_groups.new(name=root['__info__']['node_tree_name'],
-                                                    type="MitsubaShaderNodeTree")
-            nodes = mitsuba_tree.nodes
-            links = mitsuba_tree.links
-            node_tree.mitsuba_nodes.nodetree = mitsuba_tree.name
-
-        elif root['__info__']['node_tree_id'] in ("an_AnimationNodeTree", "SverchCustomTreeType"):
-            node_tree = bpy.data.node_groups.new(name=root['__info__']['node_tree_name'],
-                                                 type=root['__info__']['node_tree_id'])
-            context.space_data.node_tree = node_tree
-            nodes = node_tree.nodes
-            links = node_tree.links
-
-        elif root['__info__']['node_tree_id'] == "TextureNodeTree":
-            node_tree = bpy.data.textures.new(name=root['__info__']['node_tree_name'], type='NONE')
-            node_tree.use_nodes = True
-            nodes = node_tree.node_tree.nodes
-            links = node_tree.node_tree.links
-
-        # remove any default nodes
-        for i in nodes:
-            nodes.remove(i)
-
-        # import dependencies
-        dependencies = root['__info__']['dependencies']
-        depend_errors = 0
-
-        for depend in dependencies:
-            if depend[0] == "image" and depend[1] not in bpy.data.images:
+    for root, error in results:
+        if error is not None:
+            errors.append(error)
+        else:
+            roots.append(root)
+
+    if errors:
+        for error in errors:
+            self.report({"ERROR"}, error)
+        for root in roots:
+            close_import_file(root)
+        if archive is not None:
+            archive.close()
+        return None
+
+    # plan every file before creating anything, so missing node types and broken links are reported up front
+    plans = []
+    planned_groups = {"names": set(), "hashes": set(), "index": {}}  # see plan_import()
+    start = perf_counter()
+    for i, root in enumerate(roots):
+        try:
+            plan, plan_errors = plan_import(self, root, planned_groups)
+        except (OSError, ValueError, KeyError, IndexError, TypeError, struct.error) as e:
+            plan, plan_errors = None, ["NodeIO: Couldn't Read '{}', {}".format(root['__info__']['node_tree_name'], e)]
+        except BaseException:
+            for other in roots[i:]:
+                close_import_file(other)
+            if archive is not None:
+                archive.close()
+            raise
+        close_import_file(root)
+
+        errors.extend(plan_errors)
+        if plan is not None:
+            plans.append(plan)
+
+        try:
+            yield ["Planning", i + 1, len(roots)]
+        except GeneratorExit:
+            for root in roots[i + 1:]:
+                close_import_file(root)
+            if archive is not None:
+                archive.close()
+            raise
+
+    refresh_file_cache()
+    if timings is not None:
+        timings.add("plan", start, len(roots))
+        timings.count("file bytes", file_bytes + sum(reader.bytes_read for reader in readers))
+
+    if errors:
+        for error in errors:
+            self.report({"ERROR"}, error)
+        if archive is not None:
+            archive.close()
+        return None
+
+    created_groups = {}
+    created, created_ids = [], []
+    progress = ["Importing", 0, sum(len(group_plan['nodes']) for plan in plans for group_plan in plan['groups'])]
+    try:
+        for plan in plans:
+            node_tree = yield from execute_import_steps(self, target, plan, archive, folder_path, created_groups,
+                                                        progress, created_ids)
+            created.append(node_tree)
+    except BaseException:  # failed or cancelled, nothing half imported is left behind
+        remove_created(created_ids)
+        raise
+    finally:
+        if any(collection is bpy.data.node_groups for collection, datablock in created_ids):
+            group_hash_index.clear()  # without waiting for Blender's next scene update
+        if archive is not None:
+            archive.close()
+    return created
+
+
+# remove the [collection, datablock], ... an import created, newest first
+def remove_created(created_ids):
+    for collection, datablock in reversed(created_ids):
+        collection.remove(datablock, do_unlink=True)
+
+
+# the node tree type node groups are created with for each type of node tree
+GROUP_TREE_TYPES = {"ShaderNodeTree": "ShaderNodeTree", "TextureNodeTree": "TextureNodeTree",
+                    "SverchCustomTreeType": "SverchGroupTreeType"}
+
+
+# {(tree type, hash format): node_group_hashes() result} kept while the .blend's node groups stay the same. Only used
+# while group_hash_update_handler is registered, as that is what notices a node group changing
+group_hash_index = {}
+
+
+# scene_update_post handler, a node group being added, removed or edited makes every hash index out of date
+@bpy.app.handlers.persistent
+def group_hash_update_handler(scene):
+    if getattr(bpy.data.node_groups, "is_updated", True):
+        group_hash_index.clear()
+
+
+# load_post, undo_post and redo_post handler, the node groups can be entirely different afterwards
+@bpy.app.handlers.persistent
+def clear_group_hash_handler(*args):
+    group_hash_index.clear()
+
+
+# {content hash: name} of the node groups of tree_type in the .blend, hashed like an export with hash_format
+# ([precision, decimals, packed, elide]) would. Hashing them isn't part of the import asking for it, so it is timed as
+# one phase rather than counted as collected nodes and links. Only files from before group hashes were made with every
+# value need defaults, and so scratch trees, for it
+def node_group_hashes(tree_type, hash_format):
+    global timings
+    key = (tree_type, tuple(hash_format))
+    if key in group_hash_index and group_hash_update_handler in bpy.app.handlers.scene_update_post:
+        return group_hash_index[key]
+
+    precision, decimals, packed, elide = hash_format
+    old_format = dict(float_format)
+    set_float_format(precision, decimals, packed)
+
+    start, import_timings, timings = perf_counter(), timings, None
+    writer, visited, cache = HashWriter(), set(), {}
+    try:
+        for group in list(bpy.data.node_groups):
+            if group.bl_idname == tree_type and group.as_pointer() not in visited and \
+                    not group.name.startswith(SCRATCH_TREE_NAME):
+                collect_group(group, [], writer, visited, elide, cache)
+    finally:
+        timings = import_timings
+        remove_scratch_trees()
+        set_float_format(old_format['precision'], old_format['decimals'], old_format['packed'])
+
+    if timings is not None:
+        timings.add("hash node groups", start, len(writer.hashes))
+    group_hash_index[key] = {content_hash: name for name, content_hash in writer.hashes.items()}
+    return group_hash_index[key]
+
+
+# nodes of a group in either layout as (bl_idname, attribute names, values, inputs, outputs, monad name)
+def group_nodes(group):
+    if 'node_types' in group:
+        for block in group['node_types']:
+            atts = tuple(block['attributes'])
+            monads = block.get('monad.name')
+            for i in range(len(block['rows'])):
+                yield (block['bl_idname'], atts, block['rows'][i], block['inputs'][i], block['outputs'][i],
+                       monads[i] if monads is not None else None)
+    else:
+        for node in group['nodes']:
+            nos = node['node_specific']
+            yield (node['bl_idname'], tuple(nos[0::2]), nos[1::2], node['inputs'], node['outputs'],  # name, value...
+                   node.get('monad.name'))
+
+
+# turn a checked .bnodes root into an import plan without creating anything, returns (plan, errors). A plan is
+# {"info": __info__, "groups": [{"name": ..., "hash": content hash or None, "nodes": [[bl_idname, monad name,
+# attribute plan, values, inputs, outputs], ...], "parents": [[node, parent], ...], "links": [[from node, from
+# identifier, from index, to node, to identifier, to index], ...]}, ...], "group_names": {group name in the file:
+# existing group used instead}} with nodes referred to by their position in "nodes". Groups that already exist are
+# left out, and plan is None if there is nothing to import.
+# Files with group hashes reuse node groups with the same content whatever their name, older files reuse groups with
+# the same name. planned_groups is {"names": set(), "hashes": set(), "index": {}} shared by the files of an import,
+# so groups planned by an earlier file aren't planned again and node groups of the .blend are only hashed once
+def plan_import(self, root, planned_groups):
+    info = root['__info__']
+    name = info['node_tree_name']
+    group_hashes = info.get('group_hashes', {})
+    plan = {"info": info, "groups": [], "group_names": {}}
+    errors = []
+
+    index = {}  # content hash -> node group of the .blend
+    if group_hashes and info['node_tree_id'] in GROUP_TREE_TYPES:
+        index_key = (GROUP_TREE_TYPES[info['node_tree_id']], tuple(info['group_hash_format']))
+        if index_key not in planned_groups['index']:
+            planned_groups['index'][index_key] = node_group_hashes(*index_key)
+        index = planned_groups['index'][index_key]
+
+    if info.get('is_node_group', False):
+        main_hash = group_hashes.get("main")
+        if main_hash is not None and (main_hash in index or main_hash in planned_groups['hashes']):
+            self.report({"INFO"}, "NodeIO: Node Group '{}' Already Exists As '{}'".format(
+                name, index.get(main_hash, name)))
+            return None, errors
+        elif main_hash is None and (name in bpy.data.node_groups or name in planned_groups['names']):
+            self.report({"INFO"}, "NodeIO: Node Group '{}' Already Exists".format(name))
+            return None, errors
+        elif main_hash is not None:
+            planned_groups['hashes'].add(main_hash)
+
+    attribute_plans = {}  # attribute names -> (attribute plan, column of name, column of parent)
+    node_types = {}  # bl_idname -> whether nodes of that type are created
+
+    for group_name in info['group_order']:
+        content_hash = group_hashes.get(group_name)
+        if group_name != "main":
+            if info['node_tree_id'] not in GROUP_TREE_TYPES:
+                errors.append("NodeIO: '{}' Has Node Groups, Which '{}' Trees Can't Have".format(
+                    name, info['node_tree_id']))
+                break
+
+            # create only if needed, groups planned by an earlier file get their name once they are created
+            if content_hash is not None:
+                if content_hash in index:
+                    plan['group_names'][group_name] = index[content_hash]
+                    continue
+                elif content_hash in planned_groups['hashes']:
+                    continue
+                planned_groups['hashes'].add(content_hash)
+            elif group_name in bpy.data.node_groups or group_name in planned_groups['names']:
+                continue
+            planned_groups['names'].add(group_name)
+
+        group = root[group_name]
+        group_plan = {"name": group_name, "hash": content_hash, "nodes": [], "parents": [], "links": []}
+        positions = {}  # node name -> position in group_plan["nodes"], None if the node is skipped
+        parent_names = []
+
+        for node_id, atts, values, inputs, outputs, monad in group_nodes(group):
+            if atts not in attribute_plans:
+                attribute_plans[atts] = (import_attribute_plan(atts), atts.index("name") if "name" in atts else None,
+                                         atts.index("parent") if "parent" in atts else None)
+            attribute_plan, name_column, parent_column = attribute_plans[atts]
+            node_name = values[name_column] if name_column is not None and name_column < len(values) else None
+
+            # check if node is custom then make sure it is installed, group nodes of monads are only known once the
+            # monad is created
+            if node_id not in node_types:
+                if is_addon_missing(self, node_id):
+                    node_types[node_id] = False
+                elif node_id[0:11] != "SvGroupNode" and not hasattr(bpy.types, node_id):
+                    errors.append("NodeIO: '{}' Uses Node Type '{}', Which Isn't Available".format(name, node_id))
+                    node_types[node_id] = False
+                else:
+                    node_types[node_id] = True
+
+            if not node_types[node_id]:
+                positions[node_name] = None
+                continue
+
+            positions[node_name] = len(group_plan["nodes"])
+            group_plan["nodes"].append([node_id, monad if node_id[0:11] == "SvGroupNode" else None, attribute_plan,
+                                        values, inputs, outputs])
+
+            if parent_column is not None and parent_column < len(values) and values[parent_column] is not None:
+                parent_names.append([positions[node_name], values[parent_column]])
+
+        for node, parent in parent_names:
+            if positions.get(parent) is not None:
+                group_plan["parents"].append([node, positions[parent]])
+
+        for link in group['links']:
+            if link[0] not in positions or link[2] not in positions:
+                errors.append("NodeIO: '{}' Has A Link Between Unknown Nodes '{}' And '{}'".format(name, link[0],
+                                                                                                   link[2]))
+                break
+            elif positions[link[0]] is None or positions[link[2]] is None:  # to or from a skipped node
+                continue
+
+            if len(link) > 4:  # sockets by identifier
+                group_plan["links"].append([positions[link[0]], link[4], link[1], positions[link[2]], link[5],
+                                            link[3]])
+            else:
+                group_plan["links"].append([positions[link[0]], None, link[1], positions[link[2]], None, link[3]])
+
+        plan["groups"].append(group_plan)
+
+    return plan, errors
+
+
+# create what a plan from plan_import() describes, returns the material, texture or node group created. target is
+# from import_target(), None when importing without a context. created_groups is {content hash: name} of the node
+# groups created by the plans executed before this one. progress is yielded every IMPORT_CHUNK nodes, counting created
+# nodes in progress[1], and every datablock created is added to created_ids as [collection, datablock]
+def execute_import_steps(self, target, plan, archive, folder_path, created_groups, progress, created_ids):
+    info = plan['info']
+    node_tree, tree = None, None  # the datablock created, and the node tree its nodes go into
+    is_node_group = info.get('is_node_group', False)  # a node group exported on its own
+
+    # names the file's node groups have in the .blend, they differ if an existing group with the same content is used
+    # or if a different group already had the name
+    group_names = dict(plan['group_names'])
+    for group_name, content_hash in info.get('group_hashes', {}).items():
+        if content_hash in created_groups:
+            group_names[group_name] = created_groups[content_hash]
+
+    # determine type
+    if is_node_group:
+        node_tree = tree = bpy.data.node_groups.new(info['node_tree_name'], info['node_tree_id'])
+        created_ids.append([bpy.data.node_groups, node_tree])
+
+    elif info['node_tree_id'] == 'ShaderNodeTree':
+        node_tree = bpy.data.materials.new(info['node_tree_name'])
+        created_ids.append([bpy.data.materials, node_tree])
+        node_tree.use_nodes = True
+        tree = node_tree.node_tree
+
+    elif info['node_tree_id'] == "MitsubaShaderNodeTree":
+        node_tree = bpy.data.materials.new(info['node_tree_name'])
+        created_ids.append([bpy.data.materials, node_tree])
+        if target is not None:
+            target['space'].node_tree = node_tree
+        tree = bpy.data.node_groups.new(name=info['node_tree_name'], type="MitsubaShaderNodeTree")
+        created_ids.append([bpy.data.node_groups, tree])
+        node_tree.mitsuba_nodes.nodetree = tree.name
+
+    elif info['node_tree_id'] in ("an_AnimationNodeTree", "SverchCustomTreeType"):
+        node_tree = tree = bpy.data.node_groups.new(name=info['node_tree_name'], type=info['node_tree_id'])
+        created_ids.append([bpy.data.node_groups, node_tree])
+        if target is not None:
+            target['space'].node_tree = node_tree
+
+    elif info['node_tree_id'] == "TextureNodeTree":
+        node_tree = bpy.data.textures.new(name=info['node_tree_name'], type='NONE')
+        created_ids.append([bpy.data.textures, node_tree])
+        node_tree.use_nodes = True
+        tree = node_tree.node_tree
+
+    # remove any default nodes
+    nodes = tree.nodes
+    for i in nodes:
+        nodes.remove(i)
+
+    # import dependencies. Images from an asset store are matched by file rather than name, so an image is loaded once
+    # however many files use it, and an image that only shares the name isn't used in its place
+    dependencies = info['dependencies']
+    depend_errors = 0
+    image_names = {}  # names the file's images have in the .blend
+    stored_images = None  # {file path: image name}
+    start = perf_counter()
+
+    for depend in dependencies:
+        if depend[0] == "image" and info['path_type'] == "store":
+            image_path = path.normpath(path.join(folder_path, depend[2]))
+            if stored_images is None:
+                stored_images = {path.normpath(bpy.path.abspath(image.filepath)): image.name
+                                 for image in bpy.data.images if image.filepath}
+            if image_path not in stored_images:
                 try:
-                    if root['__info__']['path_type'] == "relative":
-                        image = bpy.data.images.load(folder_path + os_file_sep + depend[1])
-                    else:
-                        image = bpy.data.images.load(depend[2])
-                    image.name = depend[1]  # set name in-case the image was renamed
+                    image = bpy.data.images.load(image_path)
                 except RuntimeError:
                     depend_errors += 1
+                    continue
+                created_ids.append([bpy.data.images, image])
+                image.name = depend[1]  # gets a suffix if another image has the name
+                stored_images[image_path] = image.name
+            image_names[depend[1]] = stored_images[image_path]
+        # a relative image exported under another name shares its name with a different image, so isn't matched by it
+        elif depend[0] == "image" and info['path_type'] == "relative" and \
+                relative_dependency_name(depend) != depend[1]:
+            image_path = folder_path + os_file_sep + relative_dependency_name(depend)
+            loaded = [image.name for image in bpy.data.images if image.filepath == image_path]
+            if loaded:
+                image_names[depend[1]] = loaded[0]
+                continue
+            try:
+                if archive is not None:
+                    image = load_archived_image(archive, relative_dependency_name(depend), folder_path)
+                else:
+                    image = bpy.data.images.load(image_path)
+            except (RuntimeError, KeyError, OSError):
+                depend_errors += 1
+                continue
+            created_ids.append([bpy.data.images, image])
+            image.name = depend[1]  # gets a suffix as another image has the name
+            image_names[depend[1]] = image.name
+        elif depend[0] == "image" and depend[1] not in bpy.data.images:
+            try:
+                if info['path_type'] == "relative" and archive is not None:
+                    image = load_archived_image(archive, relative_dependency_name(depend), folder_path)
+                elif info['path_type'] == "relative":
+                    image = bpy.data.images.load(folder_path + os_file_sep + relative_dependency_name(depend))
+                else:
+                    image = bpy.data.images.load(depend[2])
+                created_ids.append([bpy.data.images, image])
+                image.name = depend[1]  # set name in-case the image was renamed
+            except (RuntimeError, KeyError, OSError):
+                depend_errors += 1
+
+    if depend_errors:
+        self.report({"ERROR"}, "NodeIO: " + str(depend_errors) + " Dependency(ies) Couldn't Be Loaded")
+    if timings is not None:
+        timings.add("load dependencies", start)
+
+    # add new nodes
+    monads = {}  # monad name -> bl_idname of its group node
+    for group_plan in plan['groups']:
+        # set up which node tree to use (used for node groups in node tree)
+        if group_plan['name'] == "main":
+            nt = tree
+        else:
+            nt = bpy.data.node_groups.new(group_plan['name'], GROUP_TREE_TYPES[info['node_tree_id']])
+            created_ids.append([bpy.data.node_groups, nt])
+            group_names[group_plan['name']] = nt.name
+        if group_plan['hash'] is not None:  # also stands in for the file's other groups with the same content
+            created_groups[group_plan['hash']] = nt.name
+            for group_name, content_hash in info.get('group_hashes', {}).items():
+                if content_hash == group_plan['hash'] and group_name != "main":
+                    group_names[group_name] = nt.name
+
+        new_node = nt.nodes.new
+        created = []
+        start = perf_counter()
+        for node_id, monad, attribute_plan, values, inputs, outputs in group_plan['nodes']:
+            if monad is not None:  # find what the node_groups id is and use it
+                if monad not in monads:
+                    monads[monad] = bpy.data.node_groups[group_names.get(monad, monad)].cls_bl_idname
+                node_id = monads[monad]
+
+            temp = new_node(node_id)
+            import_node(self, nt, temp, attribute_plan, values, inputs, outputs, group_names, image_names)
+            created.append(temp)
+
+            progress[1] += 1
+            if progress[1] % IMPORT_CHUNK == 0:
+                yield progress
+
+        if timings is not None:
+            timings.add("create nodes", start, len(created))
+            timings.count("nodes", len(created))
+            start = perf_counter()
+
+        # set parents
+        for node, parent in group_plan['parents']:
+            location = created[node].location
+            created[node].parent = created[parent]
+            created[node].location = location + created[parent].location
+
+        if timings is not None:
+            timings.add("set parents", start, len(group_plan['parents']))
+            start = perf_counter()
+
+        sockets = {}
+        new_link = nt.links.new
+        for from_node, from_identifier, from_index, to_node, to_identifier, to_index in group_plan['links']:
+            new_link(find_socket(created[from_node], True, from_identifier, from_index, sockets),
+                     find_socket(created[to_node], False, to_identifier, to_index, sockets))
+
+        if timings is not None:
+            timings.add("create links", start, len(group_plan['links']))
+            timings.count("links", len(group_plan['links']))
+
+    # add material to object
+    if target is not None and target['object'] is not None and target['is_auto_add'] and not is_node_group:
+        if info['node_tree_id'] in ('ShaderNodeTree', 'MitsubaShaderNodeTree'):
+            target['object'].data.materials.append(node_tree)
+        elif info['node_tree_id'] == "TextureNodeTree" and target['material'] is not None:
+            target['material'].active_texture = node_tree
+
+    self.report({"INFO"}, "NodeIO: Imported {} With {} Nodes".format(info['node_tree_name'],
+                                                                     info['number_of_nodes']))
+    return node_tree
+
+
+# socket of node by identifier, falling back to index if the node has no such socket or identifier is None. sockets
+# caches {(node name, is output): {identifier: socket}}, rebuilt when an identifier is missing as linking can add sockets
+def find_socket(node, is_output, identifier, index, sockets):
+    node_sockets = node.outputs if is_output else node.inputs
+    if identifier is None:
+        return node_sockets[index]
+
+    by_identifier = sockets.get((node.name, is_output))
+
+    if by_identifier is None or identifier not in by_identifier:
+        by_identifier = sockets[(node.name, is_output)] = {socket.identifier: socket for socket in node_sockets}
+
+    socket = by_identifier.get(identifier)
+    return socket if socket is not None else node_sockets[index]
+
+
+# extract just the image name from a .zip to folder_path, next to the .zip, and load it from there
+def load_archived_image(archive, name, folder_path):
+    if not path.exists(folder_path):
+        mkdir(folder_path)
+
+    image_path = folder_path + os_file_sep + name
+    with archive.open(name) as src, open(image_path, 'wb') as dst:
+        copyfileobj(src, dst, 1 << 20)
+    return bpy.data.images.load(image_path)
+
+
+def is_addon_missing(self, node_id):
+    if node_id == "GenericNoteNode" and ("generic_note" not in bpy.context.user_preferences.addons.keys() and
+                                         "genericnote" not in bpy.context.user_preferences.addons.keys()):
+        self.report({"WARNING"}, "Generic Note Node Add-on Not Installed")
+        return True
+    return False
+
+
+# attributes set_attributes() has to handle itself, everything else is set directly through a cached setter
+SPECIAL_ATTRIBUTES = {"group_input", "group_output", "parent", "image", "an_list_size", "object", "particle_system",
+                      "color_ramp.elements", "node_tree.name", "material", "mapping", "texture"}
+
+
+# work out once how each node_specific attribute is applied, shared by every node with the same attributes
+def import_attribute_plan(atts):
+    plan = []
+    for att in atts:
+        if att in SPECIAL_ATTRIBUTES:
+            plan.append([att, None])
+        else:
+            plan.append([att, get_attribute_setter(att)])
+    return plan
+
+
+# parents are set once every node of the group exists, see plan_import(). group_names maps the node groups the file
+# refers to onto the ones in the .blend, image_names does the same for its images
+def import_node(self, nt, temp, plan, values, inputs, outputs, group_names=None, image_names=None):
+    start = perf_counter() if timings is not None else None
+
+    # node specific is first so that groups are set up first
+    for (att, setter), val in zip(plan, values):
+        if val is None:
+            continue
+        elif setter is not None:
+            try:
+                setter(temp, val)
+            except (AttributeError, TypeError) as e:
+                report_attribute_error(self, e, temp, att, val)
+        elif att in ("group_input", "group_output"):  # group node inputs and outputs
+            for sub in range(0, len(val), 2):
+                if att == "group_input" and val[sub] != "NodeSocketVirtual":
+                    nt.inputs.new(val[sub], val[sub + 1])
+                elif att == "group_output" and val[sub] != "NodeSocketVirtual":
+                    nt.outputs.new(val[sub], val[sub + 1])
+        elif att == "parent":
+            continue
+        elif start is not None:
+            special = perf_counter()
+            set_attributes(self, temp, val, att, group_names, image_names)
+            timings.add("set_attributes", special)
+        else:
+            set_attributes(self, temp, val, att, group_names, image_names)
 
-        if depend_errors:
-            self.report({"ERROR"}, "NodeIO: " + str(depend_errors) + " Dependency(ies) Couldn't Be Loaded")
-
-        # add new nodes
-        order = root['__info__']['group_order']
-        for group_name in order:
-            if group_name not in bpy.data.node_groups or group_name == "main":  # create only if needed
-                group = root[group_name]
-
-                # set up which node tree to use (used for node groups in node tree)
-                if group_name == "main":
-                    nt = nodes
-                elif root['__info__']['node_tree_id'] == "ShaderNodeTree":
-                    nt = bpy.data.node_groups.new(group_name, "ShaderNodeTree")
-                elif root['__info__']['node_tree_id'] == "TextureNodeTree":
-                    nt = bpy.data.node_groups.new(group_name, "TextureNodeTree")
-                elif root['__info__']['node_tree_id'] == 'SverchCustomTreeType':
-                    nt = bpy.data.node_groups.new(group_name, 'SverchGroupTreeType')
-
-                parents = []
-
-                for node in group['nodes']:
-                    parent = {}
-
-                    # check if node is custom then make sure it is installed
-                    if node["bl_idname"] == "GenericNoteNode" and \
-                            ("generic_note" not in bpy.context.user_preferences.addons.keys() and
-                             "genericnote" not in bpy.context.user_preferences.addons.keys()):
-                        self.report({"WARNING"}, "Generic Note Node Add-on Not Installed")
-                    else:
-                        # retrieve node name, create node
-                        node_id = node['bl_idname']
-                        if node_id[0:11] == "SvGroupNode":  # find what the node_groups id is and use it
-                            node_id = bpy.data.node_groups[node['monad.name']].cls_bl_idname
-
-                        if group_name == "main":
-                            temp = nt.new(node_id)
-                        else:
-                            temp = nt.nodes.new(node_id)
-
-                        # node specific is first so that groups are set up first
-                        nos = node["node_specific"]
-                        if nos:
-                            for i in range(0, len(nos), 2):  # step by two because name, value, name, value...
-                                att = nos[i]
-                                val = nos[i + 1]
-
-                                # group node inputs and outputs
-                                if att in ("group_input", "group_output"):
-                                    for sub in range(0, len(val), 2):
-                                        if att == "group_input" and val[sub] != "NodeSocketVirtual":
-                                            nt.inputs.new(val[sub], val[sub + 1])
-                                        elif att == "group_output" and val[sub] != "NodeSocketVirtual":
-                                            nt.outputs.new(val[sub], val[sub + 1])
-
-                                elif att == "parent" and val is not None:  # don't set parent in case not created yet
-                                    parent['parent'] = val
-                                elif val is not None:
-                                    set_attributes(self, temp, val, att)
-
-                        # inputs
-                        if node['inputs']:
-                            for i in node['inputs']:
-                                for val_key in i['values'].keys():
-                                    if isinstance(i['values'][val_key], str):
-                                        exec("temp.inputs[{}].{} = '{}'".format(i['index'], val_key,
-                                                                                i['values'][val_key]))
-                                    else:
-                                        exec("temp.inputs[{}].{} = {}".format(i['index'], val_key,
-                                                                              i['values'][val_key]))
-
-                        # outputs
-                        if node['outputs']:
-                            for i in node['outputs']:
-                                for val_key in i['values'].keys():
-                                    if isinstance(i['values'][val_key], str):
-                                        exec("temp.outputs[{}].{} = '{}'".format(i['index'], val_key,
-                                                                                 i['values'][val_key]))
-                                    else:
-                                        exec("temp.outputs[{}].{} = {}".format(i['index'], val_key,
-                                                                               i['values'][val_key]))
-
-                        # deal with parents
-                        if parent:
-                            parent['node'] = temp.name
-                            parent['location'] = temp.location
-                            parents.append(parent)
-
-                # set parents
-                for parent in parents:
-                    if group_name != "main":
-                        nt.nodes[parent['node']].parent = nt.nodes[parent['parent']]
-                        nt.nodes[parent['node']].location = parent['location'] + nt.nodes[parent['parent']].location
-                    else:
-                        nt[parent['node']].parent = nt[parent['parent']]
-                        nt[parent['node']].location = parent['location'] + nt[parent['parent']].location
+    if start is not None:
+        timings.add("node attributes", start)
+        start = perf_counter()
 
-                if group_name == "main":
-                    use_nt, use_ln = nt, links
-                else:
-                    use_nt, use_ln = nt.nodes, nt.links
+    # inputs
+    for i in inputs:
+        socket = temp.inputs[i['index']]
+        for val_key, val in i['values'].items():
+            setattr(socket, val_key, val)
+
+    # outputs
+    for i in outputs:
+        socket = temp.outputs[i['index']]
+        for val_key, val in i['values'].items():
+            setattr(socket, val_key, val)
 
-                for link in group['links']:
-                    o = use_nt[link[0]].outputs[link[1]]
-                    i = use_nt[link[2]].inputs[link[3]]
-                    use_ln.new(o, i)
+    if start is not None:
+        timings.add("socket values", start)
 
-        # add material to object
-        if context.object is not None and context.scene.node_io_is_auto_add:
-            if root['__info__']['node_tree_id'] in ('ShaderNodeTree', 'MitsubaShaderNodeTree'):
-                context.object.data.materials.append(node_tree)
-            elif root['__info__']['node_tree_id'] == "TextureNodeTree" \
-                    and context.active_object.active_material is not None:
-                context.active_object.active_material.active_texture = node_tree
 
-        self.report({"INFO"}, "NodeIO: Imported {} With {} Nodes".format(root['__info__']['node_tree_name'],
-                                                                         root['__info__']['number_of_nodes']))
+def report_attribute_error(self, e, temp, att, val):
+    self.report({"WARNING"}, "NodeIO: Error={}, Node Name={}, Node ID={}, Attribute={}, Value={}".
+                format(type(e).__name__, temp.name, temp.bl_idname, att, val))
 
 
-def set_attributes(self, temp, val, att):
-    # determine attribute type, exec() can be used if value gets directly set to attribute
-    if att == "image" and val in bpy.data.images:
+def set_attributes(self, temp, val, att, group_names=None, image_names=None):
+    # determine attribute type, anything else gets directly set to attribute
+    if att == "image" and image_names and val in image_names:
+        temp.image = bpy.data.images[image_names[val]]
+    elif att == "image" and val in bpy.data.images:
         temp.image = bpy.data.images[val]
     elif att == 'an_list_size':  # add correct number of inputs for animation node list
         temp.removeElementInputs()
@@ -636,16 +2906,19 @@ def set_attributes(self, temp, val, att):
             and val[1] in bpy.data.objects[val[0]].particle_systems:
         temp.particle_system = bpy.data.objects[val[0]].particle_systems[val[1]]
     elif att == "color_ramp.elements":
+        # elements are exported in order of position, which new() keeps them in, so they can be set all at once
         e = temp.color_ramp.elements
-        if len(val) >= 2:
-            e[0].position = val[0][0]
-            e[0].color = val[0][1]
-            e[1].position = val[1][0]
-            e[1].color = val[1][1]
-            del val[0:2]
-        for el in val:
-            e_temp = e.new(el[0])
-            e_temp.color = el[1]
+        if val and not isinstance(val[0], list):  # packed, position and color of each element one after another
+            positions, colors = val[0::5], [c for i in range(0, len(val), 5) for c in val[i + 1:i + 5]]
+        else:
+            positions, colors = [el[0] for el in val], [c for el in val for c in el[1]]
+
+        resize_collection(e, max(len(positions), 1), lambda i: (positions[i],))
+        if positions:
+            foreach_set_floats(e, "position", positions)
+            foreach_set_floats(e, "color", colors)
+    elif att == "node_tree.name" and group_names and val in group_names:  # the group is called something else here
+        temp.node_tree = bpy.data.node_groups[group_names[val]]
     elif att == "node_tree.name" and val in bpy.data.node_groups:
         temp.node_tree = bpy.data.node_groups[val]
     elif att == "material" and val in bpy.data.materials:
@@ -667,36 +2940,136 @@ def set_attributes(self, temp, val, att):
         node.clip_min_y = float(val[5])
         node.use_clip = True if val[6] == "True" else False
 
-        for i in range(7):
-            del val[0]
-
-        # go through each curve
-        counter = 0
-        for i in val:
-            # set first two points
-            curves = node.curves
-            curves[counter].extend = i[0]
-            del i[0]
-            curves[counter].points[0].location = i[0][0]
-            curves[counter].points[0].handle_type = i[0][1]
-            curves[counter].points[1].location = i[1][0]
-            curves[counter].points[1].handle_type = i[1][1]
-            del i[0:2]
-            for i2 in i:
-                temp_point = node.curves[counter].points.new(i2[0][0], i2[0][1])
-                temp_point.handle_type = i2[1]
-            counter += 1
+        # go through each curve, points are exported in order of x which new() keeps them in, a curve has at least two
+        for curve, curve_val in zip(node.curves, val[7:]):
+            curve.extend = curve_val[0]
+            if len(curve_val) == 3 and curve_val[1] and not isinstance(curve_val[1][0], list):  # packed
+                locations, handles = curve_val[1], curve_val[2]
+            else:
+                locations = [c for point in curve_val[1:] for c in point[0]]
+                handles = [point[1] for point in curve_val[1:]]
+
+            resize_collection(curve.points, max(len(handles), 2), lambda i: locations[2 * i:2 * i + 2])
+            if len(handles) >= 2:
+                foreach_set_floats(curve.points, "location", locations)
+            for point, handle in zip(curve.points, handles):
+                point.handle_type = handle
     elif att == "texture" and val in bpy.data.textures:
         temp.texture = bpy.data.textures[val]
     else:
         try:
-            if isinstance(val, str):
-                exec("temp.{} = '{}'".format(att, val))
-            else:
-                exec("temp.{} = {}".format(att, val))
+            get_attribute_setter(att)(temp, val)
         except (AttributeError, TypeError) as e:
-            self.report({"WARNING"}, "NodeIO: Error={}, Node Name={}, Node ID={}, Attribute={}, Value={}".
-                        format(type(e).__name__, temp.name, temp.bl_idname, att, val))
+            report_attribute_error(self, e, temp, att, val)
+
+
+# LIBRARY INDEX
+def open_library_index(folder):
+    connection = sqlite3.connect(path.join(folder, INDEX_FILE_NAME))
+    if connection.execute("PRAGMA user_version").fetchone()[0] != INDEX_VERSION:  # new file or older layout
+        connection.execute("DROP TABLE IF EXISTS files")
+        connection.execute("CREATE TABLE files (path TEXT PRIMARY KEY, mtime_ns INTEGER, size INTEGER, "
+                           "node_tree_name TEXT, node_tree_id TEXT, render_engine TEXT, number_of_nodes INTEGER, "
+                           "date_created TEXT, dependencies TEXT, version TEXT)")
+        connection.execute("CREATE INDEX files_name ON files (node_tree_name)")
+        connection.execute("PRAGMA user_version = {}".format(INDEX_VERSION))
+        connection.commit()
+    return connection
+
+
+def read_index_info(file_path):
+    try:
+        return load_bnodes_info(file_path)
+    except (OSError, ValueError, KeyError, IndexError, struct.error):
+        return None
+
+
+# bring the index of folder up to date, only files whose mtime or size changed are read. file_paths limits the update
+# to those .bnodes files, such as the ones an export just wrote, instead of walking the whole folder
+# returns (number of files, number (re)read, number removed)
+def update_library_index(folder, file_paths=None):
+    connection = open_library_index(folder)
+    try:
+        if file_paths is None:
+            known = {row[0]: (row[1], row[2]) for row in connection.execute("SELECT path, mtime_ns, size FROM files")}
+            file_paths = [path.join(dirname, file_name) for dirname, subdirs, files in walk(folder)
+                          for file_name in files if file_name.endswith(".bnodes")]
+        else:
+            known = {}
+            for file_path in file_paths:
+                rel_path = path.relpath(file_path, folder)
+                row = connection.execute("SELECT mtime_ns, size FROM files WHERE path = ?", [rel_path]).fetchone()
+                if row is not None:
+                    known[rel_path] = tuple(row)
+        found, changed = set(), []
+
+        for file_path in file_paths:
+            if path.isfile(file_path):
+                rel_path = path.relpath(file_path, folder)
+                file_stat = stat(file_path)
+                found.add(rel_path)
+
+                if known.get(rel_path) != (file_stat.st_mtime_ns, file_stat.st_size):
+                    changed.append([rel_path, file_path, file_stat])
+
+        if changed:
+            with ThreadPoolExecutor(max_workers=min(IMPORT_THREADS, len(changed))) as pool:
+                infos = list(pool.map(read_index_info, [i[1] for i in changed]))
+        else:
+            infos = []
+
+        rows = []
+        for (rel_path, file_path, file_stat), info in zip(changed, infos):
+            if not isinstance(info, dict):  # unreadable files are kept so they aren't re-read until they change
+                info = {}
+            rows.append([rel_path, file_stat.st_mtime_ns, file_stat.st_size, info.get('node_tree_name'),
+                         info.get('node_tree_id'), info.get('render_engine'), info.get('number_of_nodes'),
+                         info.get('date_created'), json.dumps(info.get('dependencies', [])),
+                         json.dumps(info.get('version'))])
+
+        removed = [[rel_path] for rel_path in known if rel_path not in found]
+        connection.executemany("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+        connection.executemany("DELETE FROM files WHERE path = ?", removed)
+        connection.commit()
+    finally:
+        connection.close()
+
+    library_results.clear()
+    return len(found), len(changed), len(removed)
+
+
+# search the index of folder by name or path, returns [[path, node_tree_name, node_tree_id, render_engine,
+# number_of_nodes, date_created], ...] sorted by name
+def search_library_index(folder, text="", render_engine=None, limit=LIBRARY_RESULTS):
+    query = "SELECT path, node_tree_name, node_tree_id, render_engine, number_of_nodes, date_created FROM files " \
+            "WHERE node_tree_name IS NOT NULL AND (instr(lower(node_tree_name), lower(?)) > 0 OR " \
+            "instr(lower(path), lower(?)) > 0)"
+    args = [text, text]
+    if render_engine is not None:
+        query += " AND (render_engine = ? OR node_tree_id NOT IN ('ShaderNodeTree', 'MitsubaShaderNodeTree'))"
+        args.append(render_engine)
+    query += " ORDER BY node_tree_name COLLATE NOCASE LIMIT ?"
+    args.append(limit)
+
+    connection = open_library_index(folder)
+    try:
+        return [list(row) for row in connection.execute(query, args)]
+    finally:
+        connection.close()
+
+
+# search results shown in the panel, {(folder, text, render_engine): results}, cleared whenever an index is updated
+library_results = {}
+
+
+def get_library_results(folder, text, render_engine):
+    key = (folder, text, render_engine)
+    if key not in library_results:
+        if not path.exists(path.join(folder, INDEX_FILE_NAME)):
+            return None
+        library_results[key] = search_library_index(folder, text, render_engine)
+    return library_results[key]
+
 
 # PROPERTIES
 bpy.types.Scene.node_io_import_export = EnumProperty(name="Import/Export", items=(("1", "Import", ""),
@@ -704,9 +3077,31 @@ bpy.types.Scene.node_io_import_export = EnumProperty(name="Import/Export", items
 bpy.types.Scene.node_io_export_path = StringProperty(name="Export Path", subtype="DIR_PATH")
 bpy.types.Scene.node_io_import_path_file = StringProperty(name="Import Path", subtype="FILE_PATH")
 bpy.types.Scene.node_io_import_path_dir = StringProperty(name="Import Path", subtype="DIR_PATH")
+bpy.types.Scene.node_io_export_type = EnumProperty(name="Export", items=(("1", "Active Node Tree", "Export the node "
+                                                                         "tree being edited"),
+                                                                        ("2", "All Node Trees", "Export every "
+                                                                         "material, texture and node group in the "
+                                                                         ".blend into one library")),
+                                                   default="1")
+bpy.types.Scene.node_io_export_kinds = EnumProperty(name="Include", options={"ENUM_FLAG"},
+                                                    items=(("MATERIAL", "Materials", ""),
+                                                           ("TEXTURE", "Textures", ""),
+                                                           ("NODE_GROUP", "Node Groups", "Node groups not already "
+                                                            "used by an exported material or texture, and Animation "
+                                                            "Nodes and Sverchok trees")),
+                                                    default={"MATERIAL", "TEXTURE", "NODE_GROUP"})
+bpy.types.Scene.node_io_export_filter = StringProperty(name="Name Filter", description="Only export node trees whose "
+                                                       "name contains this")
 bpy.types.Scene.node_io_dependency_save_type = EnumProperty(name="Dependency Paths", items=(("1", "Absolute Paths", ""),
                                                                                             ("2", "Make Paths Relative",
-                                                                                             "")),
+                                                                                             ""),
+                                                                                            ("3", "Shared Asset Store",
+                                                                                             "Copy images once into a "
+                                                                                             "'" + ASSET_STORE_NAME +
+                                                                                             "' folder of the export "
+                                                                                             "path, named after their "
+                                                                                             "content and shared by "
+                                                                                             "every export into it")),
                                                             default="1")
 bpy.types.Scene.node_io_is_auto_add = BoolProperty(name="Add Node Tree To Object?", default=True)
 bpy.types.Scene.node_io_import_type = EnumProperty(name="Import Type", items=(("1", "File", "Imports Just Selected " +
@@ -715,6 +3110,135 @@ bpy.types.Scene.node_io_import_type = EnumProperty(name="Import Type", items=(("
                                                                               ("2", "Folder",
                                                                                "Imports All Files Within Folder")))
 bpy.types.Scene.node_io_is_compress = BoolProperty(name="Compress Folder?")
+bpy.types.Scene.node_io_export_format = EnumProperty(name="File Format", items=(("1", "JSON", "Plain JSON, human "
+                                                                                 "readable"),
+                                                                                ("2", "Binary", "Compact binary "
+                                                                                 "encoding with a shared string "
+                                                                                 "table, a half to a third the size "
+                                                                                 "of JSON but slower to read as it "
+                                                                                 "is decoded in Python")),
+                                                     default="1")
+bpy.types.Scene.node_io_is_columnar = BoolProperty(name="Group Nodes By Type?", description="Write each node type's "
+                                                   "attribute names once followed by a row of values per node. "
+                                                   "Smaller files for trees with many nodes of the same type")
+bpy.types.Scene.node_io_library_search = StringProperty(name="Search", description="Search the library index of the "
+                                                       "import folder by name or path")
+bpy.types.Scene.node_io_library_is_engine_only = BoolProperty(name="Only Current Render Engine?", default=True)
+bpy.types.Scene.node_io_is_incremental = BoolProperty(name="Skip Unchanged Node Trees?", description="Keep a "
+                                                     "manifest of node tree hashes next to the export and don't "
+                                                     "write trees that haven't changed since the last export")
+bpy.types.Scene.node_io_is_timing = BoolProperty(name="Report Timings?", description="Report how long each phase of "
+                                                 "an import or export took")
+bpy.types.Scene.node_io_trace_path = StringProperty(name="Trace File", subtype="FILE_PATH", description="Also write "
+                                                    "the timings to this JSON file")
+bpy.types.Scene.node_io_precision = EnumProperty(name="Precision", items=(("DECIMALS", "Decimal Places", "Round "
+                                                                         "floats to a number of decimal places"),
+                                                                        ("FLOAT32", "Full", "Keep every digit of "
+                                                                         "Blender's 32 bit floats"),
+                                                                        ("FLOAT16", "Half", "Round floats to 16 "
+                                                                         "bits, about 3 significant digits")),
+                                                 default="DECIMALS")
+bpy.types.Scene.node_io_decimals = IntProperty(name="Decimal Places", min=0, max=9, default=ROUND)
+bpy.types.Scene.node_io_is_packed = BoolProperty(name="Pack Curves And Ramps?", description="Write curve points and "
+                                                 "color ramp elements as packed binary buffers, base64 encoded in "
+                                                 "JSON files. Smaller and faster to read for dense curves and ramps")
+bpy.types.Scene.node_io_cache_size = IntProperty(name="Cache Size (MB)", min=0, default=FILE_CACHE_SIZE // (1024 * 1024),
+                                                 description="Memory decoded files are kept in so importing them "
+                                                 "again doesn't read them again, 0 turns the cache off")
+bpy.types.Scene.node_io_is_elide_defaults = BoolProperty(name="Skip Default Values?", default=False,
+                                                         description="Only write values that differ from a newly "
+                                                         "created node of the same type")
+
+
+# MODAL JOBS: exports and imports started from the panel run as modal operators, doing JOB_SLICE seconds of the job's
+# steps on each timer tick. Only one runs at a time, as they share the timings. steps holds on to nodes and datablocks
+# between ticks, so while a job runs only the events in JOB_EVENTS reach Blender, which keeps the view and the panel's
+# cancel button working but keeps shortcuts from editing or deleting anything. An undo or loading a file cancels the job
+# before the data it holds is freed
+job_progress = {"running": False, "phase": "", "done": 0, "total": 0, "cancel": False, "steps": None}
+JOB_EVENTS = {"MOUSEMOVE", "INBETWEEN_MOUSEMOVE", "LEFTMOUSE", "MIDDLEMOUSE", "WHEELUPMOUSE", "WHEELDOWNMOUSE",
+              "TRACKPADPAN", "TRACKPADZOOM", "WINDOW_DEACTIVATE"}
+
+
+def redraw_node_editors(context):
+    for area in context.screen.areas if context.screen is not None else ():
+        if area.type == "NODE_EDITOR":
+            area.tag_redraw()
+
+
+# start the steps make_job(self, context) returns as a modal job of operator self
+def start_job(self, context, operation, make_job):
+    if job_progress['running']:
+        self.report({"ERROR"}, "NodeIO: Wait For The Running Export Or Import To Finish")
+        return {"CANCELLED"}
+
+    start_timings(context, operation)
+    self.steps = make_job(self, context)
+    if self.steps is None:  # already reported why
+        finish_timings(self, context)
+        return {"FINISHED"}
+
+    job_progress.update(running=True, phase="Starting", done=0, total=0, cancel=False, steps=self.steps)
+    wm = context.window_manager
+    self.timer = wm.event_timer_add(JOB_TICK, context.window)
+    wm.progress_begin(0, 1)
+    wm.modal_handler_add(self)
+    return {"RUNNING_MODAL"}
+
+
+def run_job(self, context, event):
+    if job_progress['cancel'] or event.type == "ESC" and event.value == "PRESS":
+        stop_job(self, context, cancelled=True)
+        self.report({"WARNING"}, "NodeIO: Cancelled, {} {}/{}".format(job_progress['phase'], job_progress['done'],
+                                                                      job_progress['total']))
+        return {"CANCELLED"}
+    elif event.type in JOB_EVENTS or event.type.startswith("TIMER") and event.type != "TIMER":
+        return {"PASS_THROUGH"}
+    elif event.type != "TIMER":
+        return {"RUNNING_MODAL"}
+
+    end = perf_counter() + JOB_SLICE
+    try:
+        while True:  # at least one step per tick
+            job_progress['phase'], job_progress['done'], job_progress['total'] = next(self.steps)
+            if perf_counter() >= end:
+                break
+    except StopIteration:
+        stop_job(self, context)
+        return {"FINISHED"}
+    except Exception:
+        stop_job(self, context, cancelled=True)
+        raise
+
+    context.window_manager.progress_update(job_progress['done'] / max(job_progress['total'], 1))
+    redraw_node_editors(context)
+    return {"RUNNING_MODAL"}
+
+
+# closing the steps of a cancelled job has it clean up after itself
+def stop_job(self, context, cancelled=False):
+    wm = context.window_manager
+    wm.event_timer_remove(self.timer)
+    wm.progress_end()
+    if cancelled:
+        self.steps.close()
+    job_progress.update(running=False, steps=None)
+    finish_timings(self, context)
+    redraw_node_editors(context)
+
+
+# undo_pre and load_pre handler, kept when another file is loaded
+@bpy.app.handlers.persistent
+def cancel_job_handler(*args):
+    if job_progress['steps'] is not None:
+        job_progress['steps'].close()
+        job_progress.update(steps=None, cancel=True)  # the operator stops on its next event
+
+
+def draw_job_progress(layout):
+    row = layout.row(align=True)
+    row.label("{} {}/{}".format(job_progress['phase'], job_progress['done'], job_progress['total']), icon="TIME")
+    row.operator("wm.node_io_cancel_job", text="", icon="CANCEL")
 
 
 class NodeIOPanel(bpy.types.Panel):
@@ -726,15 +3250,33 @@ class NodeIOPanel(bpy.types.Panel):
     def draw(self, context):
         layout = self.layout
         layout.prop(context.scene, "node_io_import_export")
+        layout.prop(context.scene, "node_io_is_timing", icon="TIME")
+        if context.scene.node_io_is_timing:
+            layout.prop(context.scene, "node_io_trace_path")
         layout.separator()
         
         if context.scene.node_io_import_export == "2":
+            layout.prop(context.scene, "node_io_export_type")
+            if context.scene.node_io_export_type == "2":
+                layout.prop(context.scene, "node_io_export_kinds", expand=True)
+                layout.prop(context.scene, "node_io_export_filter", icon="VIEWZOOM")
             layout.prop(context.scene, "node_io_dependency_save_type")
+            layout.prop(context.scene, "node_io_export_format")
+            layout.prop(context.scene, "node_io_is_columnar")
+            layout.prop(context.scene, "node_io_is_elide_defaults")
+            layout.prop(context.scene, "node_io_precision")
+            if context.scene.node_io_precision == "DECIMALS":
+                layout.prop(context.scene, "node_io_decimals")
+            layout.prop(context.scene, "node_io_is_packed")
             layout.prop(context.scene, "node_io_is_compress", icon="FILTER")
+            layout.prop(context.scene, "node_io_is_incremental")
             layout.separator()
             layout.prop(context.scene, "node_io_export_path")
             layout.separator()
-            layout.operator("export.node_io_export", icon="ZOOMOUT")
+            if job_progress['running']:
+                draw_job_progress(layout)
+            else:
+                layout.operator("export.node_io_export", icon="ZOOMOUT")
                   
         else:
             layout.prop(context.scene, "node_io_import_type")
@@ -747,33 +3289,152 @@ class NodeIOPanel(bpy.types.Panel):
                 layout.prop(context.scene, "node_io_import_path_dir")
             layout.separator()
 
-            layout.operator("import.node_io_import", icon="ZOOMIN")
+            if job_progress['running']:
+                draw_job_progress(layout)
+            else:
+                layout.operator("import.node_io_import", icon="ZOOMIN")
+
+            cache = file_cache_info()
+            row = layout.row(align=True)
+            row.prop(context.scene, "node_io_cache_size")
+            row.operator("import.node_io_clear_cache", text="", icon="X")
+            layout.label("Cached: {} Files, {:.1f} MB".format(cache['files'], cache['bytes'] / (1024 * 1024)))
+
+            # library index of import folder
+            if context.scene.node_io_import_type == "2" and sqlite3 is not None:
+                layout.separator()
+                layout.operator("import.node_io_refresh_library", icon="FILE_REFRESH")
+                layout.prop(context.scene, "node_io_library_search", icon="VIEWZOOM")
+                layout.prop(context.scene, "node_io_library_is_engine_only")
+
+                folder = bpy.path.abspath(context.scene.node_io_import_path_dir)
+                engine = context.scene.render.engine if context.scene.node_io_library_is_engine_only else None
+                results = get_library_results(folder, context.scene.node_io_library_search, engine) \
+                    if folder and path.isdir(folder) else None
+
+                box = layout.box()
+                if results is None:
+                    box.label("No Library Index, Refresh To Create One")
+                elif not results:
+                    box.label("No Matching Node Trees")
+                for result in results or []:
+                    row = box.row()
+                    row.label("{} ({} Nodes)".format(result[1], result[4]))
+                    row.operator("import.node_io_import_library_file", text="", icon="ZOOMIN").file_path = result[0]
 
 
 class NodeIOExport(bpy.types.Operator):
     bl_idname = "export.node_io_export"
     bl_label = "Export Node Tree"
-    
+    bl_description = "Export the node trees, press Esc to cancel"
+
     def execute(self, context):
+        start_timings(context, "export")
         export_node_tree(self, context)
+        finish_timings(self, context)
         return {"FINISHED"}
 
+    def invoke(self, context, event):
+        return start_job(self, context, "export", export_job)
+
+    def modal(self, context, event):
+        return run_job(self, context, event)
+
+    def cancel(self, context):
+        stop_job(self, context, cancelled=True)
+
 
 class NodeIOImport(bpy.types.Operator):
     bl_idname = "import.node_io_import"
     bl_label = "Import Node Tree"
-    
+    bl_description = "Import the node trees, press Esc to cancel and remove what was imported"
+
     def execute(self, context):
+        start_timings(context, "import")
         import_node_tree(self, context)
-        return {"FINISHED"}             
+        finish_timings(self, context)
+        return {"FINISHED"}
+
+    def invoke(self, context, event):
+        return start_job(self, context, "import", import_job)
+
+    def modal(self, context, event):
+        return run_job(self, context, event)
+
+    def cancel(self, context):
+        stop_job(self, context, cancelled=True)
+
+
+class NodeIOCancelJob(bpy.types.Operator):
+    bl_idname = "wm.node_io_cancel_job"
+    bl_label = "Cancel"
+    bl_description = "Cancel the running export or import"
+
+    def execute(self, context):
+        job_progress['cancel'] = True
+        return {"FINISHED"}
+
+
+class NodeIOClearCache(bpy.types.Operator):
+    bl_idname = "import.node_io_clear_cache"
+    bl_label = "Clear Cache"
+    bl_description = "Forget every decoded file kept for importing again"
+
+    def execute(self, context):
+        clear_file_cache()
+        return {"FINISHED"}
+
+
+class NodeIORefreshLibrary(bpy.types.Operator):
+    bl_idname = "import.node_io_refresh_library"
+    bl_label = "Refresh Library Index"
+    bl_description = "Index every .bnodes file in the import folder, only re-reading files that changed"
+
+    def execute(self, context):
+        folder = bpy.path.abspath(context.scene.node_io_import_path_dir)
+        if not folder or not path.isdir(folder):
+            self.report({"ERROR"}, "NodeIO: Import Path '{}' Is Not A Folder".format(folder))
+        else:
+            try:
+                total, read, removed = update_library_index(folder)
+                self.report({"INFO"}, "NodeIO: Indexed {} Files ({} Updated, {} Removed)".format(total, read,
+                                                                                                 removed))
+            except sqlite3.Error as e:
+                self.report({"ERROR"}, "NodeIO: Couldn't Update Library Index, {}".format(e))
+        return {"FINISHED"}
+
+
+class NodeIOImportLibraryFile(bpy.types.Operator):
+    bl_idname = "import.node_io_import_library_file"
+    bl_label = "Import Library Node Tree"
+    bl_description = "Import this node tree from the library"
+
+    file_path = StringProperty()  # relative to the import folder
+
+    def execute(self, context):
+        start_timings(context, "import")
+        import_node_tree(self, context, path.join(bpy.path.abspath(context.scene.node_io_import_path_dir),
+                                                  self.file_path))
+        finish_timings(self, context)
+        return {"FINISHED"}
 
 
 def register():
     bpy.utils.register_module(__name__)
+    bpy.app.handlers.undo_pre.append(cancel_job_handler)
+    bpy.app.handlers.load_pre.append(cancel_job_handler)
+    bpy.app.handlers.scene_update_post.append(group_hash_update_handler)
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        handlers.append(clear_group_hash_handler)
 
 
 def unregister():
     bpy.utils.unregister_module(__name__)
+    bpy.app.handlers.undo_pre.remove(cancel_job_handler)
+    bpy.app.handlers.load_pre.remove(cancel_job_handler)
+    bpy.app.handlers.scene_update_post.remove(group_hash_update_handler)
+    for handlers in (bpy.app.handlers.load_post, bpy.app.handlers.undo_post, bpy.app.handlers.redo_post):
+        handlers.remove(clear_group_hash_handler)
 
 if __name__ == "__main__":
     register()
@@ -0,0 +1,228 @@
+# exports the node trees of many .blend files by sharding them across a pool of headless Blender processes
+#
+#   python node_io_batch.py --output library/ --jobs 8 scenes/
+#   python node_io_batch.py --output library/ --list blend_files.txt --format binary --relative --compress
+#   python node_io_batch.py --output library/ --store scenes/
+#
+# Folders are searched for .blend files. Each .blend is exported like "All Node Trees" into a "<blend>_library" folder
+# placed in --output at the same relative path the .blend has. Each worker runs "blender --background" over a shard
+# of files and appends a JSON line per file to a results file, so if Blender crashes on a file the rest of its shard is
+# retried in a new process. With --store, images are copied once into a content-addressed store in --output that
+# every library refers to. The merged results and errors are printed and can be written to --summary
+import argparse
+import json
+import shutil
+import subprocess
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from os import path, walk, makedirs, environ, cpu_count
+from time import perf_counter
+
+HERE = path.dirname(path.abspath(__file__))
+OUTPUT_LINES = 5  # last lines of Blender's output kept with the error of a file it crashed on
+
+
+def parse_args(argv):
+    parser = argparse.ArgumentParser(description="Export the node trees of .blend files with headless Blender")
+    parser.add_argument("files", nargs="*", help=".blend files, or folders to search for them")
+    parser.add_argument("--list", help="file with a .blend path per line")
+    parser.add_argument("--output", required=True, help="folder the libraries are exported into")
+    parser.add_argument("--blender", default=environ.get("BLENDER", "blender"),
+                        help="Blender executable, found on PATH or through $BLENDER if not given")
+    parser.add_argument("--jobs", type=int, default=cpu_count() or 1, help="Blender processes run at once")
+    parser.add_argument("--per-worker", type=int, default=8, help=".blend files each Blender process exports")
+    parser.add_argument("--timeout", type=float, help="seconds a Blender process may take before it is killed")
+    parser.add_argument("--factory-startup", action="store_true",
+                        help="don't load user add-ons, Animation Nodes and Sverchok trees need them")
+    parser.add_argument("--summary", help="also write the merged results to this JSON file")
+
+    parser.add_argument("--kinds", default="material,texture,node_group",
+                        help="comma separated, material, texture and/or node_group")
+    parser.add_argument("--filter", default="", help="only export node trees whose name contains this")
+    parser.add_argument("--format", choices=("json", "binary"), default="json")
+    parser.add_argument("--columnar", action="store_true", help="group nodes by type")
+    parser.add_argument("--elide-defaults", action="store_true", help="skip values that are the default")
+    parser.add_argument("--precision", choices=("decimals", "float32", "float16"), default="decimals")
+    parser.add_argument("--decimals", type=int, default=4, help="decimal places floats are rounded to")
+    parser.add_argument("--packed", action="store_true", help="write curves and ramps as packed buffers")
+    parser.add_argument("--relative", action="store_true", help="copy dependencies next to the exported files")
+    parser.add_argument("--store", action="store_true",
+                        help="copy images once, by content, into an asset store in --output shared by every library")
+    parser.add_argument("--compress", action="store_true", help="export each library as a .zip")
+    parser.add_argument("--incremental", action="store_true", help="skip node trees unchanged since the last run")
+
+    # set by the driver for the Blender processes it starts
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    parser.add_argument("--root", help=argparse.SUPPRESS)
+    return parser.parse_args(argv)
+
+
+# the same export settings for a worker
+def worker_argv(args):
+    argv = ["--output", args.output, "--kinds", args.kinds, "--filter", args.filter, "--format", args.format,
+            "--precision", args.precision, "--decimals", str(args.decimals)]
+    for flag in ("columnar", "elide_defaults", "packed", "relative", "store", "compress", "incremental"):
+        if getattr(args, flag):
+            argv.append("--" + flag.replace("_", "-"))
+    return argv
+
+
+def find_blend_files(args):
+    files = list(args.files)
+    if args.list:
+        with open(args.list) as file:
+            files.extend(line.strip() for line in file if line.strip())
+
+    blend_files = []
+    for file in files:
+        if path.isdir(file):
+            for folder, _, names in walk(file):
+                blend_files.extend(path.join(folder, name) for name in sorted(names) if name.endswith(".blend"))
+        else:
+            blend_files.append(file)
+
+    unique, seen = [], set()
+    for file in map(path.abspath, blend_files):
+        if file not in seen:
+            unique.append(file)
+            seen.add(file)
+    return unique
+
+
+def read_results(results_path):
+    if not path.exists(results_path):
+        return []
+    with open(results_path) as file:
+        return [json.loads(line) for line in file if line.strip()]
+
+
+# export a shard in as many Blender processes as it takes, a file Blender exits or is killed on is failed and the
+# files after it are handed to a new process. Returns a result per file
+def run_shard(args, shard, root, results_path):
+    remaining = list(shard)
+    failed = []
+    while remaining:
+        command = [args.blender, "--background"] + (["--factory-startup"] if args.factory_startup else []) + \
+                  ["--python-exit-code", "1", "--python", path.abspath(__file__), "--", "--worker", results_path,
+                   "--root", root] + worker_argv(args) + remaining
+        try:
+            process = subprocess.run(command, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                                     timeout=args.timeout)
+            reason, output = "Blender exited with code {}".format(process.returncode), process.stdout
+        except subprocess.TimeoutExpired as e:
+            reason, output = "Blender was killed after {} seconds".format(args.timeout), e.output
+        except OSError as e:
+            return [{"file": file, "errors": ["Couldn't run Blender, {}".format(e)]} for file in remaining]
+
+        done = {result['file'] for result in read_results(results_path)}
+        remaining = [file for file in remaining if file not in done]
+        if remaining:
+            lines = (output or b"").decode("utf-8", "replace").strip().splitlines()[-OUTPUT_LINES:]
+            failed.append({"file": remaining.pop(0), "errors": [reason] + lines})
+
+    return read_results(results_path) + failed
+
+
+def merge_results(results, seconds):
+    summary = {"blend_files": len(results), "failed": 0, "trees": 0, "nodes": 0, "dependencies": 0,
+               "unchanged": 0, "seconds": round(seconds, 3), "results": sorted(results, key=lambda r: r['file'])}
+    for result in results:
+        if result['errors']:
+            summary['failed'] += 1
+        for key in ("trees", "nodes", "dependencies", "unchanged"):
+            summary[key] += result.get(key, 0)
+    return summary
+
+
+def run_driver(args):
+    blend_files = find_blend_files(args)
+    if not blend_files:
+        print("no .blend files found")
+        return 1
+
+    # libraries keep the folder layout of the .blend files below their common folder
+    root = path.commonpath([path.dirname(file) for file in blend_files])
+    per_worker = max(1, args.per_worker)
+    shards = [blend_files[i:i + per_worker] for i in range(0, len(blend_files), per_worker)]
+    results_folder = tempfile.mkdtemp(prefix="node_io_batch_")
+    args.output = path.abspath(args.output)
+    makedirs(args.output, exist_ok=True)
+
+    print("exporting {} .blend files with {} Blender processes".format(len(blend_files), min(args.jobs, len(shards))))
+    start = perf_counter()
+    results = []
+    try:
+        with ThreadPoolExecutor(max_workers=max(1, args.jobs)) as pool:
+            futures = [pool.submit(run_shard, args, shard, root, path.join(results_folder, "{}.jsonl".format(i)))
+                       for i, shard in enumerate(shards)]
+            for future in as_completed(futures):
+                for result in future.result():
+                    results.append(result)
+                    print("[{}/{}] {}: {}".format(len(results), len(blend_files), path.relpath(result['file'], root),
+                                                  "; ".join(result['errors']) if result['errors'] else
+                                                  "{} trees, {} nodes".format(result.get('trees', 0),
+                                                                              result.get('nodes', 0))))
+    finally:
+        shutil.rmtree(results_folder, ignore_errors=True)
+
+    summary = merge_results(results, perf_counter() - start)
+    print("exported {} node trees with {} nodes from {} .blend files in {:.1f}s, {} failed".format(
+        summary['trees'], summary['nodes'], summary['blend_files'], summary['seconds'], summary['failed']))
+
+    if args.summary:
+        with open(args.summary, "w") as file:
+            json.dump(summary, file, indent=4)
+    return 1 if summary['failed'] else 0
+
+
+# runs inside Blender, exports each .blend through io_node's context-free API and appends its result to args.worker
+def run_worker(args):
+    import bpy
+    sys.path.insert(0, HERE)
+    import io_node
+
+    settings = {"export_format": "2" if args.format == "binary" else "1", "is_columnar": args.columnar,
+                "is_elide_defaults": args.elide_defaults, "precision": args.precision.upper(),
+                "decimals": args.decimals, "is_packed": args.packed, "dependency_save_type": "2" if args.relative else "1",
+                "is_compress": args.compress, "is_incremental": args.incremental}
+    if args.store:  # one store for every library, however deep its .blend was
+        settings['dependency_save_type'] = "3"
+        settings['asset_store'] = path.join(args.output, io_node.ASSET_STORE_NAME)
+    kinds = {kind.upper() for kind in args.kinds.split(",")}
+
+    for blend_file in args.files:
+        result = {"file": blend_file, "errors": []}
+        start = perf_counter()
+        try:
+            bpy.ops.wm.open_mainfile(filepath=blend_file, load_ui=False)
+            export_path = path.normpath(path.join(args.output, path.relpath(path.dirname(blend_file), args.root)))
+            makedirs(export_path, exist_ok=True)
+
+            to_export = io_node.bulk_export_list(kinds, args.filter)
+            if to_export:  # a .blend without node trees isn't an error
+                reporter = io_node.Reporter()
+                totals = io_node.export_trees(reporter, to_export, export_path, settings, library=True)
+                result.update(totals or {})
+                result['errors'] = reporter.errors()
+        except Exception as e:  # a broken .blend shouldn't take the rest of the shard with it
+            result['errors'].append("{}: {}".format(type(e).__name__, e))
+
+        result['seconds'] = round(perf_counter() - start, 3)
+        with open(args.worker, "a") as file:
+            file.write(json.dumps(result) + "\n")
+
+
+def main():
+    argv = sys.argv[sys.argv.index("--") + 1:] if "--" in sys.argv else sys.argv[1:]
+    args = parse_args(argv)
+    if args.worker:
+        run_worker(args)
+        return 0
+    return run_driver(args)
+
+
+if __name__ == "__main__":
+    status = main()
+    if status:  # inside Blender a SystemExit would be reported as an error
+        sys.exit(status)
@@ -0,0 +1,103 @@
+# the tests run against the bpy stand-in in benchmarks/, so they don't need Blender
+import sys
+from os import path
+
+import pytest
+
+ROOT = path.dirname(path.dirname(path.abspath(__file__)))
+sys.path.insert(0, path.join(ROOT, "benchmarks"))
+sys.path.insert(0, ROOT)
+
+import bpy_standin  # noqa: E402
+
+bpy = bpy_standin.install()
+
+import io_node  # noqa: E402
+
+
+@pytest.fixture
+def data():
+    # an empty .blend for each test, with nothing cached from the last one
+    bpy.data.__init__()
+    io_node.clear_file_cache()
+    io_node.group_hash_index.clear()
+    yield bpy.data
+    bpy.data.__init__()
+
+
+def export(to_export, export_path, **settings):
+    reporter = io_node.Reporter()
+    totals = io_node.export_trees(reporter, to_export, str(export_path), dict({"render_engine": "CYCLES"}, **settings),
+                                  library=len(to_export) > 1)
+    assert not reporter.errors(), reporter.errors()
+    return totals
+
+
+def import_path(file_path):
+    reporter = io_node.Reporter()
+    created = io_node.import_files(reporter, str(file_path), "CYCLES")
+    assert not reporter.errors(), reporter.errors()
+    return created
+
+
+# a node group turning one float into another with a math node doing operation
+def math_group(name, operation="MULTIPLY"):
+    group = bpy.data.node_groups.new(name, "ShaderNodeTree")
+    group.inputs.new("NodeSocketFloat", "Value")
+    group.outputs.new("NodeSocketFloat", "Value")
+    group_input = group.nodes.new("NodeGroupInput")
+    group_output = group.nodes.new("NodeGroupOutput")
+    math = group.nodes.new("ShaderNodeMath")
+    math.operation = operation
+    group.links.new(group_input.outputs[0], math.inputs[0])
+    group.links.new(math.outputs[0], group_output.inputs[0])
+    return group
+
+
+# a material with a group node for each of groups
+def group_material(name, groups):
+    material = bpy.data.materials.new(name)
+    material.use_nodes = True
+    for i, group in enumerate(groups):
+        node = material.node_tree.nodes.new("ShaderNodeGroup")
+        node.node_tree = group
+        node.inputs[0].default_value = 0.25 * (i + 1)
+    return material
+
+
+def used_groups(material):
+    return [node.node_tree.name if node.node_tree is not None else None for node in material.node_tree.nodes
+            if node.bl_idname == "ShaderNodeGroup"]
+
+
+# what import should bring back of a node tree, as (everything but floats, the floats) so floats can be compared
+# with a tolerance
+def tree_snapshot(tree, floats=None):
+    floats = [] if floats is None else floats
+    nodes = []
+    for node in sorted(tree.nodes, key=lambda n: n.name):
+        out = [node.name, node.bl_idname, node.label, node.parent.name if node.parent is not None else None]
+        if node.parent is None:
+            floats.extend(node.location)
+        for socket in node.inputs:
+            value = getattr(socket, "default_value", None)
+            if value is not None:
+                floats.extend(value if hasattr(value, "__len__") else [value])
+        for att in ("operation", "blend_type"):
+            out.append(getattr(node, att, None))
+        if hasattr(node, "color_ramp"):
+            for element in node.color_ramp.elements:
+                floats.extend([element.position] + list(element.color))
+        if hasattr(node, "mapping"):
+            for curve in node.mapping.curves:
+                for point in curve.points:
+                    floats.extend(point.location)
+        if getattr(node, "image", None) is not None:
+            out.append(node.image.name)
+        if getattr(node, "node_tree", None) is not None:
+            out.append(tree_snapshot(node.node_tree, floats)[0])
+        nodes.append(out)
+
+    links = sorted([link.from_node.name, link.from_socket.identifier, link.to_node.name, link.to_socket.identifier]
+                   for link in tree.links)
+    return [nodes, links], floats
@@ -0,0 +1,125 @@
+from concurrent.futures import ThreadPoolExecutor
+from os import listdir, path
+
+import pytest
+
+import synthetic
+from conftest import bpy, io_node, export, group_material, math_group
+
+
+def test_failed_export_keeps_the_last_file(data, tmp_path, monkeypatch):
+    material = group_material("Mat", [math_group("G")])
+    file_path = export([io_node.export_entry(material)], tmp_path)['files'][0]
+    with open(file_path, "rb") as file:
+        before = file.read()
+
+    def fail(n):
+        raise RuntimeError("collect failed")
+    monkeypatch.setattr(io_node, "collect_node_data", fail)
+    with pytest.raises(RuntimeError):
+        export([io_node.export_entry(material)], tmp_path)
+
+    with open(file_path, "rb") as file:
+        assert file.read() == before
+    assert listdir(str(tmp_path)) == ["Mat.bnodes"]
+
+
+def test_export_of_one_big_tree_is_done_in_steps(data, tmp_path):
+    image_path = str(tmp_path / "image.png")
+    synthetic.write_png(image_path)
+    material = synthetic.build_material(bpy, 1000, image_path)
+
+    steps = io_node.export_steps(io_node.Reporter(), [io_node.export_entry(material)], str(tmp_path),
+                                 {"render_engine": "CYCLES"})
+    progress = list(steps)
+    assert len(progress) >= 1000 // io_node.COLLECT_CHUNK
+    assert all(step == ["Exporting", 0, 1] for step in progress)
+    assert sorted(listdir(str(tmp_path))) == sorted(["image.png", material.name + ".bnodes"])
+
+
+@pytest.mark.parametrize("export_format", ["1", "2"])
+def test_bytes_written_match_the_file(data, tmp_path, monkeypatch, export_format):
+    monkeypatch.setattr(io_node, "timings", io_node.Timings("export"))
+    material = group_material("Mat", [math_group("G")])
+    file_path = export([io_node.export_entry(material)], tmp_path, export_format=export_format)['files'][0]
+    assert io_node.timings.counts["bytes written"] == path.getsize(file_path)
+
+
+def test_groups_are_only_cached_when_exporting_several_trees(data, tmp_path, monkeypatch):
+    group = math_group("G")
+    materials = [group_material("A", [group]), group_material("B", [group])]
+    caches = []
+    collect_group_steps = io_node.collect_group_steps
+
+    def record(group, dependencies, writer, visited, elide, cache, progress=None):
+        caches.append(cache)
+        return collect_group_steps(group, dependencies, writer, visited, elide, cache, progress)
+    monkeypatch.setattr(io_node, "collect_group_steps", record)
+
+    export([io_node.export_entry(materials[0])], tmp_path)
+    assert caches == [None]
+    del caches[:]
+    export([io_node.export_entry(material) for material in materials], tmp_path)
+    assert len(caches) == 2 and caches[0] is caches[1] and len(caches[0]) == 1
+
+
+def test_failed_collection_removes_the_scratch_tree(data, monkeypatch):
+    math_group("G")
+
+    def fail(out, defaults):
+        raise RuntimeError("elide failed")
+    monkeypatch.setattr(io_node, "elide_defaults", fail)
+    monkeypatch.setattr(io_node, "node_defaults", {})  # so the scratch tree is made again
+    with pytest.raises(RuntimeError):
+        io_node.node_group_hashes("ShaderNodeTree", ["DECIMALS", io_node.ROUND, False, True])
+    assert data.node_groups.keys() == ["G"]
+
+
+def test_export_only_indexes_the_files_it_wrote(data, tmp_path):
+    io_node.update_library_index(str(tmp_path))
+    (tmp_path / "other.bnodes").write_bytes(b"not indexed until the folder is")
+    material = group_material("Mat", [math_group("G")])
+    export([io_node.export_entry(material)], tmp_path)
+
+    assert [row[0] for row in io_node.search_library_index(str(tmp_path))] == ["Mat.bnodes"]
+    assert io_node.update_library_index(str(tmp_path)) == (2, 1, 0)
+
+
+def test_exports_saving_the_asset_index_at_once_keep_each_others_entries(tmp_path):
+    store_path = str(tmp_path)
+    io_node.save_asset_index(store_path, {"first.png": [1, 2, "a"]})
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        list(pool.map(lambda i: io_node.save_asset_index(store_path, {"{}.png".format(i): [i, i, "b"]}), range(16)))
+
+    assert sorted(io_node.load_asset_index(store_path)) == \
+        sorted(["first.png"] + ["{}.png".format(i) for i in range(16)])
+    assert sorted(listdir(store_path)) == [io_node.ASSET_INDEX_NAME]
+
+
+def test_a_stale_asset_index_lock_is_taken_over(tmp_path, monkeypatch):
+    store_path = str(tmp_path)
+    lock_path = tmp_path / (io_node.ASSET_INDEX_NAME + ".lock")
+    lock_path.write_bytes(b"stale")
+    monkeypatch.setattr(io_node, "ASSET_INDEX_LOCK_WAIT", 0)
+    load_asset_index = io_node.load_asset_index
+
+    def load_locked(store_path):
+        assert lock_path.read_bytes() == b""  # saved under a lock of its own
+        return load_asset_index(store_path)
+    monkeypatch.setattr(io_node, "load_asset_index", load_locked)
+    io_node.save_asset_index(store_path, {"a.png": [1, 2, "a"]})
+
+    assert list(load_asset_index(store_path)) == ["a.png"]
+    assert listdir(store_path) == [io_node.ASSET_INDEX_NAME]
+
+
+def test_another_exports_asset_index_lock_is_left_alone(tmp_path, monkeypatch):
+    lock_path = tmp_path / (io_node.ASSET_INDEX_NAME + ".lock")
+    lock_path.write_bytes(b"")
+
+    def interrupt(seconds):
+        raise KeyboardInterrupt
+    monkeypatch.setattr(io_node, "sleep", interrupt)
+    with pytest.raises(KeyboardInterrupt):
+        io_node.save_asset_index(str(tmp_path), {"a.png": [1, 2, "a"]})
+    assert lock_path.exists()
@@ -0,0 +1,118 @@
+import json
+from os import listdir
+
+from conftest import bpy, io_node, export, import_path, math_group, group_material, used_groups
+
+
+def export_materials(tmp_path, materials):
+    totals = export([io_node.export_entry(material) for material in materials], tmp_path)
+    return totals['files'][0] if len(totals['files']) == 1 else tmp_path / listdir(str(tmp_path))[0]
+
+
+def test_same_group_under_two_names_is_created_once(data, tmp_path):
+    file_path = export_materials(tmp_path, [group_material("Mat", [math_group("GA"), math_group("GB")])])
+
+    data.__init__()
+    material = import_path(file_path)[0]
+    assert data.node_groups.keys() == ["GA"]
+    assert used_groups(material) == ["GA", "GA"]
+
+
+def test_group_with_same_name_but_other_content_is_not_used(data, tmp_path):
+    file_path = export_materials(tmp_path, [group_material("Mat", [math_group("GA"), math_group("GB")])])
+
+    data.__init__()
+    math_group("GB", "POWER")
+    material = import_path(file_path)[0]
+    assert used_groups(material) == ["GA", "GA"]
+    assert data.node_groups["GB"].nodes[2].operation == "POWER"
+
+
+def test_existing_group_is_reused_whatever_its_name(data, tmp_path):
+    group = math_group("G")
+    file_path = export_materials(tmp_path, [group_material("M1", [group]), group_material("M2", [group])])
+
+    data.__init__()
+    import_path(file_path)
+    assert data.node_groups.keys() == ["G"]
+
+    data.node_groups["G"].name = "Renamed"
+    material = import_path(file_path)[0]
+    assert data.node_groups.keys() == ["Renamed"]
+    assert used_groups(material) == ["Renamed"]
+
+
+def test_files_without_hashes_match_groups_by_name(data, tmp_path):
+    file_path = export_materials(tmp_path, [group_material("Mat", [math_group("G")])])
+    root = io_node.load_bnodes(str(file_path))
+    del root['__info__']['group_hashes'], root['__info__']['group_hash_format']
+    with open(str(file_path), "w") as file:
+        json.dump(root, file)
+
+    data.__init__()
+    math_group("G", "POWER")
+    material = import_path(file_path)[0]
+    assert used_groups(material) == ["G"]
+    assert bpy.data.node_groups.keys() == ["G"]
+
+
+def test_group_with_a_slash_in_its_name_imports(data, tmp_path):
+    material = group_material("Mat", [math_group("Wood/Grain")])
+    file_path = export_materials(tmp_path, [material])
+
+    data.__init__()
+    material = import_path(file_path)[0]
+    assert used_groups(material) == ["Wood/Grain"]
+
+
+def test_hashing_the_blend_groups_is_not_counted_as_imported(data, tmp_path, monkeypatch):
+    file_path = export_materials(tmp_path, [group_material("Mat", [math_group("G")])])
+    imported = []
+    for others in (0, 50):
+        data.__init__()
+        for i in range(others):
+            math_group("Other{}".format(i), "POWER")
+        monkeypatch.setattr(io_node, "timings", io_node.Timings("import"))
+        import_path(file_path)
+        imported.append([io_node.timings.counts["nodes"], io_node.timings.counts["links"]])
+
+    assert imported[1] == imported[0]
+    assert "collect nodes" not in io_node.timings.phases and io_node.timings.phases["hash node groups"][1] == 50
+
+
+def test_blend_groups_are_hashed_again_only_once_they_change(data, tmp_path, monkeypatch):
+    monkeypatch.setattr(bpy.app.handlers, "scene_update_post", [io_node.group_hash_update_handler])
+    file_path = export_materials(tmp_path, [group_material("Mat", [math_group("G")])])
+    collected, real_collect_group = [], io_node.collect_group
+
+    def collect_group(group, *args):
+        collected.append(group.name)
+        real_collect_group(group, *args)
+    monkeypatch.setattr(io_node, "collect_group", collect_group)
+
+    import_path(file_path)
+    import_path(file_path)
+    assert collected == ["G"]
+
+    bpy.data.node_groups["G"].nodes[2].operation = "POWER"
+    monkeypatch.setattr(bpy.data.node_groups, "is_updated", True, raising=False)
+    io_node.group_hash_update_handler(None)
+    import_path(file_path)
+    assert collected == ["G", "G"] and sorted(data.node_groups.keys()) == ["G", "G.001"]
+
+
+def test_files_leaving_out_defaults_are_planned_without_scratch_trees(data, tmp_path, monkeypatch):
+    group = math_group("G")
+    (tmp_path / "elided").mkdir()
+    (tmp_path / "full").mkdir()
+    elided = export([io_node.export_entry(group_material("Mat", [group]))], tmp_path / "elided",
+                    is_elide_defaults=True)['files'][0]
+    full = export([io_node.export_entry(group_material("Mat", [group]))], tmp_path / "full")['files'][0]
+    assert io_node.load_bnodes(elided)['__info__']['group_hashes'] == \
+        io_node.load_bnodes(full)['__info__']['group_hashes']
+
+    def get_node_defaults(n):
+        raise AssertionError("scratch tree built")
+    monkeypatch.setattr(io_node, "get_node_defaults", get_node_defaults)
+    material = import_path(elided)[0]
+    assert used_groups(material) == ["G"] and data.node_groups.keys() == ["G"]
@@ -0,0 +1,105 @@
+import json
+from os import path
+
+from conftest import io_node, export, group_material, import_path, math_group, used_groups
+
+
+def test_binary_files_are_closed_until_planned(data, tmp_path):
+    materials = [group_material("Mat{}".format(i), [math_group("G{}".format(i), operation)])
+                 for i, operation in enumerate(("ADD", "SUBTRACT", "POWER"))]
+    files = export([io_node.export_entry(material) for material in materials], tmp_path, export_format="2")['files']
+
+    for file_path in files:
+        root, error = io_node.read_import_file(file_path, "CYCLES")
+        assert error is None
+        assert isinstance(root, io_node.BinaryReader) and root.file is None
+        assert root['__info__']['group_order'][0] in root  # reopened to look the group up
+        io_node.close_import_file(root)
+        assert root.file is None
+
+    data.__init__()
+    created = import_path(path.dirname(files[0]))
+    assert sorted(used_groups(material)[0] for material in created) == ["G0", "G1", "G2"]
+
+
+def test_file_bytes_count_what_was_read(data, tmp_path, monkeypatch):
+    material = group_material("Mat", [math_group("G")])
+    file_path = export([io_node.export_entry(material)], tmp_path, export_format="2")['files'][0]
+    monkeypatch.setattr(io_node, "timings", io_node.Timings("import"))
+    import_path(file_path)
+    assert 0 < io_node.timings.counts["file bytes"] <= path.getsize(file_path)
+
+
+def test_images_sharing_a_name_both_come_back_from_a_zip(data, tmp_path):
+    materials = []
+    for i in range(2):
+        image_path = tmp_path / "source{}".format(i) / "tex.png"
+        image_path.parent.mkdir()
+        image_path.write_bytes(b"image " + str(i).encode())
+        image = data.images.load(str(image_path))
+        image._name = "tex.png"  # like an image linked from another .blend, which can have a local image's name
+        material = group_material("Mat{}".format(i), [])
+        material.node_tree.nodes.new("ShaderNodeTexImage").image = image
+        materials.append(material)
+    export_path = tmp_path / "export"
+    export_path.mkdir()
+    zip_path = export([io_node.export_entry(material) for material in materials], export_path,
+                      dependency_save_type="2", is_compress=True)['files'][0]
+
+    data.__init__()
+    created = import_path(zip_path)
+    images = [node.image for material in created for node in material.node_tree.nodes
+              if node.bl_idname == "ShaderNodeTexImage"]
+    assert sorted(open(image.filepath, "rb").read() for image in images) == [b"image 0", b"image 1"]
+
+
+def test_binary_files_are_cached_as_they_are_decoded(data, tmp_path):
+    material = group_material("Mat", [math_group("G")])
+    file_path = export([io_node.export_entry(material)], tmp_path, export_format="2")['files'][0]
+    root, error = io_node.read_import_file(file_path, "CYCLES")
+    io_node.cache_file(io_node.file_cache_key(file_path), root)
+    assert root.groups == {} and io_node.file_cache_info()['bytes'] == io_node.cached_size(root)
+
+    data.__init__()
+    import_path(file_path)
+    cached = list(io_node.file_cache.values())[0]
+    assert isinstance(cached[0], io_node.BinaryReader) and sorted(cached[0].groups) == ["G", "main"]
+    assert io_node.file_cache_info()['bytes'] == cached[1] == io_node.cached_size(cached[0])
+
+
+def test_import_files_can_turn_the_cache_off(data, tmp_path):
+    material = group_material("Mat", [math_group("G")])
+    file_path = export([io_node.export_entry(material)], tmp_path)['files'][0]
+    reporter = io_node.Reporter()
+    try:
+        assert io_node.import_files(reporter, str(file_path), "CYCLES", cache_limit=0)
+        assert io_node.file_cache_info()['files'] == 0
+    finally:
+        io_node.set_file_cache_limit(io_node.FILE_CACHE_SIZE)
+
+
+def test_files_record_the_features_they_use(data, tmp_path):
+    material = group_material("Mat", [math_group("G")])
+    export_path = tmp_path / "export"
+    export_path.mkdir()
+    file_path = export([io_node.export_entry(material)], tmp_path)['files'][0]
+    assert 'features' not in io_node.load_bnodes(file_path)['__info__']
+    file_path = export([io_node.export_entry(material)], export_path, export_format="2", is_columnar=True,
+                       is_packed=True)['files'][0]
+    assert io_node.load_bnodes(file_path)['__info__']['features'] == ["binary", "columnar", "packed"]
+
+
+def test_files_using_unknown_features_are_rejected(data, tmp_path):
+    material = group_material("Mat", [math_group("G")])
+    file_path = export([io_node.export_entry(material)], tmp_path)['files'][0]
+    with open(file_path) as file:
+        root = json.load(file)
+    root['__info__']['version'] = [9, 0, 0]
+    root['__info__']['features'] = ["columnar", "sparse"]
+    with open(file_path, "w") as file:
+        json.dump(root, file)
+
+    reporter = io_node.Reporter()
+    assert not io_node.import_files(reporter, file_path, "CYCLES")
+    assert reporter.errors() == ["NodeIO: 'Mat.bnodes' Was Written By NodeIO 9.0.0 And Uses sparse, Which This Version "
+                                 "Can't Read"]
@@ -0,0 +1,65 @@
+import zipfile
+from os import path
+
+import synthetic
+from conftest import bpy, io_node, export, group_material, math_group
+
+
+def build(tmp_path):
+    image_path = str(tmp_path / "image.png")
+    synthetic.write_png(image_path)
+    image = bpy.data.images.load(image_path)
+    materials = [group_material("M{}".format(i), [math_group("G{}".format(i))]) for i in range(2)]
+    node = materials[0].node_tree.nodes.new("ShaderNodeTexImage")
+    node.image = image
+    return [io_node.export_entry(material) for material in materials]
+
+
+def export_zip(to_export, export_path, incremental=True):
+    return export(to_export, export_path, is_compress=True, is_incremental=incremental, dependency_save_type="2")
+
+
+def rewrite_zip(zip_path, without):
+    with zipfile.ZipFile(zip_path) as old:
+        members = {name: old.read(name) for name in old.namelist() if name != without}
+    with zipfile.ZipFile(zip_path, "w") as new:
+        for name, member in members.items():
+            new.writestr(name, member)
+
+
+def test_unchanged_trees_are_skipped(data, tmp_path):
+    export_path = tmp_path / "out"
+    export_path.mkdir()
+    to_export = build(tmp_path)
+    zip_path = export_zip(to_export, export_path)['files'][0]
+
+    totals = export_zip(to_export, export_path)
+    assert totals['unchanged'] == 2 and totals['trees'] == 0
+    with zipfile.ZipFile(zip_path) as archive:
+        assert sorted(archive.namelist()) == ["M0.bnodes", "M1.bnodes", "image.png"]
+
+
+def test_members_missing_from_the_old_zip_are_written_again(data, tmp_path):
+    export_path = tmp_path / "out"
+    export_path.mkdir()
+    to_export = build(tmp_path)
+    zip_path = export_zip(to_export, export_path)['files'][0]
+
+    for missing in ("M1.bnodes", "image.png"):
+        rewrite_zip(zip_path, missing)
+        totals = export_zip(to_export, export_path)
+        assert totals['trees'] == 1
+        with zipfile.ZipFile(zip_path) as archive:
+            assert sorted(archive.namelist()) == ["M0.bnodes", "M1.bnodes", "image.png"]
+
+
+def test_other_exports_drop_the_manifest(data, tmp_path):
+    export_path = tmp_path / "out"
+    export_path.mkdir()
+    to_export = build(tmp_path)
+    zip_path = export_zip(to_export, export_path)['files'][0]
+    assert path.exists(zip_path[:-len(".zip")] + io_node.MANIFEST_FILE_NAME)
+
+    export_zip(to_export, export_path, incremental=False)
+    assert not path.exists(zip_path[:-len(".zip")] + io_node.MANIFEST_FILE_NAME)
+    assert export_zip(to_export, export_path)['trees'] == 2
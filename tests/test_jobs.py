@@ -0,0 +1,128 @@
+import types
+
+import pytest
+
+import bpy_standin
+import synthetic
+from conftest import bpy, io_node, export, import_path
+
+
+class WindowManager:
+    def event_timer_add(self, time_step, window):
+        return "timer"
+
+    def event_timer_remove(self, timer):
+        pass
+
+    def progress_begin(self, low, high):
+        pass
+
+    def progress_update(self, value):
+        pass
+
+    def progress_end(self):
+        pass
+
+    def modal_handler_add(self, operator):
+        pass
+
+
+def event(kind, value="NOTHING"):
+    return types.SimpleNamespace(type=kind, value=value)
+
+
+@pytest.fixture
+def library(data, tmp_path, monkeypatch):
+    image_path = str(tmp_path / "image.png")
+    synthetic.write_png(image_path)
+    materials = [synthetic.build_material(bpy, 600, image_path, seed=i) for i in range(2)]
+    totals = export([io_node.export_entry(material) for material in materials], tmp_path)
+    data.__init__()
+
+    monkeypatch.setattr(io_node, "JOB_SLICE", 0.0)  # a step per tick
+    context = bpy_standin.make_context(data)
+    context.window_manager = WindowManager()
+    context.screen = None
+    context.scene.node_io_import_type = "2"
+    context.scene.node_io_import_path_dir = str(tmp_path / totals['files'][0].split("/")[-2])
+    context.scene.node_io_cache_size = 0
+    return context
+
+
+def start_import(context):
+    operator = io_node.NodeIOImport()
+    assert operator.invoke(context, None) == {"RUNNING_MODAL"}
+    while io_node.job_progress['phase'] != "Importing":
+        assert operator.modal(context, event("TIMER")) == {"RUNNING_MODAL"}
+    return operator
+
+
+def is_empty(data):
+    return not len(data.materials) and not len(data.node_groups) and not len(data.images)
+
+
+def test_import_runs_to_the_end(library):
+    operator = io_node.NodeIOImport()
+    operator.invoke(library, None)
+    ticks = 1
+    while operator.modal(library, event("TIMER")) == {"RUNNING_MODAL"}:
+        ticks += 1
+    assert ticks > 5
+    assert len(bpy.data.materials) == 2 and not io_node.job_progress['running']
+
+
+def test_shortcuts_are_kept_from_blender(library):
+    operator = start_import(library)
+    assert operator.modal(library, event("Z", "PRESS")) == {"RUNNING_MODAL"}
+    assert operator.modal(library, event("DEL", "PRESS")) == {"RUNNING_MODAL"}
+    assert operator.modal(library, event("MIDDLEMOUSE", "PRESS")) == {"PASS_THROUGH"}
+    assert operator.modal(library, event("ESC", "PRESS")) == {"CANCELLED"}
+    assert is_empty(bpy.data)
+
+
+def test_undo_cancels_the_import_first(library):
+    operator = start_import(library)
+    assert len(bpy.data.materials)
+    io_node.cancel_job_handler(library.scene)
+    assert is_empty(bpy.data)
+    assert operator.modal(library, event("TIMER")) == {"CANCELLED"}
+    assert not io_node.job_progress['running']
+
+
+def test_failed_import_leaves_nothing_behind(library, monkeypatch):
+    created, real_import_node = [], io_node.import_node
+
+    def import_node(*args):
+        created.append(args[2])
+        if len(created) == 700:
+            raise RuntimeError("import failed")
+        real_import_node(*args)
+    monkeypatch.setattr(io_node, "import_node", import_node)
+
+    with pytest.raises(RuntimeError):
+        import_path(library.scene.node_io_import_path_dir)
+    assert is_empty(bpy.data)
+
+    created.clear()
+    operator = io_node.NodeIOImport()
+    operator.invoke(library, None)
+    with pytest.raises(RuntimeError):
+        while operator.modal(library, event("TIMER")) == {"RUNNING_MODAL"}:
+            pass
+    assert is_empty(bpy.data) and not io_node.job_progress['running']
+
+
+def test_import_keeps_to_the_editor_and_object_it_was_started_from(library):
+    obj = types.SimpleNamespace(data=types.SimpleNamespace(materials=[]), active_material=None)
+    library.object = library.active_object = obj
+    library.scene.node_io_is_auto_add = True
+    operator = io_node.NodeIOImport()
+    operator.invoke(library, None)
+    library.object = library.active_object = library.space_data = None  # the context is only valid during invoke()
+
+    # later ticks get a context of their own, which may not have the same editor or object, or any
+    tick = types.SimpleNamespace(scene=library.scene, window_manager=library.window_manager, screen=None,
+                                 window=None, space_data=None, object=None, active_object=None)
+    while operator.modal(tick, event("TIMER")) == {"RUNNING_MODAL"}:
+        pass
+    assert obj.data.materials == list(bpy.data.materials) and len(obj.data.materials) == 2
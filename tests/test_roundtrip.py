@@ -0,0 +1,33 @@
+import pytest
+
+import synthetic
+from conftest import bpy, io_node, export, import_path, tree_snapshot
+
+
+@pytest.mark.parametrize("export_format", ["1", "2"], ids=["json", "binary"])
+@pytest.mark.parametrize("columnar", [False, True], ids=["rows", "columnar"])
+def test_tree_comes_back_the_same(data, tmp_path, export_format, columnar):
+    image_path = str(tmp_path / "image.png")
+    synthetic.write_png(image_path)
+    material = synthetic.build_material(bpy, 300, image_path)
+    before, before_floats = tree_snapshot(material.node_tree)
+    export_path = tmp_path / "export"
+    export_path.mkdir()
+    file_path = export([io_node.export_entry(material)], export_path, export_format=export_format,
+                       is_columnar=columnar)['files'][0]
+
+    data.__init__()
+    after, after_floats = tree_snapshot(import_path(file_path)[0].node_tree)
+    assert after == before
+    assert after_floats == pytest.approx(before_floats, abs=10 ** -io_node.ROUND)
+
+
+def test_binary_values_decode_to_what_was_encoded():
+    strings = {}
+    value = {"strings": ["s{}".format(i) for i in range(20000)], "ints": [0, -1, 63, -64, 64, 300, -70000, 2 ** 40],
+             "floats": [0.5, -2.25], "vectors": [[1.0, 2.0, 3.0], [0.5] * 200], "flags": [True, False, None],
+             "nested": [{"a": [[], {}]}, [[1, "s5"]]], "text": "inline"}
+    out = bytearray()
+    io_node.encode_value(value, out, strings)
+    table = sorted(strings, key=strings.get)
+    assert io_node.decode_value(bytes(out), 0, table) == (value, len(out))